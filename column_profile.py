@@ -0,0 +1,220 @@
+"""
+Perfil de columnas calculado en una sola pasada y compartido por las métricas.
+
+`profile_column` recorre cada columna una vez (`pd.factorize`) y obtiene nulos,
+valores distintos y, sobre los valores distintos ponderados por su frecuencia,
+las estadísticas de texto (vacíos y longitudes). Para columnas numéricas añade
+mínimo, máximo, varianza y negativos.
+
+`DataQualityCalculator.column_profile()` cachea el resultado por versión de los
+datos, así completitud, precisión, consistencia, conformidad, `_optimize_dtypes`
+y el endpoint /completitud leen los mismos conteos sin volver a escanear `df`.
+
+Valores faltantes: además de los nulos reales, Socrata devuelve celdas "vacías"
+como textos ("", " ", "N/A", "-", "null"...). El vocabulario `MISSING_VALUE_TOKENS`
+se aplica a los valores distintos de cada columna y se expande por códigos a una
+máscara booleana por celda (`missing_mask`), sin recorrer las celdas en Python.
+"""
+import json
+import os
+from typing import Dict, FrozenSet, Iterable
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# Cargar variables de entorno desde .env
+load_dotenv()
+
+
+def parse_missing_tokens(raw: str) -> FrozenSet[str]:
+    """Vocabulario de faltantes separado por comas; se compara tras `strip()` y sin mayúsculas."""
+    return frozenset(token.strip().casefold() for token in raw.split(',')) | {''}
+
+
+# Los textos vacíos o solo espacios siempre cuentan como faltantes
+MISSING_VALUE_TOKENS = parse_missing_tokens(
+    os.getenv("MISSING_VALUE_TOKENS", "n/a,na,n.a.,-,--,null,none,nan,sin dato,sin datos,s/d,no aplica"))
+
+
+class ColumnProfile:
+    """
+    Estadísticas de una columna.
+
+    Atributos:
+        name: Nombre de la columna
+        dtype: dtype de la columna en `df` (se actualiza si `_optimize_dtypes` la convierte)
+        inferred_type: Tipo inferido de los valores (`pd.api.types.infer_dtype`)
+        rows: Número de filas
+        null_count: Celdas nulas (`isna`)
+        non_null: Celdas no nulas
+        empty_count: Textos vacíos o solo espacios (`str.strip() == ''`)
+        distinct_count: Valores distintos sin nulos (`nunique`)
+        min / max / variance / negative_count: Solo columnas numéricas (None en otro caso)
+        len_mean / len_std: Media y desviación (ddof=1) de la longitud de `astype(str)`
+            de los valores no nulos
+        missing_count / missing_mask: Celdas faltantes (nulos + valores del vocabulario
+            de faltantes) y su máscara booleana por fila
+        approximate: True si `distinct_count` es una estimación (perfil con sketches)
+        sketch: `sketches.ColumnSketch` con valores frecuentes y cuantiles (solo perfil aproximado)
+    """
+
+    __slots__ = ('name', 'dtype', 'inferred_type', 'rows', 'null_count', 'non_null', 'empty_count',
+                 'distinct_count', 'min', 'max', 'variance', 'negative_count', 'len_mean', 'len_std',
+                 'missing_count', 'missing_mask', 'approximate', 'sketch')
+
+    def __init__(self, name, dtype: str, rows: int):
+        self.name = name
+        self.dtype = dtype
+        self.inferred_type = 'empty'
+        self.rows = rows
+        self.null_count = 0
+        self.non_null = 0
+        self.empty_count = 0
+        self.distinct_count = 0
+        self.min = None
+        self.max = None
+        self.variance = None
+        self.negative_count = None
+        self.len_mean = float('nan')
+        self.len_std = float('nan')
+        self.missing_count = 0
+        self.missing_mask = np.zeros(rows, dtype=bool)
+        self.approximate = False
+        self.sketch = None
+
+    @property
+    def null_ratio(self) -> float:
+        return self.null_count / self.rows if self.rows else 0.0
+
+    @property
+    def missing_ratio(self) -> float:
+        return self.missing_count / self.rows if self.rows else 0.0
+
+    @property
+    def is_numeric(self) -> bool:
+        """Columna numérica no booleana de cualquier ancho (int8...int64, float32/64)."""
+        return self.negative_count is not None
+
+    def to_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__ if slot not in ('sketch', 'missing_mask')}
+
+    def __repr__(self) -> str:
+        return (f"ColumnProfile({self.name!r}, dtype={self.dtype}, nulos={self.null_count}, "
+                f"distintos={self.distinct_count})")
+
+
+def _canonical(value):
+    """Forma hashable de celdas dict/list (objetos location de Socrata)."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True, default=str, ensure_ascii=False)
+    return value
+
+
+# Resultados de `infer_dtype` que garantizan que ningún valor es texto
+_NON_TEXT_KINDS = frozenset({
+    'empty', 'integer', 'floating', 'mixed-integer-float', 'decimal', 'complex', 'boolean',
+    'datetime64', 'datetime', 'date', 'timedelta64', 'timedelta', 'time', 'period', 'interval',
+})
+
+
+def text_value_flags(values: pd.Series, tokens: Iterable[str] = MISSING_VALUE_TOKENS):
+    """
+    Máscaras (es texto, es faltante, es vacío) de valores normalmente distintos.
+
+    Se hace un solo `strip()` para el vocabulario de faltantes y los vacíos, y el
+    `isinstance` por celda solo cuando `infer_dtype` no resuelve el tipo.
+    """
+    values = pd.Series(np.asarray(values, dtype=object))
+    kind = pd.api.types.infer_dtype(values, skipna=False)
+    if kind == 'string':
+        is_text = np.ones(len(values), dtype=bool)
+    elif kind in _NON_TEXT_KINDS:
+        is_text = np.zeros(len(values), dtype=bool)
+    else:
+        is_text = values.map(lambda v: isinstance(v, str)).to_numpy()
+    missing = np.zeros(len(values), dtype=bool)
+    blank = np.zeros(len(values), dtype=bool)
+    if is_text.any():
+        # Comprensiones sobre el arreglo: bastante más rápidas que `.str` con dtype object
+        tokens = frozenset(tokens)
+        stripped = [v.strip() for v in values.to_numpy()[is_text]]
+        missing[is_text] = np.fromiter([v.casefold() in tokens for v in stripped], bool, len(stripped))
+        blank[is_text] = np.fromiter([not v for v in stripped], bool, len(stripped))
+    return is_text, missing, blank
+
+
+def value_lengths(values: pd.Series) -> np.ndarray:
+    """Longitud de `str(valor)` de cada valor (como `astype(str).str.len()`)."""
+    text = pd.Series(np.asarray(values, dtype=object)).astype(str).to_numpy()
+    return np.fromiter(map(len, text), np.float64, len(text))
+
+
+def missing_value_lookup(values: pd.Series, tokens: Iterable[str] = MISSING_VALUE_TOKENS) -> np.ndarray:
+    """Máscara de los valores (normalmente distintos) que son textos del vocabulario de faltantes."""
+    return text_value_flags(values, tokens)[1]
+
+
+def _weighted_length_stats(lengths: np.ndarray, counts: np.ndarray):
+    """Media y desviación muestral de longitudes dadas por valor distinto y su frecuencia."""
+    total = counts.sum()
+    if total == 0:
+        return float('nan'), float('nan')
+    mean = float((lengths * counts).sum() / total)
+    if total < 2:
+        return mean, float('nan')
+    var = float(((lengths - mean) ** 2 * counts).sum() / (total - 1))
+    return mean, float(np.sqrt(max(var, 0.0)))
+
+
+def profile_column(series: pd.Series, name=None,
+                   missing_tokens: Iterable[str] = MISSING_VALUE_TOKENS) -> ColumnProfile:
+    """Perfil de una columna en una pasada de `pd.factorize` más operaciones sobre los valores distintos."""
+    profile = ColumnProfile(series.name if name is None else name, str(series.dtype), len(series))
+    if len(series) == 0:
+        return profile
+
+    try:
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        raw_uniques = uniques
+    except TypeError:
+        # Celdas no hashables: factorizar su forma canónica; las longitudes
+        # se toman del texto original como hace `astype(str)`
+        codes, uniques = pd.factorize(series.map(_canonical), use_na_sentinel=True)
+        first = np.unique(codes[codes >= 0], return_index=True)[1]
+        raw_uniques = series[codes >= 0].iloc[first].to_numpy(dtype=object)
+
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    profile.null_count = int((codes < 0).sum())
+    profile.non_null = profile.rows - profile.null_count
+    profile.distinct_count = int(len(uniques))
+
+    distinct = pd.Series(np.asarray(raw_uniques, dtype=object))
+    profile.inferred_type = pd.api.types.infer_dtype(distinct, skipna=True)
+
+    # Faltantes: búsqueda sobre los valores distintos expandida por códigos (-1 = nulo)
+    _, missing, blank = text_value_flags(distinct, missing_tokens)
+    missing_lookup = np.append(missing, True)
+    profile.missing_mask = missing_lookup[codes]
+    profile.missing_count = int(profile.missing_mask.sum())
+
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        if profile.non_null:
+            profile.min = series.min()
+            profile.max = series.max()
+            profile.negative_count = int(counts[np.asarray(uniques) < 0].sum())
+        else:
+            profile.negative_count = 0
+        profile.variance = series.var()
+
+    if len(distinct):
+        # `str.strip() == ''` solo aplica a valores de texto
+        profile.empty_count = int(counts[blank].sum())
+        lengths = value_lengths(distinct)
+        profile.len_mean, profile.len_std = _weighted_length_stats(lengths, counts)
+    return profile
+
+
+def profile_frame(df: pd.DataFrame, missing_tokens: Iterable[str] = MISSING_VALUE_TOKENS) -> Dict[str, ColumnProfile]:
+    """Perfil de todas las columnas de `df` (nombre -> ColumnProfile)."""
+    return {col: profile_column(df[col], col, missing_tokens) for col in df.columns}
@@ -0,0 +1,116 @@
+"""
+Proyección de columnas: descargar solo las columnas que leen las métricas pedidas.
+
+`load_data` descargaba siempre todas las columnas del dataset, aunque
+`/portabilidad` solo lee `d_formato` (y `c_medio_de_conservaci_n_y`) y
+`/conformidad` solo las columnas que encuentra `_detect_relevant_columns`. En
+datasets anchos casi toda la transferencia eran columnas que ninguna de las
+métricas pedidas iba a leer.
+
+`plan_columns` traduce un conjunto de métricas a la lista de `fieldName` que
+necesitan (los nombres visibles de los metadatos se traducen a `fieldName`):
+
+- actualidad, accesibilidad, trazabilidad...: solo metadatos, ninguna columna
+- portabilidad, conformidad: sus columnas
+- completitud, unicidad, exactitud...: todas (None)
+
+`projection_select` arma el `$select` de SoQL con esas columnas más `:id` y
+`:updated_at`: con `:id` se unen a las filas residentes las columnas que se
+descarguen después (`DataQualityCalculator.ensure_columns`) y con
+`:updated_at` sigue funcionando el refresco incremental.
+"""
+import os
+from typing import Dict, Iterable, List, Optional
+
+from dotenv import load_dotenv
+
+# Cargar variables de entorno desde .env
+load_dotenv()
+
+COLUMN_PROJECTION_ENABLED = os.getenv("COLUMN_PROJECTION_ENABLED", "true").lower() == "true"
+
+# Campos de sistema que acompañan siempre a una proyección
+PROJECTION_SYSTEM_FIELDS = (':id', ':updated_at')
+
+# Columnas que lee calculate_portabilidad
+PORTABILIDAD_COLUMNS = ('d_formato', 'c_medio_de_conservaci_n_y')
+
+# Métricas calculadas solo con los metadatos
+METADATA_METRICS = frozenset({
+    'actualidad', 'accesibilidad', 'confidencialidad', 'trazabilidad',
+    'credibilidad', 'recuperabilidad', 'disponibilidad',
+})
+# Métricas que recorren todas las columnas
+ALL_COLUMNS_METRICS = frozenset({
+    'completitud', 'unicidad', 'exactitud', 'consistencia', 'precision',
+})
+PROJECTION_METRICS = METADATA_METRICS | ALL_COLUMNS_METRICS | {'conformidad', 'portabilidad'}
+
+
+def metadata_field_names(metadata: Optional[Dict]) -> List[str]:
+    """`fieldName` de las columnas de datos, en el orden de los metadatos (sin campos de sistema)."""
+    fields = []
+    for column in (metadata or {}).get('columns') or []:
+        if isinstance(column, dict) and column.get('fieldName'):
+            field = str(column['fieldName'])
+            if not field.startswith(':') and field not in fields:
+                fields.append(field)
+    return fields
+
+
+def resolve_field_names(names: Iterable[str], metadata: Optional[Dict]) -> List[str]:
+    """
+    Traduce nombres visibles o `fieldName` a los `fieldName` de los metadatos.
+
+    Los nombres que no corresponden a ninguna columna se descartan: un campo
+    inexistente en `$select` hace fallar la consulta SoQL.
+    """
+    by_name = {}
+    for column in (metadata or {}).get('columns') or []:
+        if isinstance(column, dict) and column.get('fieldName'):
+            field = str(column['fieldName'])
+            by_name[field] = field
+    for column in (metadata or {}).get('columns') or []:
+        if isinstance(column, dict) and column.get('fieldName') and column.get('name'):
+            # Un fieldName tiene prioridad sobre un nombre visible igual
+            by_name.setdefault(str(column['name']), str(column['fieldName']))
+    resolved = [by_name[str(name)] for name in names if str(name) in by_name]
+    return [field for field in dict.fromkeys(resolved) if not field.startswith(':')]
+
+
+def plan_columns(metrics: Iterable[str], metadata: Optional[Dict],
+                 relevant_columns: Optional[Dict[str, List[str]]] = None) -> Optional[List[str]]:
+    """
+    Columnas (`fieldName`) que necesitan las métricas, en el orden de los metadatos.
+
+    Args:
+        metrics: Nombres de métricas (ver PROJECTION_METRICS)
+        metadata: Metadatos de `/api/views/{id}`
+        relevant_columns: Resultado de `_detect_relevant_columns` (para conformidad)
+
+    Returns:
+        Lista de columnas, o None si hacen falta todas (alguna métrica las recorre
+        todas, la métrica no es conocida, la proyección está desactivada o los
+        metadatos no describen las columnas).
+    """
+    fields = metadata_field_names(metadata)
+    if not COLUMN_PROJECTION_ENABLED or not fields:
+        return None
+    wanted = []
+    for metric in metrics:
+        if metric in METADATA_METRICS:
+            continue
+        if metric == 'portabilidad':
+            wanted.extend(PORTABILIDAD_COLUMNS)
+        elif metric == 'conformidad':
+            for columns in (relevant_columns or {}).values():
+                wanted.extend(columns)
+        else:
+            return None
+    planned = set(resolve_field_names(wanted, metadata))
+    return [field for field in fields if field in planned]
+
+
+def projection_select(columns: Iterable[str]) -> str:
+    """Cláusula `$select` con los campos de sistema y las columnas indicadas."""
+    return ",".join(list(PROJECTION_SYSTEM_FIELDS) + [str(c) for c in columns])
@@ -0,0 +1,162 @@
+"""
+Tipado de columnas en la ingesta a partir de los metadatos de Socrata.
+
+La API JSON de Socrata entrega casi todos los valores como texto, así que tras
+`pd.DataFrame.from_records` las columnas quedan como `object` y las métricas
+numéricas (conformidad, precisión) nunca las ven como números. Los metadatos de
+`/api/views/{id}` traen el tipo de cada columna (`columns[*].dataTypeName`), y
+`coerce_frame` convierte cada columna una sola vez:
+
+- number / double / money / percent -> entero reducido (uint8...int64) si todos los
+  valores son enteros y no hay nulos; float64 en otro caso
+- calendar_date / floating_timestamp / fixed_timestamp / date -> datetime64[ns]
+- checkbox -> bool (o `boolean` si hay nulos)
+- text, url, point, location... -> sin cambios (`_optimize_dtypes` convierte a
+  categoría los textos con pocos valores distintos y los float64 a float32 cuando
+  la conversión no pierde precisión)
+
+La conversión se hace sobre los valores distintos (`pd.factorize`) y se expande por
+códigos. Los textos del vocabulario de faltantes ("N/A", "-", "") pasan a nulo;
+si algún otro valor no se puede convertir, la columna se deja como estaba para
+que las métricas sigan viendo el dato original.
+"""
+import os
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from column_profile import MISSING_VALUE_TOKENS, missing_value_lookup
+
+# Cargar variables de entorno desde .env
+load_dotenv()
+
+COLUMN_TYPES_FROM_METADATA = os.getenv("COLUMN_TYPES_FROM_METADATA", "true").lower() == "true"
+
+# dataTypeName de Socrata -> tipo de conversión
+SOCRATA_TYPE_KINDS = {
+    'number': 'number',
+    'double': 'number',
+    'money': 'number',
+    'percent': 'number',
+    'calendar_date': 'datetime',
+    'floating_timestamp': 'datetime',
+    'fixed_timestamp': 'datetime',
+    'date': 'datetime',
+    'checkbox': 'bool',
+}
+
+_BOOL_VALUES = {'true': True, 'false': False, '1': True, '0': False}
+
+
+def column_types_from_metadata(metadata: Optional[Dict]) -> Dict[str, str]:
+    """Tipo de Socrata (`dataTypeName` en minúsculas) por nombre de campo (`fieldName`)."""
+    types = {}
+    for column in (metadata or {}).get('columns') or []:
+        if not isinstance(column, dict):
+            continue
+        field = column.get('fieldName')
+        data_type = column.get('dataTypeName')
+        if field and data_type:
+            types[str(field)] = str(data_type).lower()
+    return types
+
+
+def _parse_number(values: pd.Series) -> pd.Series:
+    texts = values.map(lambda v: v.strip() if isinstance(v, str) else v)
+    return pd.to_numeric(texts, errors='coerce')
+
+
+def _parse_datetime(values: pd.Series) -> pd.Series:
+    # utc=True admite marcas con desfase; las marcas sin zona conservan su hora
+    parsed = pd.to_datetime(values, format='ISO8601', errors='coerce', utc=True)
+    return pd.Series(parsed.dt.tz_convert(None).to_numpy(), index=values.index)
+
+
+def _parse_bool(values: pd.Series) -> pd.Series:
+    def parse(value):
+        if isinstance(value, (bool, np.bool_)):
+            return bool(value)
+        if isinstance(value, str):
+            return _BOOL_VALUES.get(value.strip().casefold())
+        return None
+    return values.map(parse).astype(object)
+
+
+_PARSERS = {'number': _parse_number, 'datetime': _parse_datetime, 'bool': _parse_bool}
+
+
+def coerce_column(series: pd.Series, data_type: str,
+                  missing_tokens: Iterable[str] = MISSING_VALUE_TOKENS) -> Optional[pd.Series]:
+    """
+    Convierte una columna según su tipo de Socrata.
+
+    Retorna la Serie convertida, o None si el tipo no requiere conversión, la columna
+    ya tiene el tipo esperado o algún valor no se puede convertir.
+    """
+    kind = SOCRATA_TYPE_KINDS.get(data_type)
+    if kind is None or len(series) == 0:
+        return None
+    dtype = series.dtype
+    if ((kind == 'number' and pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype))
+            or (kind == 'datetime' and pd.api.types.is_datetime64_any_dtype(dtype))
+            or (kind == 'bool' and pd.api.types.is_bool_dtype(dtype))):
+        return None
+
+    try:
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    except TypeError:
+        # Celdas no hashables (dict/list): no son valores escalares del tipo declarado
+        return None
+    distinct = pd.Series(np.asarray(uniques, dtype=object))
+    parsed = _PARSERS[kind](distinct)
+    failed = parsed.isna().to_numpy() & ~missing_value_lookup(distinct, missing_tokens)
+    if failed.any():
+        return None
+
+    has_nulls = bool((codes < 0).any() or parsed.isna().any())
+    if kind == 'number':
+        values = np.append(parsed.to_numpy(dtype=np.float64), np.nan)[codes]
+        integral = (not has_nulls and np.isfinite(values).all() and (values == np.floor(values)).all()
+                    and (len(values) == 0 or np.abs(values).max() < 2 ** 63))
+        if integral:
+            downcast = 'unsigned' if len(values) == 0 or values.min() >= 0 else 'integer'
+            return pd.Series(pd.to_numeric(values.astype(np.int64), downcast=downcast),
+                             index=series.index, name=series.name)
+        return pd.Series(values, index=series.index, name=series.name)
+    if kind == 'datetime':
+        values = np.append(parsed.to_numpy(dtype='datetime64[ns]'), np.datetime64('NaT', 'ns'))[codes]
+        return pd.Series(values, index=series.index, name=series.name)
+    values = np.append(parsed.to_numpy(dtype=object), None)[codes]
+    return pd.Series(values, index=series.index, name=series.name,
+                     dtype='boolean' if has_nulls else bool)
+
+
+def coerce_frame(df: pd.DataFrame, metadata: Optional[Dict],
+                 missing_tokens: Iterable[str] = MISSING_VALUE_TOKENS) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """
+    Aplica `coerce_column` a las columnas de `df` con tipo en los metadatos.
+
+    Retorna el DataFrame (el mismo objeto si no hubo cambios) y un dict
+    columna -> dtype resultante de las columnas convertidas.
+    """
+    types = column_types_from_metadata(metadata)
+    if not types or len(df) == 0:
+        return df, {}
+    converted = {}
+    for col in df.columns:
+        data_type = types.get(str(col))
+        if data_type is None:
+            continue
+        try:
+            result = coerce_column(df[col], data_type, missing_tokens)
+        except Exception as e:
+            print(f"⚠️ No se pudo convertir la columna '{col}' ({data_type}): {e}")
+            continue
+        if result is not None:
+            converted[col] = result
+    if not converted:
+        return df, {}
+    df = pd.DataFrame({col: converted.get(col, df[col]) for col in df.columns}, index=df.index)
+    return df, {col: str(values.dtype) for col, values in converted.items()}
@@ -1,17 +1,28 @@
+import asyncio
 import pandas as pd
 import numpy as np
 import requests
 import time
 from datetime import datetime, timedelta
-from typing import Dict, Optional, List
+from typing import Dict, Iterable, Optional, List, Tuple
 import re
 import json
-from sklearn.feature_extraction.text import TfidfVectorizer
+from functools import lru_cache
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from sodapy import Socrata
 import math
 import os
 from dotenv import load_dotenv
+from socrata_loader import SocrataPageLoader
+from socrata_csv import SocrataCsvLoader, load_format_for
+from dataset_cache import dataset_cache, dataset_version
+from gazetteer import fold_series, get_gazetteer
+from column_profile import MISSING_VALUE_TOKENS, ColumnProfile, profile_frame
+from column_types import COLUMN_TYPES_FROM_METADATA, coerce_frame
+from column_projection import metadata_field_names, plan_columns, projection_select
+from sketches import profile_frame_sketch, use_sketches
+from near_duplicates import NEAR_DUP_BANDS, NEAR_DUP_PERMUTATIONS, NEAR_DUP_THRESHOLD, near_duplicated_mask
 
 # Cargar variables de entorno desde .env
 load_dotenv()
@@ -24,6 +35,56 @@ SOCRATA_API_KEY = os.getenv("SOCRATA_API_KEY", "")
 SOCRATA_USERNAME = os.getenv("SOCRATA_USERNAME", "")
 SOCRATA_PASSWORD = os.getenv("SOCRATA_PASSWORD", "")
 
+# Selección SoQL que incluye los campos de sistema (:id, :updated_at, ...) además de las columnas
+SOCRATA_SYSTEM_SELECT = ":*,*"
+
+# Reglas de conformidad por tipo de columna
+CONFORMIDAD_EMAIL_PATTERN = r"[\w\.-]+@[\w\.-]+\.[a-zA-Z]{2,}"
+CONFORMIDAD_RANGOS = {'año': (1900, 2025), 'latitud': (0, 13), 'longitud': (-81, -66)}
+CONFORMIDAD_TIPOS_TEXTO = ('departamento', 'municipio', 'correo')
+# Valores rechazados distintos (los más frecuentes) con sugerencias por columna
+CONFORMIDAD_MAX_SUGERENCIAS = 50
+
+# Exactitud sintáctica: umbral de casi-duplicados, valores distintos evaluados
+# por columna y filas por bloque del producto de similitudes
+EXACTITUD_UMBRAL_SIMILITUD = 0.85
+EXACTITUD_MAX_VALORES_DISTINTOS = 5000
+EXACTITUD_BLOQUE = 512
+
+# Exactitud semántica: similitud mínima entre la descripción de la columna y sus
+# valores, y tamaño del espacio de términos del vectorizador de hashing
+EXACTITUD_SEMANTICA_UMBRAL = 0.3
+EXACTITUD_SEMANTICA_FEATURES = 2 ** 18
+
+# Portabilidad: tabla formato -> clase (muy_portable, medianamente, no_portable)
+# y peso de cada clase en la puntuación cruda
+PORTABILIDAD_FORMATOS_PATH = os.getenv(
+    "PORTABILIDAD_FORMATOS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "formatos_portabilidad.csv"))
+PORTABILIDAD_PESOS = {'muy_portable': 1.0, 'medianamente': 0.5, 'no_portable': 0.0}
+
+
+@lru_cache(maxsize=4)
+def _vectorizador_terminos(n_features: int) -> HashingVectorizer:
+    """
+    Vectorizador de palabras sin estado compartido por el proceso: para una misma
+    configuración, el espacio de términos es el mismo en cualquier dataset.
+    """
+    return HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None)
+
+
+@lru_cache(maxsize=4)
+def _tabla_portabilidad(path: str = PORTABILIDAD_FORMATOS_PATH) -> Dict[str, str]:
+    """
+    Tabla formato -> clase de portabilidad, leída una sola vez por proceso.
+    Las claves se comparan tras `strip()` y sin mayúsculas ("CSV" == "csv").
+    """
+    tabla = pd.read_csv(path, dtype=str, keep_default_na=False)
+    clases_invalidas = set(tabla['clase']) - set(PORTABILIDAD_PESOS)
+    if clases_invalidas:
+        raise ValueError(f"Clases de portabilidad no reconocidas en {path}: {sorted(clases_invalidas)}")
+    return dict(zip(tabla['formato'].str.strip().str.casefold(), tabla['clase']))
+
 class DataQualityCalculator:
     def __init__(self, dataset_url: str, metadata: Optional[Dict] = None):
         # `dataset_url` historically contained the dataset identifier passed
@@ -36,336 +97,335 @@ class DataQualityCalculator:
         self.df_columnas = 0
         self.df_filas = 0
         self.cached_scores = {}
-        
-        # Lista de departamentos colombianos (32 departamentos + Bogotá D.C.)
-        self._colombia_departments = [
-            'Amazonas', 'Antioquia', 'Arauca', 'Atlántico', 'Bogotá D.C.', 'Bolívar', 'Boyacá', 'Caldas',
-            'Caquetá', 'Casanare', 'Cauca', 'Cesar', 'Chocó', 'Córdoba', 'Cundinamarca', 'Guainía',
-            'Guaviare', 'Huila', 'La Guajira', 'Magdalena', 'Meta', 'Nariño', 'Norte de Santander',
-            'Putumayo', 'Quindío', 'Risaralda', 'San Andrés y Providencia', 'Santander', 'Sucre',
-            'Tolima', 'Valle del Cauca', 'Vaupés', 'Vichada'
-        ]
-        
-        # Lista completa de municipios colombianos (1,122 municipios)
-        self._colombia_municipalities = [
-            # AMAZONAS (7 municipios)
-            'Leticia', 'La Pedrera', 'La Chorrera', 'Tarapacá', 'Puerto Alegría', 'Puerto Arica', 'Mirití Paraná',
-            # ANTIOQUIA (125 municipios)
-            'Medellín', 'Abejorral', 'Abriaquí', 'Alejandría', 'Amagá', 'Amalfi', 'Andes', 'Angelópolis', 'Angostura', 
-            'Anori', 'Antioquia', 'Anzá', 'Apartadó', 'Arboletes', 'Archipiélago de San Andrés', 'Arendal', 'Argelia', 
-            'Ariguaní', 'Arredondo', 'Articama', 'Ascope', 'Asturias', 'Atolaima', 'Atrato', 'Autonómico del Cauca', 
-            'Auxilio', 'Avería', 'Ayacucho', 'Bahía Solano', 'Bajo Baudó', 'Balboa', 'Ballesteros', 'Balsa Podrida', 
-            'Baluarte', 'Bamonti', 'Banadía', 'Bancal', 'Bandera', 'Baní', 'Barbacoas', 'Barbosa', 'Barengo', 'Bariloche', 
-            'Baritacualpa', 'Barlovento', 'Barmón', 'Barra de Cispatá', 'Barraco', 'Barragán', 'Barranquilla', 'Barranquillita', 
-            'Barrera', 'Barrerilla', 'Barrio Nuevo', 'Barrió', 'Barrios', 'Barzalosa', 'Basella', 'Básicula', 'Bastidas', 
-            'Bate', 'Bate', 'Batería', 'Batutó', 'Baudó', 'Baudo', 'Baudinillo', 'Bayer', 'Bayonada', 'Bayonazos', 'Bazán', 
-            'Beaudoin', 'Beaumont', 'Bebedero', 'Bececol', 'Becerro', 'Becquerrel', 'Bedoya', 'Beduino', 'Beers', 'Begotá', 
-            'Bejar', 'Bejuquilla', 'Belachú', 'Belahuá', 'Belalcázar', 'Belarmino', 'Belau', 'Belén', 'Beleña', 'Beleño', 
-            'Belgica', 'Belgrano', 'Belia', 'Belice', 'Belich', 'Belida', 'Belidia', 'Belifar', 'Beligrís', 'Belisa', 'Belita', 
-            'Belitrán', 'Beliz', 'Belizaría', 'Belmac', 'Belmar', 'Belmaría', 'Belmares', 'Belmés', 'Belmond', 'Belmondo', 
-            'Belmonte', 'Belmonts', 'Belmora', 'Belmoral', 'Belmorales', 'Belmuñar', 'Belmundo', 'Belnatán', 'Belo', 'Beloña', 
-            'Belón', 'Beltán', 'Beltana', 'Beltanes', 'Beltano', 'Belted', 'Beltenebro', 'Belter', 'Beltería', 'Belteros', 
-            'Beltín', 'Belticama', 'Beltida', 'Beltidor', 'Beltina', 'Beltípolis', 'Beltis', 'Belto', 'Beltol', 'Beltola', 
-            'Beltolla', 'Belton', 'Beltora', 'Beltoral', 'Beltrán', 'Beltrana', 'Beltranas', 'Beltrane', 'Beltraneja', 
-            'Beltranejada', 'Beltranejo', 'Beltranes', 'Beltranica', 'Beltranía', 'Beltraniles', 'Beltranilla', 'Beltranino', 
-            'Beltranismo', 'Beltranísta', 'Beltrano', 'Beltranote', 'Beltranuela', 'Beltri', 'Beltría', 'Beltribí', 'Beltricho', 
-            'Beltrida', 'Beltrigal', 'Beltrigana', 'Beltrígano', 'Beltríguez', 'Beltrimañas', 'Beltrimudo', 'Beltrinca', 
-            'Beltrinela', 'Beltrino', 'Beltripón', 'Beltrisada', 'Beltrisco', 'Beltrisma', 'Beltrisol', 'Beltrisquina', 
-            'Beltrisquío', 'Beltristán', 'Beltrita', 'Beltrizana', 'Beltrizano', 'Beltrizo', 'Beltrocada', 'Beltrocana', 
-            'Beltrocano', 'Beltrocata', 'Beltrocha', 'Beltrochal', 'Beltrochan', 'Beltrochas', 'Beltrochez', 'Beltrochina', 
-            'Beltrochío', 'Beltrocina', 'Beltrocineña', 'Beltrocineño', 'Beltrocín', 'Beltrocina', 'Beltrocío', 'Beltrocir', 
-            'Beltrocís', 'Beltroco', 'Beltrococha', 'Beltrocoches', 'Beltrocol', 'Beltrocola', 'Beltrocolas', 'Beltrocomada', 
-            'Beltrocomán', 'Beltrocomana', 'Beltrocomano', 'Beltrocomarda', 'Beltrocómara', 'Beltrocomaría', 'Beltrocomario',
-            # Simplificar: incluir solo municipios principales conocidos para Antioquia
-            'Bello', 'Caldas', 'Envigado', 'Itaguí', 'La Estrella', 'Sabaneta', 'Copacabana', 'Girardota', 'Barbosa',
-            # ARAUCA
-            'Arauca', 'Arauquita', 'Fortul', 'Puerto Rondón', 'Saravena', 'Tame',
-            # ATLÁNTICO
-            'Barranquilla', 'Malambo', 'Juan de Acosta', 'Luruaco', 'Piojó', 'Polo de Agua', 'Sabanalarga', 'Sabanagrande',
-            'Santa Lucía', 'Santo Tomás', 'Soledad', 'Tubará', 'Usiacurí',
-            # BOLÍVAR
-            'Cartagena', 'Turbaco', 'Turbacó', 'Arjona', 'Calamar', 'Cantaclaro', 'Clemencia', 'Córdoba', 'El Carmen de Bolívar',
-            'El Guamo', 'Magangué', 'Mahates', 'Margarita', 'María la Baja', 'Mompós', 'Montecristo', 'Morales', 'Norosí',
-            'Pinillos', 'Regidor', 'Río Viejo', 'San Cristóbal', 'San Estanislao', 'San Fernando', 'San Jacinto', 'San Jacinto del Cauca',
-            'San Martín de Loba', 'Santa Catalina', 'Santa Cruz de Mompós', 'Santa Rosa', 'Santa Rosa del Sur', 'Santander',
-            'Simití', 'Sincelejo', 'Soplaviento', 'Talaigua Nuevo', 'Tiquisio', 'Tolú', 'Tolú Viejo', 'Villanueva',
-            # BOYACÁ
-            'Tunja', 'Bogotá', 'Duitama', 'Sogamoso', 'Acacías', 'Aquitania', 'Arcabuco', 'Belmira', 'Berbeo', 'Betéitiva',
-            'Boavita', 'Boyacá', 'Briceño', 'Buena Vista', 'Buenavista', 'Bungá', 'Busacá', 'Busbanzá', 'Cabrera', 'Cachipay',
-            'Cacique', 'Cadí', 'Cáchira', 'Caicedo', 'Caicorna', 'Caidá', 'Caima', 'Caína', 'Cairano', 'Cairoca', 'Caita',
-            'Caitano', 'Caití', 'Caitucaná', 'Caja', 'Cajamarca', 'Cajamarquilla', 'Cajamar', 'Cajamarí', 'Cajarí', 'Cajarico',
-            # Simplificar los que faltan...
-            'Cali', 'Palmira', 'Buenaventura',
-            # CALDAS
-            'Manizales', 'Aguadas', 'Anserma', 'Aranzazu', 'Belalcázar', 'Chinchiná', 'Filadelfia', 'La Dorada', 'La Merced',
-            'Marmato', 'Marquetalia', 'Marulanda', 'Neira', 'Norcasia', 'Pácora', 'Pensilvania', 'Riosucio', 'Risaralda', 'Salamina',
-            'Samaná', 'Samana', 'San Félix', 'Supía', 'Villamaría', 'Viterbo',
-            # CAQUETÁ
-            'Florencia', 'Albania', 'Belén de los Andaquíes', 'Cartagena del Chairá', 'Curillo', 'El Doncello', 'El Paujil',
-            'Milán', 'Montañita', 'Morelia', 'Puerto Ricaurte', 'San Andrés de Tumaco', 'San José del Fragua', 'San Vicente del Caguán',
-            'Solano', 'Solita', 'Valparaíso',
-            # CASANARE
-            'Yopal', 'Aguazul', 'Charte', 'Hato Corozal', 'La Salina', 'Maní', 'Monterrey', 'Nunchía', 'Orocué', 'Paz de Ariporo',
-            'Pore', 'Recetor', 'Sabanalarga', 'San Luis de Palenque', 'Tauramena', 'Trinidad', 'Villanueva', 'Viravoltá',
-            # CAUCA
-            'Popayán', 'Almaguer', 'Argelia', 'Balboa', 'Bolívar', 'Buenos Aires', 'Cajibío', 'Caloto', 'Candelaria', 'Capí',
-            'Carlosama', 'Carmen', 'Cartago', 'Cauca', 'Cauldas', 'Cedrón', 'Chasqui', 'Chía', 'Chiapó', 'Chicoral', 'Chilinzó',
-            'Chimán', 'Chinácota', 'Chinó', 'Chipas', 'Chiscas', 'Chita', 'Chíta', 'Chocó', 'Chontales', 'Chopó', 'Choroma',
-            'Choroní', 'Chorreras', 'Chorrillo', 'Chorrillo del Agua', 'Chorrillón', 'Chorrillones', 'Chorros', 'Chorro Blanco',
-            'Chorro Negro', 'Chorrona', 'Chorronales', 'Choroy', 'Choroyos', 'Chorroyuela', 'Chorroyuelas', 'Chorroyuelo',
-            'Chorroyuelos', 'Chorroyuela de Arriba', 'Chorroyuela de Abajo', 'Chorroyuelillas', 'Chorrucha', 'Chorrul',
-            'Chorrulla', 'Chorrullo', 'Chorrul', 'Chorullada', 'Chorulladas', 'Chorullán', 'Chorullana', 'Chorullano',
-            'Chorullera', 'Chorullería', 'Chorullero', 'Chorulleruela', 'Chorullilla', 'Chorulló', 'Chorullón', 'Chorullona',
-            'Chorullonal', 'Chorullonada', 'Chorullonada', 'Chorullonada', 'Chorullonadas', 'Chorullonado', 'Chorullonadora',
-            'Chorullonazo', 'Chorulloncé', 'Chorulloncete', 'Chorullonchón', 'Chorullonería', 'Chorullonete', 'Chorullonez',
-            'Chorullonía', 'Chorullonilla', 'Chorullonilla', 'Chorullonismo', 'Chorullonista', 'Chorullonito', 'Chorullonizador',
-            'Chorullonicé', 'Chorullonicia', 'Chorullonicia', 'Chorullonicio', 'Chorullónica', 'Chorullónico', 'Chorullonida',
-            'Chorullonida', 'Chorullonida', 'Chorullonil', 'Chorullonilla', 'Chorullonismo', 'Chorullonista', 'Chorullonita',
-            # Simplificar a los principales
-            'Cali', 'Palmira', 'Santa Rosa', 'Tuluá', 'Buga',
-            # CESAR
-            'Valledupar', 'Agustín Codazzi', 'Astrea', 'Becerril', 'Boca de Uchire', 'Buherrajá', 'Chimichagua', 'Chiriguaná',
-            'Curumaní', 'El Cocuy', 'El Copey', 'El Paso', 'Gamarra', 'García de la Concepción', 'Gonzalez', 'Hatonuevo',
-            'Hato Nuevo', 'Lagunilla', 'Manaure', 'Mérida', 'Pailitas', 'Paso de la Cruz', 'Paya', 'Pelaya', 'Puebloviejo',
-            'Río de Oro', 'Riohacha', 'Robira', 'Robledo', 'Robles', 'Romero', 'Rosario de Pereira', 'Rosario de Tegua',
-            'Rosario de Timareo', 'Rotavena', 'Rotén', 'Rubiales', 'Rubio', 'Ruíz', 'Ruizgómez', 'Rumichaca', 'Rumichaquilla',
-            'Rumiñahui', 'Rumina', 'Rumiñahui', 'Rut', 'Rutabaga', 'Rutáceo', 'Rutácea', 'Rutáceo', 'Rutáceas', 'Rutación',
-            'Rutácio', 'Rután', 'Rutania', 'Rutanias', 'Rutaniano', 'Rutanias', 'Rutanida', 'Rutanidáceo', 'Rutanídeo', 'Rutanidios',
-            'Rutanidio', 'Rutanidio', 'Rutanidio', 'Ruta Nueva', 'Rutacé', 'Rutáceas', 'Rutáceo', 'Rutácicos', 'Rutácida', 'Rutácida',
-            'Rutácida', 'Rutácida', 'Rutácida', 'Rutácida', 'Rutácida', 'Rutácida', 'Rutácida', 'Rutácida', 'Rutácida', 'Rutácida',
-            # Simplificar
-            'San Juan de Corozal', 'Sintexis', 'Tamalameque',
-            # CHOCÓ
-            'Quibdó', 'Acandí', 'Istmina', 'Bahía Solano', 'Baudó', 'Bojayá', 'Cañalete', 'Cantón de San Pablo',
-            'Capurganá', 'Carmen del Darién', 'Carrillo', 'Cartí', 'Certegui', 'Condoto', 'Guachaca', 'Guacaca', 'Guacamaya',
-            'Guacamayita', 'Guacamayo', 'Guacamayota', 'Guacamayuela', 'Guacamayuelas', 'Guacacales', 'Guacacama', 'Guacacamada',
-            'Guacacamadas', 'Guacacamadilla', 'Guacacamadilla', 'Guacacamadillas', 'Guacacamadillo', 'Guacacamadillos',
-            # Simplificar
-            'Ístueles', 'Juradó', 'Litoral del Darién', 'Lloro', 'Lloretes', 'Lloreretes', 'Lloreretes', 'Lloreretes',
-            'Lloreretes', 'Lloreretes', 'Lloreretes', 'Llorería', 'Llorería', 'Llorería', 'Llorería', 'Llorería',
-            'Llorería', 'Lloreta', 'Lloreta', 'Lloreta', 'Lloreta', 'Lloreta', 'Lloreta', 'Lloretas', 'Lloretas', 'Lloretas',
-            'Lloretas', 'Lloretas', 'Lloretas', 'Lloretas', 'Llorete', 'Llorete', 'Llorete', 'Llorete', 'Llorete', 'Llorete',
-            'Loretes', 'Loretes', 'Loretes', 'Loretes', 'Loretes', 'Loretes', 'Loretes', 'Loretes', 'Lloretes', 'Lloretes',
-            'Llorezuela', 'Llorezuelas', 'Llorezuelas', 'Llorezuelas', 'Llorezuelas', 'Llorezuelas', 'Llorezuelas', 'Llorezuelas',
-            'Llorézuelo', 'Llorézuelos', 'Llorézuelos', 'Llorézuelos', 'Llorézuelos', 'Llorézuelos', 'Llorézuelos', 'Llorézuelos',
-            # Simplificar a los principales
-            'Medellín', 'Rioquito', 'Riosucio', 'San Isidro', 'Sipi', 'Sipí', 'Tado', 'Unguía', 'Untuama', 'Untuamada',
-            'Untúeles', 'Untueles', 'Untueles', 'Untueles', 'Untueles', 'Untueles', 'Untueles', 'Untueles',
-            # CÓRDOBA
-            'Montería', 'Ayapel', 'Buenavista', 'Canalete', 'Cartagena de Indias', 'Carrillo', 'Cartago', 'Cerete',
-            'Cereté', 'Chachagüí', 'Chachagüeta', 'Chachagueta', 'Chachaguetada', 'Chachaguetadas', 'Chachaguetadilla',
-            # Simplificar
-            'Chinú', 'Ciénaga de Oro', 'Claudia', 'Concepción', 'Córdoba', 'Cotocá', 'Cotocada', 'Cotocadas', 'Cotocadilla',
-            # CUNDINAMARCA
-            'Bogotá', 'Soacha', 'Fusagasugá', 'Zipaquirá', 'Facatativá', 'Madrid', 'Girardot', 'Ibagué', 'Cravo Norte',
-            'Acacías', 'Achí', 'Acolman', 'Acombuco', 'Aconcagua', 'Aconchín', 'Aconcito', 'Aconco', 'Aconcuilla', 'Aconcuillas',
-            # GUAINÍA
-            'Inírida', 'Barrancominas', 'Cacahual', 'Matavén', 'Morichal', 'Pana Pana', 'Playa Rica', 'Puerto Colombia',
-            'Samafo', 'San Felipe', 'San Fernando del Atabapo', 'Tomachipán', 'Wacoyo',
-            # GUAVIARE
-            'San José del Guaviare', 'Calamar', 'Mueyu', 'Retorno',
-            # HUILA
-            'Neiva', 'Acevedo', 'Agrado', 'Aipe', 'Algeciras', 'Altamira', 'Baraya', 'Betania', 'Campoalegre', 'Colombia',
-            'Díada', 'El Agrado', 'El Coconuco', 'El Pital', 'Elías', 'Equity', 'Espinal', 'Estancia', 'Estatilla', 'Estatue',
-            'Estebania', 'Estebania', 'Estebania', 'Esteban', 'Estebanez', 'Estebanía', 'Estebanía', 'Estebanía', 'Estebanía',
-            'Estebanía', 'Estebanía', 'Estebanía', 'Estebanía', 'Estebanía', 'Estebanía', 'Estebanía', 'Estebanía', 'Estebanía',
-            # Simplificar
-            'Exaltación de la Cruz', 'Fátima', 'Fátimas', 'Felicidad', 'Feliz', 'Felizardo', 'Felizardo', 'Felizardo', 'Felizardo',
-            'Florencia', 'Forjadores', 'Fórmula', 'Formosa', 'Fornelas', 'Fornelazo', 'Forneletas', 'Fornelía', 'Fornelilla',
-            'Fornelilla', 'Fornelilla', 'Fornelilla', 'Fornelilla', 'Fornelilla', 'Fornelilla', 'Fornelilla', 'Fornelilla',
-            'Fornelilla', 'Fornelilla', 'Fornelina', 'Fornelina', 'Fornelina', 'Fornelina', 'Fornelina', 'Fornelina', 'Fornelina',
-            'Fornelina', 'Fornelina', 'Fornelina', 'Fornelino', 'Fornelino', 'Fornelino', 'Fornelino', 'Fornelino', 'Fornelino',
-            'Fornelino', 'Fornelino', 'Fornelino', 'Fornelino', 'Fornelino', 'Fornelinos', 'Fornelinos', 'Fornelinos',
-            # LA GUAJIRA
-            'Riohacha', 'Albania', 'Barrancas', 'Dibulla', 'Distracción', 'El Molino', 'Fonseca', 'Hatonuevo', 'La Jagua del Pilar',
-            'Maicao', 'Manaure', 'Mayapo', 'Paremalito', 'Parelmina', 'Parelmina', 'Parelmina', 'Parelmina', 'Parelmina',
-            # Simplificar
-            'Parelmina', 'Parelmina', 'Parelmina', 'Parelmina', 'Parelmina', 'Parelmina', 'Parelmina', 'Parelmina',
-            # MAGDALENA
-            'Santa Marta', 'Aracataca', 'Ariguaní', 'Cerro de San Antonio', 'Ciénaga', 'Cienagueta', 'Concordia', 'Copacabana',
-            'Cordobita', 'Cordobita', 'Cordobita', 'Cordobita', 'Cordobita', 'Cordobita', 'Cordobita', 'Cordobita', 'Cordobita',
-            'Cordobita', 'Cordobita', 'Cordobita', 'Cordobita', 'Cordobita', 'Cordobita', 'Cordobita', 'Cordobita', 'Cordobita',
-            # Simplificar
-            'Dibulla', 'Distracción', 'El Banco', 'El Carmen', 'El Retén', 'Fundación', 'Gaira', 'Gairaca', 'Gairacaranda',
-            'Gairacarandada', 'Gairacarandadas', 'Gairacarandadilla', 'Gairacarandadilla', 'Gairacarandadilla', 'Gairacarandadilla',
-            'Gairacarandadilla', 'Gairacarandadilla', 'Gairacarandadilla', 'Gairacarandadilla', 'Gairacarandadilla', 
-            'Gairacarandadilla', 'Gairacarandadilla', 'Gairacarandadilla', 'Gairacarandadilla', 'Gairacarandadilla',
-            # META
-            'Villavicencio', 'Acacías', 'Barranca de Upía', 'Cabuyaro', 'Cajamarquilla', 'Cajonos', 'Calarcá', 'Calamar',
-            'Calamarazo', 'Calamarazos', 'Calamarejo', 'Calamarejos', 'Calamarejo', 'Calamarejo', 'Calamarejo', 'Calamarejo',
-            'Calamarejo', 'Calamarejo', 'Calamarejo', 'Calamarejo', 'Calamarejo', 'Calamarejo', 'Calamarel', 'Calamarera',
-            'Calamarería', 'Calamarero', 'Calamarería', 'Calamareta', 'Calamareta', 'Calamareta', 'Calamareta', 'Calamareta',
-            # NARIÑO
-            'Pasto', 'Albán', 'Aldana', 'Ancuya', 'Ansermanuevo', 'Aponte', 'Arboleda', 'Arenales', 'Arévalo', 'Argelia',
-            'Arieta', 'Asnazú', 'Asunción', 'Atabualpa', 'Ataigualpa', 'Atambos', 'Atanasio Girardot', 'Atardecer', 'Atarigualpa',
-            # PUTUMAYO
-            'Mocoa', 'Colón', 'Leguízamo', 'Orito', 'Puerto Asís', 'Puerto Caicedo', 'Puerto Guzmán', 'Sibundoy', 'Tesalia',
-            'Valle del Guamuez', 'Villagarzón',
-            # QUINDÍO
-            'Armenia', 'Buenavista', 'Calarcá', 'Circasia', 'Córdoba', 'Filandia', 'Génova', 'La Tebaida', 'Montenegro',
-            'Pijao', 'Quimbaya', 'Salento', 'Tebaida',
-            # RISARALDA
-            'Pereira', 'Apia', 'Balboa', 'Belén de Umbría', 'Dosquebradas', 'Guática', 'La Celia', 'La Virginia', 'Marsella',
-            'Mistrato', 'Pueblo Rico', 'Santa Rosa de Cabal', 'Santuario',
-            # SAN ANDRÉS Y PROVIDENCIA
-            'San Andrés', 'Providencia', 'Santa Catalina',
-            # SANTANDER
-            'Bucaramanga', 'Aguada', 'Aguadas', 'Aguadilla', 'Aguadillas', 'Aguadillico', 'Aguadillico', 'Aguadillico', 'Aguadillico',
-            'Aguadillico', 'Aguadillico', 'Aguadillico', 'Aguadillico', 'Aguadillico', 'Aguadillico', 'Aguadillico', 'Aguadillico',
-            'Aguadillico', 'Aguadillico', 'Aguadillico', 'Aguadillico', 'Aguadillicios', 'Aguadillicios', 'Aguadillicios',
-            # Simplificar
-            'Aratoca', 'Barbosa', 'Barichara', 'Barrancabermeja', 'Barrancabermejita', 'Barrancabermejita', 'Barrancabermejita',
-            'Barrancabermejita', 'Barrancabermejita', 'Barrancabermejita', 'Barrancabermejita', 'Barrancabermejita',
-            # SUCRE
-            'Sincelejo', 'Buenavista', 'Caimito', 'Coveñas', 'Corozal', 'El Roble', 'Galeras', 'Guaranda', 'La Unión',
-            'Los Palmitos', 'Majagual', 'Morroa', 'Ovejas', 'Palmito', 'Pavas', 'Peñalosa', 'Piojó', 'Sampués', 'San Benito Abad',
-            'San Juan de Betulia', 'San Marcos', 'San Onofre', 'Santa Lucía', 'Talaigua Nuevo', 'Tolú', 'Tolú Viejo', 'Uchire',
-            'Varela', 'Yaguara', 'Yahorros', 'Yales', 'Yanca', 'Yancanás', 'Yancamás', 'Yancandé', 'Yancané', 'Yancanes',
-            # TOLIMA
-            'Ibagué', 'Alpujarra', 'Ambalema', 'Aniaime', 'Aniáme', 'Aniarita', 'Aníarita', 'Aniaritas', 'Aniaritas', 'Aniario',
-            # Simplificar
-            'Anibicho', 'Anibichada', 'Anibichadas', 'Anibichadilla', 'Anibichado', 'Anibichadora', 'Anibichazo', 'Anibichazos',
-            'Anibichazuela', 'Anibichazuelas', 'Anibichazuelo', 'Anibichazuelos', 'Anibichía', 'Anibichía', 'Anibichía',
-            'Anibichía', 'Anibichía', 'Anibichería', 'Anibichería', 'Anibichería', 'Anibichería', 'Anibichería', 'Anibichería',
-            'Anibichería', 'Anibichería', 'Anibichería', 'Anibichería', 'Anibichería', 'Anibichería', 'Anibichería',
-            'Anibichería', 'Anibichería', 'Anibichería', 'Anibichería', 'Anibichería', 'Anibichería', 'Anibichería',
-            'Anibichería', 'Anibichería', 'Anibichería', 'Anibichería', 'Anibichería', 'Anibichería', 'Anibichería',
-            # VALLE DEL CAUCA
-            'Cali', 'Yumbo', 'Palmira', 'Cartago', 'Tuluá', 'Buga', 'Bubuey', 'Bucaramanga', 'Bucarmanga', 'Bucaramangachí',
-            'Bucaramangachí', 'Bucaramangachí', 'Bucaramangachí', 'Bucaramangachí', 'Bucaramangachí', 'Bucaramangachí',
-            # VAUPÉS
-            'Mitú', 'Caruru', 'Papunaua', 'Taraira', 'Vaupés',
-            # VICHADA
-            'Puerto Carreño', 'La Primavera', 'Santa Rosalía', 'Cumaribo',
-        ]
-        # Normalizar a set para búsquedas rápidas
-        self._colombia_municipalities_set = set(m.title() for m in self._colombia_municipalities)
-
-    async def load_data(self, limit: int = 50000) -> None:
+        # Campos de sistema de Socrata (:id, :updated_at) alineados con self.df.
+        # Se guardan aparte para no alterar las métricas y permiten el refresco incremental.
+        self.system_fields = None
+        self.sync_high_water = None
+        # Columnas descargadas si la carga fue proyectada (None = todas) y límite de filas usado
+        self.loaded_columns = None
+        self.loaded_limit = None
+        # Versión local de los datos: cambia con cada carga o refresco y permite a
+        # los workers de metric_executor reutilizar su copia del DataFrame
+        self.data_version = 0
+        # Frecuencias de valores distintos por columna (ver _value_counts)
+        self._value_counts_cache = {}
+        self._value_counts_key = None
+        # Textos que cuentan como celda faltante en completitud ("", "N/A", "-", "null"...)
+        self.missing_tokens = MISSING_VALUE_TOKENS
+        
+        # Nomenclátor DIVIPOLA compartido por el proceso (departamentos y municipios)
+        self.gazetteer = get_gazetteer()
+
+    async def load_data(self, limit: int = 50000, source: Optional[str] = None,
+                        metrics: Optional[Iterable[str]] = None) -> None:
         """
-        Carga todos los datos del dataset desde Socrata usando paginación optimizada.
+        Carga los datos del dataset desde Socrata.
         
-        Optimizaciones:
+        Por defecto se descarga la exportación CSV en flujo y se analiza a columnas
+        (`SocrataCsvLoader`, pyarrow o motor C de pandas). La API JSON paginada queda
+        como respaldo y puede elegirse por dataset (`LOADER_FORMAT`,
+        `LOADER_JSON_DATASETS` o el argumento `source`).
+        
+        Optimizaciones de la ruta JSON:
         - Carga únicamente hasta el límite especificado
-        - Detiene paginación temprano si detecta última página
+        - Descarga varias páginas en paralelo (SocrataPageLoader) sin bloquear el event loop
+        - Decodifica cada página (gzip) en flujo a columnas y concatena los fragmentos
+        - Pagina por `:id` (`:id > último visto`) en tramos paralelos en lugar de `$offset` profundos
+        - Reintenta cada página de forma independiente y reensambla en orden
         - Usa tipos de datos eficientes para reducir memoria
-        - Realiza operaciones vectorizadas en pandas
+        
+        Si el cargador concurrente falla, se recurre a sodapy ejecutado en un hilo.
+        
+        Si existe una copia en la caché de disco para la misma versión del dataset
+        (`rowsUpdatedAt` de los metadatos), se lee localmente sin tocar la red.
+        
+        Con `metrics` solo se descargan las columnas que leen esas métricas
+        (`column_projection.plan_columns`, `$select` de SoQL); las que falten para
+        otras métricas se agregan después con `ensure_columns`.
         
         Args:
             limit: Número máximo de registros a cargar (por defecto 50000)
+            source: 'csv' o 'json' (None = según la configuración del dataset)
+            metrics: Métricas que se van a calcular (None = todas las columnas)
         """
-        base_url = f"https://www.datos.gov.co/resource/{self.dataset_id}.json"
+        metrics = list(metrics) if metrics is not None else None
+        columns = self.columns_for_metrics(metrics) if metrics is not None else None
+        select = SOCRATA_SYSTEM_SELECT if columns is None else projection_select(columns)
+        if columns is not None:
+            print(f"🎯 Proyección para {', '.join(metrics)}: {len(columns)} de "
+                  f"{len(metadata_field_names(self.metadata))} columnas ({', '.join(columns) or 'solo filas'})")
+
+        version = dataset_version(self.metadata)
+        cached_df = await asyncio.to_thread(dataset_cache.get, self.dataset_id, version, limit, columns)
+        if cached_df is not None:
+            self._set_dataframe(cached_df)
+            self.loaded_columns, self.loaded_limit = columns, limit
+            print(f"💽 Dataset {self.dataset_id} leído de la caché local (versión {version}): "
+                  f"{self.df_filas} filas, {self.df_columnas} columnas")
+            return
+
+        frame = await self._download_frame(limit, select, source)
+
+        if frame is not None and len(frame) > 0:
+            self._set_dataframe(frame)
+            self.loaded_columns, self.loaded_limit = columns, limit
+            print(f"📊 DataFrame cargado: {self.df_filas} filas, {self.df_columnas} columnas")
+            print(f"💾 Memoria usada: {self.df.memory_usage(deep=True).sum() / (1024**2):.2f} MB")
+            await self._store_in_cache(version, limit)
+        else:
+            print("⚠️ No se obtuvieron datos")
+            self._set_dataframe(pd.DataFrame())
+            self.loaded_columns, self.loaded_limit = None, None
+
+    async def _download_frame(self, limit: int, select: str, source: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """Descarga hasta `limit` filas: exportación CSV, API JSON paginada o sodapy como último recurso."""
+        frame = None
+        if (source or load_format_for(self.dataset_id)) == 'csv':
+            try:
+                csv_loader = SocrataCsvLoader(self.dataset_id, self.metadata)
+                frame = await csv_loader.fetch_frame(limit, select=select)
+            except Exception as e:
+                print(f"⚠️ Exportación CSV no disponible ({e}); usando la API JSON")
+
+        if frame is None:
+            try:
+                # Páginas decodificadas en flujo a columnas (sin lista de dicts)
+                loader = SocrataPageLoader(self.dataset_id)
+                frame = await loader.fetch_frame(limit, select=select)
+            except Exception as e:
+                print(f"❌ Error cargando datos con el cargador concurrente: {e}")
+                try:
+                    records = await asyncio.to_thread(self._fetch_records_sodapy, limit, select)
+                except Exception as e2:
+                    print(f"❌ Error obteniendo datos con fallback (sodapy): {e2}")
+                    records = []
+                frame = pd.DataFrame.from_records(records) if records else None
+        return frame
+
+    def columns_for_metrics(self, metrics: Iterable[str]) -> Optional[List[str]]:
+        """Columnas (`fieldName`) que leen las métricas; None = todas (ver column_projection)."""
+        metrics = list(metrics)
+        relevant = self._detect_relevant_columns(self.metadata) if 'conformidad' in metrics else None
+        return plan_columns(metrics, self.metadata, relevant)
+
+    async def ensure_columns(self, metrics: Optional[Iterable[str]], limit: int = 50000) -> List[str]:
+        """
+        Garantiza que el DataFrame residente tenga las columnas que leen `metrics`.
         
-        # print(f"🔗 Obteniendo datos desde: {base_url}")
-        # print(f"📦 Límite configurado: {limit} registros")
+        Sin datos residentes se hace `load_data` con la proyección de esas métricas.
+        Si la carga residente fue proyectada, se descargan solo las columnas que
+        faltan (`$select` con `:id`, las mismas filas) y se unen por `:id`.
         
-        all_data = []
-        offset = 0
-        page_size = 1000  # Máximo por página en Socrata
-        total_obtained = 0
+        Args:
+            metrics: Métricas que se van a calcular (None = todas las columnas)
+            limit: Límite de filas si no hay datos residentes
         
-        try:
-            client = Socrata(
-                SOCRATA_DOMAIN,
-                SOCRATA_API_KEY,
-                username=SOCRATA_USERNAME,
-                password=SOCRATA_PASSWORD,
-            )
-
-            results = client.get(self.dataset_id, limit=limit)
-            # print(f"🎯 Registros obtenidos (sodapy): {len(results)}")
-
-            if results:
-                df = pd.DataFrame.from_records(results)
-                # set dataframe and derived properties
-                self.df = df
-                self.df_filas = len(df)
-                self.df_columnas = len(df.columns)
-                # Try to optimize dtypes if helper exists
-                try:
-                    self._optimize_dtypes()
-                except Exception:
-                    pass
+        Returns:
+            list: Columnas agregadas al DataFrame residente
+        """
+        metrics = list(metrics) if metrics is not None else None
+        if self.df is None or len(self.df) == 0:
+            await self.load_data(limit=limit, metrics=metrics)
+            return list(self.df.columns)
+        if self.loaded_columns is None:
+            return []
+
+        needed = self.columns_for_metrics(metrics) if metrics is not None else None
+        if needed is None:
+            needed = metadata_field_names(self.metadata)
+        loaded = set(self.loaded_columns)
+        missing = [c for c in needed if c not in loaded]
+        if not missing:
+            return []
+
+        limit = max(self.loaded_limit or 0, self.df_filas)
+        if self.system_fields is None or ':id' not in self.system_fields:
+            # Sin :id no hay cómo alinear las filas (p.ej. exportación rows.csv)
+            print("ℹ️ Los datos residentes no tienen :id -> carga completa")
+            previous = set(map(str, self.df.columns))
+            await self.load_data(limit=limit)
+            return [c for c in self.df.columns if str(c) not in previous]
+
+        version = dataset_version(self.metadata)
+        part = await asyncio.to_thread(dataset_cache.get, self.dataset_id, version, limit, missing)
+        if part is None:
+            part = await self._download_frame(limit, projection_select(missing))
+        if part is None or ':id' not in part.columns:
+            print("⚠️ No se pudieron descargar las columnas faltantes por :id -> carga completa")
+            previous = set(map(str, self.df.columns))
+            await self.load_data(limit=limit)
+            return [c for c in self.df.columns if str(c) not in previous]
+
+        # Las columnas nuevas se alinean a las filas residentes por :id
+        ids = self.system_fields[':id']
+        part = part.drop_duplicates(':id').set_index(':id')
+        added = [c for c in missing if c in part.columns and c not in self.df.columns]
+        new_columns = part.reindex(ids.to_numpy())[added]
+        new_columns.index = self.df.index
+        unmatched = int((~ids.isin(part.index)).sum())
+        if unmatched:
+            print(f"⚠️ {unmatched} filas residentes no aparecen en la descarga (quedan nulas en las columnas nuevas)")
+
+        merged = pd.concat([self.df, new_columns, self.system_fields], axis=1)
+        order = {col: i for i, col in enumerate(metadata_field_names(self.metadata))}
+        merged = merged[sorted(merged.columns, key=lambda c: order.get(str(c), len(order)))]
+        self._set_dataframe(merged)
+
+        loaded = [c for c in metadata_field_names(self.metadata) if c in loaded or c in missing]
+        self.loaded_columns = None if len(loaded) == len(order) else loaded
+        print(f"🧩 {len(added)} columnas agregadas por :id a {self.df_filas} filas residentes"
+              + (f": {', '.join(added)}" if added else ""))
+        await self._store_in_cache(version, limit)
+        return added
+
+    async def refresh_data(self, limit: int = 50000) -> Dict:
+        """
+        Refresco incremental: descarga solo las filas con `:updated_at` posterior a la
+        última sincronización (`$where` de SoQL) y las fusiona por `:id` en el
+        DataFrame residente (las filas existentes se reemplazan, las nuevas se agregan).
+        
+        Si no hay datos residentes o no se conoce la marca de sincronización, se
+        realiza una carga completa con `load_data`.
+        
+        Si el delta llega a `limit` filas puede estar truncado (las filas que quedaron
+        fuera pueden tener un `:updated_at` menor que el máximo recibido y la nueva marca
+        las saltaría para siempre): en ese caso se hace una carga completa.
+        
+        Nota: las filas eliminadas en Socrata no aparecen en el delta y se conservan.
+        
+        Args:
+            limit: Máximo de filas del delta a descargar
+        
+        Returns:
+            dict: modo usado ('full' o 'delta'), filas actualizadas/nuevas y marca de sincronización
+        """
+        if (self.df is None or len(self.df) == 0 or self.system_fields is None
+                or ':id' not in self.system_fields or not self.sync_high_water):
+            print("ℹ️ Sin datos residentes o sin marca de sincronización -> carga completa")
+            await self.load_data(limit=limit)
+            return {'mode': 'full', 'updated_rows': 0, 'new_rows': self.df_filas,
+                    'high_water_mark': self.sync_high_water}
+
+        previous_mark = self.sync_high_water
+        where = f":updated_at > '{previous_mark}'"
+        print(f"🔄 Refresco incremental de {self.dataset_id}: {where}")
+        # Una carga proyectada se refresca con las mismas columnas
+        select = SOCRATA_SYSTEM_SELECT if self.loaded_columns is None else projection_select(self.loaded_columns)
+        loader = SocrataPageLoader(self.dataset_id)
+        delta = await loader.fetch_frame(limit, select=select, where=where)
+
+        if len(delta) == 0:
+            print("✅ Sin cambios desde la última sincronización")
+            return {'mode': 'delta', 'updated_rows': 0, 'new_rows': 0,
+                    'high_water_mark': self.sync_high_water}
+
+        if len(delta) >= limit:
+            print(f"⚠️ El delta alcanzó el límite ({limit} filas) y puede estar incompleto -> carga completa")
+            await self.load_data(limit=limit)
+            self.cached_scores = {}
+            return {'mode': 'full', 'updated_rows': 0, 'new_rows': self.df_filas,
+                    'high_water_mark': self.sync_high_water}
+
+        current = pd.concat([self.df, self.system_fields], axis=1)
+
+        current_ids = current[':id']
+        delta_ids = delta[':id']
+        updated_mask = delta_ids.isin(current_ids)
+        updated_rows = int(updated_mask.sum())
+        new_ids = delta_ids[~updated_mask]
+
+        # Upsert por :id conservando el orden original y agregando las filas nuevas al final
+        ordered_ids = pd.concat([current_ids, new_ids], ignore_index=True)
+        merged = pd.concat(
+            [current[~current_ids.isin(delta_ids)], delta],
+            ignore_index=True
+        )
+        merged = merged.set_index(':id', drop=False).reindex(ordered_ids).reset_index(drop=True)
+        # Las columnas categóricas pierden sus categorías al mezclar valores nuevos
+        merged = merged.astype({c: object for c in merged.columns if isinstance(merged[c].dtype, pd.CategoricalDtype)})
 
-                # print(f"📊 DataFrame cargado en calculador: {self.df_filas} filas, {self.df_columnas} columnas")
-                return
-            else:
-                # print("⚠️ No se obtuvieron datos desde Socrata (sodapy)")
-                self.df = pd.DataFrame()
-                self.df_filas = 0
-                self.df_columnas = 0
-                return
-                
+        self._set_dataframe(merged)
+        print(f"📊 Delta aplicado: {updated_rows} filas actualizadas, {len(new_ids)} nuevas "
+              f"(marca {previous_mark} -> {self.sync_high_water})")
+        self.cached_scores = {}
+
+        await self._store_in_cache(dataset_version(self.metadata), max(limit, self.df_filas))
+        return {'mode': 'delta', 'updated_rows': updated_rows, 'new_rows': int(len(new_ids)),
+                'high_water_mark': self.sync_high_water}
+
+    async def _store_in_cache(self, version: Optional[str], limit: int) -> None:
+        """Guarda el DataFrame (con sus campos de sistema) en la caché de disco."""
+        try:
+            frame = self.df
+            if self.system_fields is not None:
+                frame = pd.concat([self.df, self.system_fields], axis=1)
+            await asyncio.to_thread(dataset_cache.put, self.dataset_id, version, limit, frame,
+                                    self.loaded_columns)
         except Exception as e:
-            # print(f"❌ Error cargando datos con sodapy: {e}")
-            # Fallback a requests si sodapy falla
+            print(f"⚠️ No se pudo guardar el dataset en la caché local: {e}")
+
+    def _fetch_records_sodapy(self, limit: int, select: str = SOCRATA_SYSTEM_SELECT) -> List[Dict]:
+        """Descarga bloqueante con sodapy (fallback, se ejecuta fuera del event loop)."""
+        client = Socrata(
+            SOCRATA_DOMAIN,
+            SOCRATA_API_KEY,
+            username=SOCRATA_USERNAME,
+            password=SOCRATA_PASSWORD,
+        )
+        return client.get(self.dataset_id, limit=limit, select=select)
+
+    def _set_dataframe(self, df: pd.DataFrame) -> None:
+        """
+        Asigna el DataFrame cargado y sus propiedades derivadas.
+        
+        Los campos de sistema de Socrata (columnas que empiezan por ':') se separan
+        en `self.system_fields` y se actualiza la marca de sincronización
+        (máximo `:updated_at`) usada por `refresh_data`.
+        
+        Antes de optimizar los dtypes, las columnas se convierten según su tipo en
+        los metadatos (`column_types.coerce_frame`): Socrata entrega los valores como texto.
+        """
+        system_cols = [c for c in df.columns if str(c).startswith(':')]
+        if system_cols:
+            self.system_fields = df[[c for c in (':id', ':updated_at') if c in df.columns]].copy()
+            df = df.drop(columns=system_cols)
+            if ':updated_at' in self.system_fields and len(self.system_fields) > 0:
+                # Formato ISO 8601: el orden lexicográfico coincide con el cronológico
+                self.sync_high_water = str(self.system_fields[':updated_at'].dropna().astype(str).max())
+        else:
+            self.system_fields = None
+            self.sync_high_water = None
+        if COLUMN_TYPES_FROM_METADATA and len(df) > 0:
+            # Tipos declarados en los metadatos (number, calendar_date, checkbox...)
+            df, converted = coerce_frame(df, self.metadata, self.missing_tokens)
+            if converted:
+                print(f"🔤 {len(converted)} columnas tipadas desde los metadatos: "
+                      + ", ".join(f"{col}={dtype}" for col, dtype in converted.items()))
+        self.df = df
+        self.data_version += 1
+        if len(df) > 0:
+            # Try to optimize dtypes if helper exists
             try:
-                while offset < limit:
-                    url = f"{base_url}?$limit={page_size}&$offset={offset}"
-                    print(f"📄 Solicitando página: offset={offset}, limit={page_size}")
-                    
-                    response = requests.get(url, timeout=10)
-                    if response.status_code == 200:
-                        page_data = response.json()
-                        records_in_page = len(page_data)
-                        all_data.extend(page_data)
-                        total_obtained += records_in_page
-                        
-                        print(f"✅ Página obtenida: {records_in_page} registros (total: {total_obtained})")
-                        
-                        # Si obtenemos menos registros que el page_size, es la última página
-                        if records_in_page < page_size:
-                            print(f"🏁 Última página alcanzada. Total: {total_obtained} registros")
-                            break
-                        
-                        # Si hemos alcanzado el límite, detener
-                        if total_obtained >= limit:
-                            print(f"⚠️  Límite de {limit} registros alcanzado")
-                            break
-                        
-                        offset += page_size
-                        time.sleep(0.05)  # Reducida la pausa
-                        
-                    else:
-                        print(f"❌ Error en página {offset}: {response.status_code}")
-                        break
-                        
-                print(f"🎯 Total de registros obtenidos: {len(all_data)}")
-                
-                if all_data:
-                    # Crear DataFrame con tipos de datos optimizados
-                    self.df = pd.DataFrame(all_data)
-                    
-                    # Optimizar tipos de datos para reducir memoria
-                    self._optimize_dtypes()
-                    
-                    self.df_filas = len(self.df)
-                    self.df_columnas = len(self.df.columns)
-                    print(f"📊 DataFrame cargado: {self.df_filas} filas, {self.df_columnas} columnas")
-                    print(f"💾 Memoria usada: {self.df.memory_usage(deep=True).sum() / (1024**2):.2f} MB")
-                else:
-                    print("⚠️ No se obtuvieron datos")
-                    self.df = pd.DataFrame()
-                    self.df_filas = 0
-                    self.df_columnas = 0
-                    
-            except Exception as e2:
-                print(f"❌ Error obteniendo datos con fallback: {e2}")
-                self.df = pd.DataFrame()
-                self.df_filas = 0
-                self.df_columnas = 0
+                self._optimize_dtypes()
+            except Exception:
+                pass
+        self.df_filas = len(self.df)
+        self.df_columnas = len(self.df.columns)
+
     def _optimize_dtypes(self) -> None:
         """
         Optimiza los tipos de datos del DataFrame para reducir memoria y mejorar velocidad.
         Convierte strings largos a categorías cuando es apropiado.
         """
+        profiles = self.column_profile()
         for col in self.df.columns:
             col_type = self.df[col].dtype
+            profile = profiles[col]
             
             # Optimizar objetos (strings)
             if col_type == 'object':
-                num_unique = self.df[col].nunique()
-                num_total = len(self.df[col])
+                num_unique = profile.distinct_count
+                num_total = profile.rows
                 
                 # Si menos del 5% son valores únicos, convertir a categoría
                 if num_unique / num_total < 0.05 and num_unique < 1000:
@@ -373,8 +433,8 @@ class DataQualityCalculator:
             
             # Optimizar números enteros
             elif col_type == 'int64':
-                col_min = self.df[col].min()
-                col_max = self.df[col].max()
+                col_min = profile.min
+                col_max = profile.max
                 
                 if col_min >= 0 and col_max < 256:
                     self.df[col] = self.df[col].astype('uint8')
@@ -383,9 +443,54 @@ class DataQualityCalculator:
                 elif col_min >= -32768 and col_max < 32768:
                     self.df[col] = self.df[col].astype('int16')
             
-            # Optimizar números flotantes
+            # Optimizar números flotantes: solo si float32 conserva todos los valores
+            # (NIT, montos y códigos grandes pierden dígitos en float32)
             elif col_type == 'float64':
-                self.df[col] = self.df[col].astype('float32')
+                values = self.df[col].to_numpy()
+                reduced = values.astype(np.float32)
+                if np.array_equal(reduced.astype(np.float64), values, equal_nan=True):
+                    self.df[col] = reduced
+
+            # Los conteos del perfil no cambian con la conversión; solo el dtype
+            profile.dtype = str(self.df[col].dtype)
+
+    def column_profile(self) -> Dict[str, ColumnProfile]:
+        """
+        Perfil de todas las columnas (nulos, vacíos, distintos, min/max, varianza,
+        longitudes), calculado en una pasada y cacheado por versión de los datos.
+
+        Con muchas filas (ver `PROFILE_SKETCHES` / `PROFILE_SKETCH_MIN_ROWS`) el perfil
+        se construye con sketches en memoria acotada: distintos por HyperLogLog y
+        valores frecuentes por Space-Saving (`profile.sketch`).
+        """
+        missing_tokens = frozenset(getattr(self, 'missing_tokens', MISSING_VALUE_TOKENS))
+        data_key = (self.data_version, id(self.df), missing_tokens)
+        cached = getattr(self, '_profile_cache', None)
+        if cached is not None and cached[0] == data_key:
+            return cached[1]
+        if self.df is None:
+            profiles = {}
+        elif use_sketches(len(self.df)):
+            profiles = profile_frame_sketch(self.df, missing_tokens=missing_tokens)
+        else:
+            profiles = profile_frame(self.df, missing_tokens)
+        self._profile_cache = (data_key, profiles)
+        return profiles
+
+    def missing_bitmap(self) -> pd.DataFrame:
+        """
+        Máscara booleana (filas x columnas) de celdas faltantes: nulos reales más los
+        textos de `self.missing_tokens`. Sale del perfil de columnas, así que se
+        calcula una vez por versión de los datos.
+        """
+        profiles = self.column_profile()
+        cached = getattr(self, '_missing_bitmap_cache', None)
+        if cached is not None and cached[0] is profiles:
+            return cached[1]
+        index = self.df.index if self.df is not None else None
+        bitmap = pd.DataFrame({col: p.missing_mask for col, p in profiles.items()}, index=index)
+        self._missing_bitmap_cache = (profiles, bitmap)
+        return bitmap
 
     def _convertir_frecuencia_a_dias(self, frecuencia) -> Optional[float]:
         """
@@ -1163,16 +1268,14 @@ class DataQualityCalculator:
         total_valores_validados = 0
         num_valores_incorrectos = 0
 
-        for col in self.df.columns:
-            if self.df[col].dtype in ['int64', 'float64']:
-                valores_negativos_incorrectos = ((self.df[col] < 0) & self.df[col].notna()).sum()
-                num_valores_incorrectos += valores_negativos_incorrectos
-                total_valores_validados += self.df[col].notna().sum()
+        for profile in self.column_profile().values():
+            if profile.is_numeric:
+                num_valores_incorrectos += profile.negative_count
+                total_valores_validados += profile.non_null
 
-            elif self.df[col].dtype == 'object':
-                valores_vacios = (self.df[col].str.strip() == '').sum()
-                num_valores_incorrectos += valores_vacios
-                total_valores_validados += self.df[col].notna().sum()
+            elif profile.dtype == 'object':
+                num_valores_incorrectos += profile.empty_count
+                total_valores_validados += profile.non_null
 
         if total_valores_validados == 0:
             return 10.0
@@ -1184,15 +1287,15 @@ class DataQualityCalculator:
 
     def _fetch_colombia_departments(self) -> List[str]:
         """
-        Retorna la lista de departamentos colombianos (lista local, sin API).
+        Retorna la lista de departamentos colombianos (nomenclátor local, sin API).
         """
-        return sorted([d.title() for d in self._colombia_departments])
+        return sorted(self.gazetteer.department_titles)
 
     def _fetch_colombia_municipalities(self) -> set:
         """
-        Retorna el set de municipios colombianos (lista local, sin API).
+        Retorna el set de municipios colombianos (nomenclátor local, sin API).
         """
-        return self._colombia_municipalities_set
+        return self.gazetteer.municipality_titles
 
     def _detect_relevant_columns(self, metadata: Optional[Dict] = None) -> Dict[str, List[str]]:
         """
@@ -1244,12 +1347,174 @@ class DataQualityCalculator:
 
         return detected
 
-    def calculate_conformidad_from_metadata_and_data(self, metadata: Optional[Dict] = None, verbose: bool = True) -> float:
+    def _value_counts(self, col) -> pd.Series:
+        """
+        Frecuencia de cada valor distinto (sin nulos) de una columna, o de cada
+        combinación distinta si `col` es una tupla de columnas.
+
+        Las validaciones por valor (conformidad, exactitud sintáctica) evalúan cada
+        valor distinto una vez y ponderan por estas frecuencias, de modo que el costo
+        depende de la cardinalidad y no del número de filas. Se cachea por columna y
+        versión de datos.
+
+        Si el perfil usa sketches (datasets muy grandes) retorna los `PROFILE_SKETCH_TOP_K`
+        valores más frecuentes con sus conteos aproximados en lugar de la tabla completa.
+        """
+        data_key = (self.data_version, id(self.df))
+        if self._value_counts_key != data_key:
+            self._value_counts_cache = {}
+            self._value_counts_key = data_key
+
+        counts = self._value_counts_cache.get(col)
+        if counts is None:
+            if isinstance(col, tuple):
+                # Combinaciones distintas de varias columnas (p.ej. departamento/municipio)
+                frame = self.df[list(col)]
+                try:
+                    counts = frame.groupby(list(col), observed=True, sort=False, dropna=True).size()
+                except TypeError:
+                    counts = frame.dropna().astype(str).groupby(list(col), sort=False).size()
+                self._value_counts_cache[col] = counts
+                return counts
+            profile = self.column_profile().get(col) if use_sketches(len(self.df)) else None
+            if profile is not None and profile.sketch is not None:
+                # Perfil con sketches: solo los valores más frecuentes (Space-Saving)
+                counts = profile.sketch.heavy_hitters.top()
+                self._value_counts_cache[col] = counts
+                return counts
+            series = self.df[col]
+            try:
+                counts = series.value_counts(dropna=True, sort=False)
+            except TypeError:
+                # Celdas no hashables (listas/dicts anidados): se comparan como texto
+                counts = series.dropna().astype(str).value_counts(sort=False)
+            # Las categorías sin filas no cuentan como valores presentes
+            counts = counts[counts > 0]
+            self._value_counts_cache[col] = counts
+        return counts
+
+    def _conformidad_error_mask(self, ctype: str, values: pd.Series, departments_ref: set,
+                                municipalities_ref: Optional[set]) -> pd.Series:
+        """
+        Máscara booleana de los valores (sin nulos, normalmente los valores distintos
+        de la columna) que NO cumplen la regla del tipo de columna.
+
+        Reglas (vectorizadas con pandas):
+        - departamento / municipio: texto normalizado (strip + title) presente en la referencia
+        - año: entero entre 1900 y 2025 (el texto "2020.0" no es un año válido; el número
+          2020.0 sí, porque las columnas de enteros con nulos se tipan como float)
+        - latitud / longitud: número dentro del rango de Colombia
+        - correo: coincide completamente con CONFORMIDAD_EMAIL_PATTERN
+        """
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Regla evaluada una vez por categoría y propagada a las filas por código
+            cat_mask = self._conformidad_error_mask(ctype, pd.Series(values.cat.categories),
+                                                    departments_ref, municipalities_ref)
+            return pd.Series(cat_mask.to_numpy()[values.cat.codes.to_numpy()], index=values.index)
+
+        if (ctype in CONFORMIDAD_RANGOS and pd.api.types.is_numeric_dtype(values.dtype)
+                and not pd.api.types.is_bool_dtype(values.dtype)):
+            # Los límites son enteros representables en float32/float64, así que comparar
+            # el número equivale a comparar float(str(v)) como hacía la validación por celda
+            low, high = CONFORMIDAD_RANGOS[ctype]
+            if ctype == 'año' and not pd.api.types.is_integer_dtype(values.dtype):
+                # Una columna `number` de enteros con nulos se tipa como float en la ingesta
+                # (column_types.coerce_column): solo los valores con parte decimal son errores
+                fraccionario = ~(np.isfinite(values) & (values == np.floor(values)))
+                return fraccionario | (values < low) | (values > high)
+            return (values < low) | (values > high)
+
+        text = values.astype(str).str.strip()
+
+        if ctype == 'departamento':
+            return ~text.str.title().isin(departments_ref)
+        if ctype == 'municipio':
+            return ~text.str.title().isin(municipalities_ref)
+        if ctype == 'correo':
+            return ~text.str.fullmatch(CONFORMIDAD_EMAIL_PATTERN).fillna(False).astype(bool)
+
+        low, high = CONFORMIDAD_RANGOS[ctype]
+        if ctype == 'año':
+            parseable = text.str.fullmatch(r"[+-]?\d+").fillna(False).astype(bool)
+            numbers = pd.to_numeric(text.where(parseable), errors='coerce')
+        else:
+            numbers = pd.to_numeric(text, errors='coerce')
+            # float("nan") es un número válido fuera de toda comparación de rango
+            parseable = numbers.notna() | text.str.lower().isin(['nan', '+nan', '-nan'])
+        out_of_range = (numbers < low) | (numbers > high)
+        return ~parseable | out_of_range
+
+    def _gazetteer_suggestions(self, ctype: str, counts: pd.Series, error_mask: np.ndarray, top_k: int) -> Dict:
+        """
+        Sugerencias del nomenclátor para los valores distintos rechazados de una columna.
+
+        - accent_only_errors: errores cuyo valor coincide con un nombre válido al ignorar
+          tildes y mayúsculas (p.ej. "Medellin"); real_errors: el resto
+        - suggestions: valor rechazado -> top-k nombres válidos (índice de trigramas), para
+          los CONFORMIDAD_MAX_SUGERENCIAS valores rechazados más frecuentes
+        """
+        if ctype == 'departamento':
+            index, valid_keys = self.gazetteer.department_index, self.gazetteer.department_keys
+        else:
+            index, valid_keys = self.gazetteer.municipality_index, self.gazetteer.municipality_keys
+
+        bad_values = counts.index[error_mask]
+        bad_counts = counts.to_numpy()[error_mask]
+        folded = fold_series(pd.Series(bad_values))
+        accent_only = folded.isin(valid_keys.keys()).to_numpy()
+        accent_errors = int(bad_counts[accent_only].sum())
+
+        suggestions = {}
+        for i in np.argsort(-bad_counts, kind='stable')[:CONFORMIDAD_MAX_SUGERENCIAS]:
+            suggestions[str(bad_values[i])] = [name for name, _ in index.search(folded.iat[i], top_k)]
+
+        return {
+            'accent_only_errors': accent_errors,
+            'real_errors': int(bad_counts.sum()) - accent_errors,
+            'suggestions': suggestions,
+        }
+
+    def _validate_department_municipality(self, dept_col: str, muni_col: str) -> Dict:
+        """
+        Valida que cada municipio pertenezca al departamento de su fila (jerarquía DIVIPOLA).
+
+        Se evalúan solo los pares distintos (ponderados por su frecuencia) con un
+        único `isin` contra `gazetteer.pair_index`. Los pares cuyo departamento o
+        municipio no se reconocen no se cuentan aquí: ya son errores de las reglas
+        por columna. La comparación ignora tildes y mayúsculas.
+        """
+        result = {'column': f"{dept_col} / {muni_col}", 'type': 'departamento_municipio',
+                  'total': 0, 'errors': 0, 'examples': []}
+        counts = self._value_counts((dept_col, muni_col))
+        if len(counts) == 0:
+            return result
+
+        pairs = counts.index.to_frame(index=False)
+        dept_codes = fold_series(pairs.iloc[:, 0]).map(self.gazetteer.department_keys)
+        muni_keys = fold_series(pairs.iloc[:, 1])
+        known = (dept_codes.notna() & muni_keys.isin(self.gazetteer.municipality_keys.keys())).to_numpy()
+        in_hierarchy = pd.MultiIndex.from_arrays([dept_codes.fillna(''), muni_keys]).isin(self.gazetteer.pair_index)
+        error_mask = known & ~in_hierarchy
+
+        frequencies = counts.to_numpy()
+        result['total'] = int(frequencies[known].sum())
+        result['errors'] = int(frequencies[error_mask].sum())
+        if result['errors']:
+            rows = self.df[[dept_col, muni_col]]
+            bad_rows = rows[pd.MultiIndex.from_frame(rows).isin(counts.index[error_mask])].head(5)
+            result['examples'] = [f"{d} / {m}" for d, m in bad_rows.astype(str).itertuples(index=False)]
+        return result
+
+    def calculate_conformidad_from_metadata_and_data(self, metadata: Optional[Dict] = None, verbose: bool = True,
+                                                     suggestions: bool = False, top_k: int = 3) -> float:
         """
         Implementación mejorada de Conformidad.
         - Si NO se detectan columnas relevantes, retorna 10.0 (ÉXITO)
         - Si hay columnas relevantes, valida valores y retorna score basado en errores
         - Retorna score en rango 0-1 (math.exp(-5 * (errores/total_validos)))
+        - Con `suggestions=True`, las columnas de departamento/municipio incluyen en sus
+          detalles los `top_k` nombres válidos más parecidos a cada valor rechazado y
+          cuántos errores son solo de tildes/mayúsculas frente a errores reales
         """
         metadata = metadata or self.metadata or {}
 
@@ -1271,22 +1536,13 @@ class DataQualityCalculator:
             return 0.0
 
         # Obtener referencias locales (sin API)
-        departments_ref = set(self._fetch_colombia_departments())
+        departments_ref = self.gazetteer.department_titles
         municipalities_ref = self._fetch_colombia_municipalities()
 
-        email_re = re.compile(r"^[\w\.-]+@[\w\.-]+\.[a-zA-Z]{2,}$")
-
         total_valids = 0
         total_errors = 0
         per_column = []
 
-        # Helper to normalize text
-        def normalize_title(v):
-            try:
-                return str(v).strip().title()
-            except Exception:
-                return str(v).strip()
-
         # For each detected column type, validate values
         for ctype, cols in detected.items():
             for col in cols:
@@ -1294,94 +1550,60 @@ class DataQualityCalculator:
                 if col_series is None:
                     continue
 
-                non_null_mask = col_series.notna()
-                col_values = col_series[non_null_mask]
-                total = int(col_values.shape[0])
-                errors = 0
-                bad_examples = []
+                # Cada valor distinto se valida una sola vez y los errores se
+                # ponderan por su frecuencia en la columna
+                counts = self._value_counts(col)
+                total = int(counts.sum())
 
                 if total == 0:
                     per_column.append({'column': col, 'type': ctype, 'total': 0, 'errors': 0, 'examples': []})
                     continue
 
-                if ctype == 'departamento':
-                    for v in col_values.astype(str):
-                        total_valids += 1
-                        nv = normalize_title(v)
-                        if nv not in departments_ref:
-                            errors += 1
-                            if len(bad_examples) < 5:
-                                bad_examples.append(v)
-
-                elif ctype == 'municipio':
-                    # Municipios siempre disponibles (lista local)
-                    if municipalities_ref is None:
-                        if verbose:
-                            print(f"ℹ️ Municipios no disponibles; saltando columna {col}")
-                        continue
-                    for v in col_values.astype(str):
-                        total_valids += 1
-                        nv = normalize_title(v)
-                        if nv not in municipalities_ref:
-                            errors += 1
-                            if len(bad_examples) < 5:
-                                bad_examples.append(v)
-
-                elif ctype == 'año':
-                    for v in col_values:
-                        total_valids += 1
-                        try:
-                            n = int(str(v).strip())
-                            if n < 1900 or n > 2025:
-                                errors += 1
-                                if len(bad_examples) < 5:
-                                    bad_examples.append(v)
-                        except Exception:
-                            errors += 1
-                            if len(bad_examples) < 5:
-                                bad_examples.append(v)
-
-                elif ctype == 'latitud':
-                    for v in col_values:
-                        total_valids += 1
-                        try:
-                            f = float(str(v).strip())
-                            if f < 0 or f > 13:
-                                errors += 1
-                                if len(bad_examples) < 5:
-                                    bad_examples.append(v)
-                        except Exception:
-                            errors += 1
-                            if len(bad_examples) < 5:
-                                bad_examples.append(v)
-
-                elif ctype == 'longitud':
-                    for v in col_values:
-                        total_valids += 1
-                        try:
-                            f = float(str(v).strip())
-                            if f < -81 or f > -66:
-                                errors += 1
-                                if len(bad_examples) < 5:
-                                    bad_examples.append(v)
-                        except Exception:
-                            errors += 1
-                            if len(bad_examples) < 5:
-                                bad_examples.append(v)
-
-                elif ctype == 'correo':
-                    for v in col_values.astype(str):
-                        total_valids += 1
-                        if not email_re.match(v.strip()):
-                            errors += 1
-                            if len(bad_examples) < 5:
-                                bad_examples.append(v)
+                # Municipios siempre disponibles (lista local)
+                if ctype == 'municipio' and municipalities_ref is None:
+                    if verbose:
+                        print(f"ℹ️ Municipios no disponibles; saltando columna {col}")
+                    continue
 
+                error_mask = self._conformidad_error_mask(ctype, pd.Series(counts.index),
+                                                          departments_ref, municipalities_ref).to_numpy()
+                errors = int(counts.to_numpy()[error_mask].sum())
+                bad_examples = []
+                if errors:
+                    # Los ejemplos son las primeras filas con un valor erróneo, en orden de aparición
+                    bad_rows = col_series[col_series.isin(counts.index[error_mask])].head(5)
+                    if ctype in CONFORMIDAD_TIPOS_TEXTO:
+                        bad_rows = bad_rows.astype(str)
+                    bad_examples = bad_rows.tolist()
+
+                total_valids += total
                 total_errors += errors
-                per_column.append({'column': col, 'type': ctype, 'total': total, 'errors': errors, 'examples': bad_examples})
+                column_detail = {'column': col, 'type': ctype, 'total': total, 'errors': errors, 'examples': bad_examples}
+                profile = self.column_profile().get(col) if use_sketches(len(self.df)) else None
+                if profile is not None and profile.approximate:
+                    # Solo se validaron los valores más frecuentes del sketch
+                    column_detail['approximate'] = True
+                    column_detail['coverage'] = round(min(1.0, total / profile.non_null), 4) if profile.non_null else 0.0
+                if suggestions and ctype in ('departamento', 'municipio'):
+                    column_detail.update(self._gazetteer_suggestions(ctype, counts, error_mask, top_k))
+                per_column.append(column_detail)
                 if verbose:
                     print(f"   → Columna='{col}' ({ctype}): validados={total}, errores={errors}")
 
+        # Regla jerárquica: el municipio debe pertenecer al departamento de la misma fila
+        if detected['departamento'] and detected['municipio']:
+            dept_col = next((c for c in detected['departamento'] if c in self.df.columns), None)
+            for muni_col in detected['municipio']:
+                if dept_col is None or muni_col not in self.df.columns or muni_col == dept_col:
+                    continue
+                pair_result = self._validate_department_municipality(dept_col, muni_col)
+                total_valids += pair_result['total']
+                total_errors += pair_result['errors']
+                per_column.append(pair_result)
+                if verbose:
+                    print(f"   → Columnas='{dept_col}'/'{muni_col}' (departamento_municipio): "
+                          f"validados={pair_result['total']}, errores={pair_result['errors']}")
+
         if total_valids == 0:
             if verbose:
                 print("⚠️ No hay valores válidos para calcular conformidad")
@@ -1400,6 +1622,8 @@ class DataQualityCalculator:
             'total_errors': total_errors,
             'error_rate': proporcion_errores
         }
+        if suggestions:
+            details['total_accent_only_errors'] = sum(c.get('accent_only_errors', 0) for c in per_column)
 
         # Guardar en cache
         self.cached_scores['conformidad_advanced'] = {'score': score, 'details': details}
@@ -1418,27 +1642,54 @@ class DataQualityCalculator:
         except:
             return 0.0
 
+    def _tiene_valores_similares(self, col) -> bool:
+        """
+        Indica si una columna tiene dos valores distintos casi iguales
+        (similitud coseno > EXACTITUD_UMBRAL_SIMILITUD).
+
+        Índice de casi-duplicados: un único TF-IDF de n-gramas de caracteres ajustado
+        sobre los valores distintos normalizados de la columna (los
+        EXACTITUD_MAX_VALORES_DISTINTOS más frecuentes) y producto disperso por
+        bloques de filas contra toda la matriz, con salida temprana en el primer par
+        que supera el umbral. Reemplaza el ajuste de un TF-IDF por cada par de valores.
+        """
+        counts = self._value_counts(col)
+        if len(counts) > EXACTITUD_MAX_VALORES_DISTINTOS:
+            counts = counts.nlargest(EXACTITUD_MAX_VALORES_DISTINTOS)
+        valores = [str(v).lower().strip() for v in counts.index]
+
+        # Dos valores que solo difieren en mayúsculas o espacios son idénticos tras normalizar
+        valores_distintos = list(dict.fromkeys(valores))
+        if len(valores_distintos) < len(valores):
+            return True
+        if len(valores_distintos) < 2:
+            return False
+
+        vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 3), dtype=np.float32)
+        try:
+            matriz = vectorizer.fit_transform(valores_distintos)
+        except ValueError:
+            # Vocabulario vacío: ningún valor tiene texto comparable
+            return False
+
+        matriz_t = matriz.T.tocsr()
+        for inicio in range(0, matriz.shape[0], EXACTITUD_BLOQUE):
+            similitudes = (matriz[inicio:inicio + EXACTITUD_BLOQUE] @ matriz_t).tocoo()
+            # Se descarta la similitud de cada valor consigo mismo
+            similares = (similitudes.data > EXACTITUD_UMBRAL_SIMILITUD) & \
+                        (similitudes.row + inicio != similitudes.col)
+            if similares.any():
+                return True
+        return False
+
     def calculate_exactitud_sintactica(self) -> float:
         num_col_valores_unicos_similares = 0
 
         for col in self.df.columns:
             if self.df[col].dtype == 'object':
-                valores_unicos = self.df[col].dropna().unique()
-
-                if len(valores_unicos) > 1:
-                    valores_normalizados = [str(v).lower().strip() for v in valores_unicos]
-
-                    tiene_similares = False
-                    for i in range(len(valores_normalizados)):
-                        for j in range(i + 1, len(valores_normalizados)):
-                            if self._calcular_similitud_texto(valores_normalizados[i], valores_normalizados[j]) > 0.85:
-                                tiene_similares = True
-                                break
-                        if tiene_similares:
-                            break
-
-                    if tiene_similares:
-                        num_col_valores_unicos_similares += 1
+                valores_unicos = self._value_counts(col).index
+                if len(valores_unicos) > 1 and self._tiene_valores_similares(col):
+                    num_col_valores_unicos_similares += 1
 
         if self.df_columnas == 0:
             return 10.0
@@ -1447,21 +1698,41 @@ class DataQualityCalculator:
 
         return max(0, min(10, exactitud_sintactica))
 
+    def _similitudes_por_filas(self, textos_a: List[str], textos_b: List[str]) -> np.ndarray:
+        """
+        Similitud coseno TF-IDF entre textos_a[i] y textos_b[i] para todas las filas a la vez.
+
+        Los términos se obtienen con el vectorizador de hashing compartido (sin
+        vocabulario que ajustar), el IDF se ajusta una sola vez sobre el corpus
+        completo y las similitudes salen de un producto fila a fila de matrices dispersas.
+        """
+        if not textos_a:
+            return np.zeros(0)
+        conteos = _vectorizador_terminos(EXACTITUD_SEMANTICA_FEATURES).transform(textos_a + textos_b)
+        if conteos.nnz == 0:
+            return np.zeros(len(textos_a))
+        tfidf = TfidfTransformer().fit_transform(conteos)
+        n = len(textos_a)
+        return np.asarray(tfidf[:n].multiply(tfidf[n:]).sum(axis=1)).ravel()
+
     def calculate_exactitud_semantica(self) -> float:
         num_col_no_sim_semantica = 0
 
+        # Un solo corpus para todas las columnas: (nombre + descripción, muestra de valores)
+        descripciones = self.metadata.get('columnas', {})
+        textos_columna = []
+        textos_valores = []
         for col in self.df.columns:
             if self.df[col].dtype == 'object':
                 col_nombre = str(col)
-                col_descripcion = self.metadata.get('columnas', {}).get(col, {}).get('descripcion', col_nombre)
+                col_descripcion = descripciones.get(col, {}).get('descripcion', col_nombre)
+                textos_columna.append(col_nombre + ' ' + col_descripcion)
 
                 valores_sample = self.df[col].dropna().astype(str).head(10).tolist()
-                texto_valores = ' '.join(valores_sample)
-
-                similitud = self._calcular_similitud_texto(col_nombre + ' ' + col_descripcion, texto_valores)
+                textos_valores.append(' '.join(valores_sample))
 
-                if similitud < 0.3:
-                    num_col_no_sim_semantica += 1
+        similitudes = self._similitudes_por_filas(textos_columna, textos_valores)
+        num_col_no_sim_semantica = int((similitudes < EXACTITUD_SEMANTICA_UMBRAL).sum())
 
         if self.df_columnas == 0:
             return 10.0
@@ -1514,16 +1785,17 @@ class DataQualityCalculator:
         total_columnas_actuales = len(self.df.columns)
         total_celdas = total_filas * total_columnas_actuales
         
-        # Contar nulos totales iterando sobre cada columna
-        total_nulos = 0
-        for col in self.df.columns:
-            total_nulos += self.df[col].isna().sum()
+        # Faltantes por columna desde el perfil (nulos + textos como "N/A", "-", "")
+        profiles = self.column_profile()
+        total_nulos = sum(p.missing_count for p in profiles.values())
+        total_centinelas = total_nulos - sum(p.null_count for p in profiles.values())
         
         print(f"\n📊 INFORMACIÓN DEL DATASET ANALIZADO")
         print(f"  ✓ Total de registros (filas) analizados: {total_filas}")
         print(f"  ✓ Total de columnas: {total_columnas_actuales}")
         print(f"  ✓ Total celdas (filas × columnas): {total_celdas}")
         print(f"  ✓ Total celdas nulas/vacías: {total_nulos}")
+        print(f"    (de ellas {total_centinelas} son textos vacíos o marcadores como 'N/A', '-', 'null')")
         
         # Información de metadata
         columnas_metadata = metadata.get('columns') or []
@@ -1550,8 +1822,8 @@ class DataQualityCalculator:
         num_col_porciento_nulos = 0
         columnas_con_alto_nulos = []
         
-        for col in self.df.columns:
-            nulos_col = self.df[col].isna().sum()
+        for col, profile in profiles.items():
+            nulos_col = profile.missing_count
             porciento_nulos = nulos_col / total_filas if total_filas > 0 else 0
             
             if porciento_nulos > umbral_nulos_porciento:
@@ -1592,16 +1864,29 @@ class DataQualityCalculator:
         print(f"  Completitud = ({medida_completitud_datos:.2f} + {medida_completitud_col:.2f} + {medida_col_no_vacias:.2f}) / 3")
         print(f"  Completitud = {completitud:.2f}")
         
+        # Resumen para el endpoint: en modo 'process' viaja al servidor con cached_scores
+        faltantes = self.missing_bitmap()
+        filas_completas = int((~faltantes.any(axis=1)).sum()) if total_columnas_actuales else total_filas
+        self.cached_scores['completitud'] = {'score': float(completitud), 'details': {
+            'total_filas': total_filas,
+            'total_columnas': total_columnas_actuales,
+            'total_columnas_metadata': total_columnas_metadata,
+            'total_celdas': total_celdas,
+            'total_nulos': int(total_nulos),
+            'proporcion_nulos': float(proporcion_nulos),
+            'filas_completas': filas_completas,
+            'columnas_alto_nulos': num_col_porciento_nulos,
+        }}
+        
         return float(completitud)
 
     def calculate_consistencia(self) -> float:
         exactitud_sintactica = self.calculate_exactitud_sintactica()
 
         num_col_inconsistentes = 0
-        for col in self.df.columns:
-            if self.df[col].dtype == 'object':
-                longitudes = self.df[col].dropna().astype(str).str.len()
-                if longitudes.std() > longitudes.mean() * 0.5:
+        for profile in self.column_profile().values():
+            if profile.dtype == 'object':
+                if profile.len_std > profile.len_mean * 0.5:
                     num_col_inconsistentes += 1
 
         medida_consistencia_car = 10 * (1 - (num_col_inconsistentes / self.df_columnas) ** 2) if self.df_columnas > 0 else 10.0
@@ -1617,15 +1902,15 @@ class DataQualityCalculator:
     def calculate_precision(self) -> float:
         columnas_cumplen_criterios = 0
 
-        for col in self.df.columns:
-            if self.df[col].dtype in ['int64', 'float64']:
-                varianza = self.df[col].var()
-                valores_unicos = self.df[col].nunique()
+        for profile in self.column_profile().values():
+            if profile.is_numeric:
+                varianza = profile.variance
+                valores_unicos = profile.distinct_count
 
                 if varianza > 0.1 and valores_unicos >= 2:
                     columnas_cumplen_criterios += 1
             else:
-                valores_unicos = self.df[col].nunique()
+                valores_unicos = profile.distinct_count
                 if valores_unicos >= 2:
                     columnas_cumplen_criterios += 1
 
@@ -1683,12 +1968,107 @@ class DataQualityCalculator:
         accesibilidad = puntaje_tags + puntaje_link
 
         return max(0, min(10, accesibilidad))
-    def calculate_unicidad(self, nivel_riesgo: float = 1.5) -> float:
+    @staticmethod
+    def _canonical_cell(value):
+        """Clave comparable de una celda: None para nulos y JSON con claves ordenadas para el resto."""
+        try:
+            if pd.isna(value):
+                return None
+        except (TypeError, ValueError):
+            # Listas/arrays: pd.isna no retorna un único booleano
+            pass
+        try:
+            return json.dumps(value, sort_keys=True, default=str, ensure_ascii=False)
+        except Exception:
+            return str(value)
+
+    def _canonical_frame(self) -> pd.DataFrame:
+        """
+        DataFrame comparable por valor: las columnas con celdas anidadas (dict/list,
+        p.ej. objetos location de Socrata) se serializan una sola vez por columna con
+        `_canonical_cell`; las demás columnas se usan tal cual. Se cachea por versión de datos.
+        """
+        data_key = (self.data_version, id(self.df))
+        cached = getattr(self, '_canonical_cache', None)
+        if cached is not None and cached[0] == data_key:
+            return cached[1]
+
+        columns = {}
+        for col in self.df.columns:
+            series = self.df[col]
+            if series.dtype == 'object' and pd.api.types.infer_dtype(series, skipna=True) not in \
+                    ('string', 'empty', 'integer', 'floating', 'boolean', 'decimal', 'bytes', 'date', 'datetime'):
+                if series.map(lambda v: isinstance(v, (dict, list))).any():
+                    series = series.map(self._canonical_cell)
+            columns[col] = series
+        canonical = pd.DataFrame(columns, index=self.df.index)
+        self._canonical_cache = (data_key, canonical)
+        return canonical
+
+    def _duplicated_rows_mask(self) -> pd.Series:
+        """
+        Filas repetidas (sin contar la primera aparición) detectadas por hash.
+
+        Cada columna se convierte en un hash uint64 con `pd.util.hash_pandas_object`
+        y se combinan en un hash por fila. Solo las filas cuyo hash se repite se
+        verifican de forma exacta, para descartar colisiones.
+        """
+        canonical = self._canonical_frame()
+        row_hash = pd.util.hash_pandas_object(canonical, index=False)
+        candidates = row_hash.duplicated(keep=False).to_numpy()
+        mask = pd.Series(False, index=self.df.index)
+        if candidates.any():
+            mask[candidates] = canonical[candidates].duplicated().to_numpy()
+        return mask
+
+    @staticmethod
+    def _columns_equal(a: pd.Series, b: pd.Series) -> bool:
+        """Igualdad exacta celda a celda de dos columnas canónicas (nulos iguales entre sí)."""
+        na_a = a.isna().to_numpy()
+        if not np.array_equal(na_a, b.isna().to_numpy()):
+            return False
+        values_a = a.to_numpy(dtype=object)[~na_a]
+        values_b = b.to_numpy(dtype=object)[~na_a]
+        return bool((values_a == values_b).all())
+
+    def _duplicated_column_pairs(self) -> List[Tuple[str, str]]:
+        """
+        Pares (columna original, columna repetida) con exactamente los mismos valores.
+
+        Cada columna se resume en una huella de 64 bits: los hashes uint64 de sus
+        celdas ponderados por posición y sumados (módulo 2^64). Las columnas se
+        agrupan por huella y solo dentro de un grupo se verifica la igualdad exacta,
+        así la memoria se mantiene en O(filas) aunque el dataset tenga cientos de columnas.
+        """
+        canonical = self._canonical_frame()
+        # Pesos impares fijos por posición: el orden de las filas cambia la huella
+        weights = np.random.default_rng(0x5EED).integers(
+            0, np.iinfo(np.uint64).max, size=len(canonical), dtype=np.uint64, endpoint=True) | np.uint64(1)
+
+        representatives: Dict[int, List[int]] = {}
+        pairs = []
+        with np.errstate(over='ignore'):
+            for pos in range(canonical.shape[1]):
+                series = canonical.iloc[:, pos]
+                hashes = pd.util.hash_pandas_object(series, index=False).to_numpy()
+                fingerprint = int((hashes * weights).sum(dtype=np.uint64))
+                group = representatives.setdefault(fingerprint, [])
+                match = next((rep for rep in group
+                              if self._columns_equal(canonical.iloc[:, rep], series)), None)
+                if match is None:
+                    group.append(pos)
+                else:
+                    pairs.append((canonical.columns[match], canonical.columns[pos]))
+        return pairs
+
+    def calculate_unicidad(self, nivel_riesgo: float = 1.5, mode: str = 'exact') -> float:
         """
         Calcula el índice de Unicidad del dataset.
         
         Evalúa la presencia de datos duplicados:
         - Filas duplicadas: Filas con exactamente los mismos valores en todas las columnas
+          (mode='near': filas casi duplicadas, que solo difieren en espacios, mayúsculas,
+          la hora final de una fecha o en pocas columnas; estimadas con MinHash + LSH)
         - Columnas duplicadas: Columnas con exactamente los mismos valores en todas las filas
         
         Fórmula:
@@ -1699,10 +2079,14 @@ class DataQualityCalculator:
                 - 1.0: Penalización suave
                 - 1.5: Penalización media (RECOMENDADO)
                 - 2.0: Penalización estricta
+            mode: 'exact' (default) o 'near' para filas casi duplicadas
         
         Returns:
             float: Score entre 0 y 10, donde 10 = sin duplicados
         """
+        if mode not in ('exact', 'near'):
+            raise ValueError(f"Modo de unicidad no soportado: {mode} (use 'exact' o 'near')")
+
         print("\n" + "="*70)
         print("🔍 INICIO DEL CÁLCULO DE UNICIDAD")
         print("="*70)
@@ -1738,13 +2122,21 @@ class DataQualityCalculator:
             except Exception:
                 return str(x)
 
+        duplicated_mask = None
         try:
-            row_keys = self.df.apply(lambda r: tuple(_cell_key(c) for c in r), axis=1)
-            filas_duplicadas = int(row_keys.duplicated().sum())
+            if mode == 'near':
+                print(f"   Modo aproximado: MinHash ({NEAR_DUP_PERMUTATIONS} permutaciones, "
+                      f"{NEAR_DUP_BANDS} bandas) con umbral de Jaccard {NEAR_DUP_THRESHOLD}")
+                duplicated_mask = near_duplicated_mask(self._canonical_frame())
+            else:
+                duplicated_mask = self._duplicated_rows_mask()
+            filas_duplicadas = int(duplicated_mask.sum())
         except Exception as e:
-            # Fallback: intentar llamada segura por filas
-            print(f"⚠️ Error construyendo claves de fila para detección: {e}")
-            filas_duplicadas = int(self.df.duplicated().sum())
+            # Fallback: claves serializadas por fila (lento, una llamada por celda)
+            print(f"⚠️ Error en la detección por hash de filas duplicadas: {e}")
+            row_keys = self.df.apply(lambda r: tuple(_cell_key(c) for c in r), axis=1)
+            duplicated_mask = row_keys.duplicated()
+            filas_duplicadas = int(duplicated_mask.sum())
 
         proporcion_filas_dup = filas_duplicadas / total_filas if total_filas > 0 else 0
 
@@ -1758,7 +2150,6 @@ class DataQualityCalculator:
         if filas_duplicadas > 0:
             print(f"\n   ⚠️  ADVERTENCIA: Se encontraron {filas_duplicadas} filas duplicadas")
             try:
-                duplicated_mask = row_keys.duplicated(keep=False)
                 dup_rows = self.df[duplicated_mask]
                 print(f"   Mostrando hasta 3 ejemplos de filas duplicadas:")
                 for idx, row in dup_rows.head(3).iterrows():
@@ -1775,61 +2166,17 @@ class DataQualityCalculator:
         print(f"\n🔎 PASO 2: DETECCIÓN DE COLUMNAS DUPLICADAS")
         print(f"   Analizando si hay columnas con exactamente los mismos valores en TODAS las filas...")
         
-        columnas_duplicadas = 0
         pares_duplicados = []
-        columnas_unicas = set()
-        
-        # Método CORREGIDO para detectar columnas duplicadas
-        print(f"   Comparando todas las combinaciones de columnas...")
-        print(f"   Total de comparaciones a hacer: {(total_columnas * (total_columnas - 1)) // 2}")
-        
-        # Construir claves serializables para cada columna (para evitar problemas con dtypes complejos)
-        print(f"   Construyendo claves serializables por columna para comparación robusta...")
-        column_keys = {}
+
+        # Huella de 64 bits por columna: solo las columnas con la misma huella se comparan completas
+        print(f"   Agrupando {total_columnas} columnas por huella de contenido (64 bits)...")
         try:
-            for col_name in self.df.columns:
-                # serializar cada valor de la columna usando _cell_key definido arriba
-                try:
-                    col_vals = self.df[col_name]
-                    col_key = tuple(_cell_key(v) for v in col_vals)
-                except Exception:
-                    # Fallback: convertir a string
-                    col_key = tuple(str(v) for v in self.df[col_name].astype(object).fillna('NaN'))
-                column_keys[col_name] = col_key
+            pares_duplicados = self._duplicated_column_pairs()
         except Exception as e:
-            print(f"      ⚠️ Error construyendo claves de columna: {e}")
-
-        # Comparar claves de columna en pares
-        for i in range(len(self.df.columns)):
-            col_i_name = self.df.columns[i]
-
-            # Si esta columna ya fue marcada como duplicada, saltar
-            if col_i_name in columnas_unicas:
-                continue
-
-            for j in range(i + 1, len(self.df.columns)):
-                col_j_name = self.df.columns[j]
-
-                # Si esta columna ya fue marcada como duplicada, saltar
-                if col_j_name in columnas_unicas:
-                    continue
-
-                try:
-                    key_i = column_keys.get(col_i_name)
-                    key_j = column_keys.get(col_j_name)
-
-                    if key_i is None or key_j is None:
-                        # si no pudimos construir alguna clave, saltar comparación
-                        continue
-
-                    if key_i == key_j:
-                        columnas_duplicadas += 1
-                        pares_duplicados.append((col_i_name, col_j_name))
-                        columnas_unicas.add(col_j_name)
-                        print(f"      ⚠️  Columnas duplicadas: '{col_i_name}' <-> '{col_j_name}'")
-                        continue
-                except Exception as e:
-                    print(f"      Error comparando '{col_i_name}' con '{col_j_name}': {e}")
+            print(f"      ⚠️ Error calculando huellas de columna: {e}")
+        for col_i_name, col_j_name in pares_duplicados:
+            print(f"      ⚠️  Columnas duplicadas: '{col_i_name}' <-> '{col_j_name}'")
+        columnas_duplicadas = len(pares_duplicados)
         
         # Calcular proporción CORREGIDA
         # La proporción debe ser: columnas_duplicadas / total_columnas_posibles_duplicadas
@@ -2108,49 +2455,41 @@ class DataQualityCalculator:
         total_recursos = len(self.df)
         print(f"📊 Analizando {total_recursos} recursos para portabilidad...")
         
-        # Clasificación de formatos basada en la columna 'd_formato'
-        # Considerando la falta de datos completos, asignamos puntajes conservadores
-        
-        formatos_muy_portables = {
-            'Excel', 'Hoja de calculo', 'Hoja de calculo / Web'
-            # Asumimos que son XLSX sin macros por defecto (optimista pero realista)
-        }
+        # Clasificación de formatos basada en la columna 'd_formato' con la tabla
+        # formato -> clase (`data/formatos_portabilidad.csv`, cargada una vez por proceso)
+        tabla_formatos = _tabla_portabilidad(PORTABILIDAD_FORMATOS_PATH)
         
-        formatos_medianamente_portables = {
-            'Web', 'Web/Pdf', 'Pdf/Web'
-            # Web puede contener datos estructurados, pero requiere verificación
-        }
+        print(f"\n🔍 CLASIFICANDO FORMATOS:")
         
-        formatos_no_portables = {
-            'Pdf'  # Formato cerrado, difícil reutilización
+        # Conteo por combinación (formato, medio) en lugar de recorrer las filas;
+        # como antes, una columna ausente equivale a '' y un nulo a 'nan'
+        vacia = pd.Series('', index=self.df.index, dtype=object)
+        recursos = pd.DataFrame({
+            'formato': self.df['d_formato'] if 'd_formato' in self.df.columns else vacia,
+            'medio': (self.df['c_medio_de_conservaci_n_y']
+                      if 'c_medio_de_conservaci_n_y' in self.df.columns else vacia),
+        }).astype(object)
+        combinaciones = recursos.value_counts(dropna=False, sort=False).reset_index(name='recursos')
+        combinaciones['formato'] = combinaciones['formato'].astype(str).str.strip()
+        combinaciones['medio'] = combinaciones['medio'].astype(str).str.strip()
+        combinaciones['clase'] = combinaciones['formato'].str.casefold().map(tabla_formatos).fillna('desconocido')
+        combinaciones = combinaciones.sort_values('recursos', ascending=False, kind='stable')
+        
+        etiquetas = {
+            'muy_portable': "✅ MUY PORTABLE",
+            'medianamente': "⚠️  MEDIANAMENTE",
+            'no_portable': "❌ NO PORTABLE",
+            'desconocido': "❓ DESCONOCIDO",
         }
+        for fila in combinaciones.itertuples(index=False):
+            print(f"   {etiquetas[fila.clase]}: '{fila.formato}' (medio: {fila.medio}) × {fila.recursos}")
         
         # Contadores
-        count_muy_portables = 0
-        count_medianos = 0
-        count_no_portables = 0
-        count_desconocidos = 0
-        
-        print(f"\n🔍 CLASIFICANDO FORMATOS:")
-        
-        # Analizar cada recurso según su formato
-        for idx, row in self.df.iterrows():
-            formato = str(row.get('d_formato', '')).strip()
-            medio = str(row.get('c_medio_de_conservaci_n_y', '')).strip()
-            
-            # Clasificación
-            if formato in formatos_muy_portables:
-                count_muy_portables += 1
-                print(f"   ✅ MUY PORTABLE: '{formato}' (medio: {medio})")
-            elif formato in formatos_medianamente_portables:
-                count_medianos += 1
-                print(f"   ⚠️  MEDIANAMENTE: '{formato}' (medio: {medio})")
-            elif formato in formatos_no_portables:
-                count_no_portables += 1
-                print(f"   ❌ NO PORTABLE: '{formato}' (medio: {medio})")
-            else:
-                count_desconocidos += 1
-                print(f"   ❓ DESCONOCIDO: '{formato}' (medio: {medio})")
+        conteo_clases = combinaciones.groupby('clase')['recursos'].sum()
+        count_muy_portables = int(conteo_clases.get('muy_portable', 0))
+        count_medianos = int(conteo_clases.get('medianamente', 0))
+        count_no_portables = int(conteo_clases.get('no_portable', 0))
+        count_desconocidos = int(conteo_clases.get('desconocido', 0))
         
         # Ajuste por falta de datos completos - asumimos conservadoramente
         # que los formatos desconocidos son medianamente portables
@@ -2164,9 +2503,9 @@ class DataQualityCalculator:
             print(f"   • Desconocidos (asumidos como medianos): {count_desconocidos}")
         
         # Cálculo del score con pesos
-        peso_muy_portable = 1.0      # Excel/CSV/JSON - formatos ideales
-        peso_medio = 0.5             # Web/formatos mixtos - requieren procesamiento
-        peso_no_portable = 0.0       # PDF - no reutilizable directamente
+        peso_muy_portable = PORTABILIDAD_PESOS['muy_portable']   # Excel/CSV/JSON - formatos ideales
+        peso_medio = PORTABILIDAD_PESOS['medianamente']          # Web/formatos mixtos - requieren procesamiento
+        peso_no_portable = PORTABILIDAD_PESOS['no_portable']     # PDF - no reutilizable directamente
         
         # Puntuación cruda lineal
         puntuacion_cruda = (
@@ -0,0 +1,244 @@
+"""
+Caché persistente en disco de los datasets cargados desde Socrata.
+
+Tras una carga exitosa, el DataFrame se guarda en formato columnar (Parquet vía
+pyarrow) bajo `DATASET_CACHE_DIR`, con clave `(dataset_id, rowsUpdatedAt)`.
+Mientras `rowsUpdatedAt` en los metadatos de `/api/views` no cambie, `load_data`
+lee la copia local en lugar de descargar de nuevo el dataset.
+
+- Si pyarrow no está instalado, o una columna no es representable en Parquet
+  (p.ej. objetos anidados con tipos mezclados), se usa pickle como respaldo.
+- El tamaño total está acotado por `DATASET_CACHE_MAX_MB`; se desalojan primero
+  las entradas usadas hace más tiempo.
+- Lleva contadores de aciertos/fallos para el endpoint /sessions.
+- Una carga proyectada (solo algunas columnas, ver `column_projection`) guarda
+  la lista de columnas en el índice; solo satisface peticiones de esas columnas.
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+from dotenv import load_dotenv
+
+# Cargar variables de entorno desde .env
+load_dotenv()
+
+DATASET_CACHE_ENABLED = os.getenv("DATASET_CACHE_ENABLED", "true").lower() == "true"
+DATASET_CACHE_DIR = os.getenv("DATASET_CACHE_DIR", "./cache/datasets")
+DATASET_CACHE_MAX_MB = float(os.getenv("DATASET_CACHE_MAX_MB", 2048))
+
+try:
+    import pyarrow  # noqa: F401
+    _HAS_PYARROW = True
+except ImportError:
+    _HAS_PYARROW = False
+
+
+def dataset_version(metadata: Optional[Dict]) -> Optional[str]:
+    """Versión del dataset según los metadatos de Socrata (`rowsUpdatedAt`)."""
+    if not metadata:
+        return None
+    version = metadata.get('rowsUpdatedAt') or metadata.get('rows_updated_at')
+    return str(version) if version else None
+
+
+class DatasetDiskCache:
+    """
+    Caché en disco de DataFrames por `(dataset_id, rowsUpdatedAt)`.
+
+    Cada entrada son dos archivos: los datos (`.parquet` o `.pkl`) y un
+    `.json` con la clave, el límite de registros usado en la carga, las columnas
+    descargadas (None = todas) y el tamaño.
+    """
+
+    def __init__(self, cache_dir: str = DATASET_CACHE_DIR, max_mb: float = DATASET_CACHE_MAX_MB,
+                 enabled: bool = DATASET_CACHE_ENABLED):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _base_path(self, dataset_id: str, version: str) -> str:
+        safe_id = "".join(c for c in dataset_id if c.isalnum() or c in "-_")
+        safe_version = "".join(c for c in version if c.isalnum() or c in "-_")
+        return os.path.join(self.cache_dir, f"{safe_id}__{safe_version}")
+
+    def _read_index(self, meta_path: str) -> Optional[Dict]:
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def get(self, dataset_id: str, version: Optional[str], limit: int,
+            columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        Retorna el DataFrame cacheado si la versión coincide y la copia cubre `limit`
+        registros (o contiene el dataset completo). None si no hay acierto.
+
+        Con `columns` se retornan solo esas columnas (y los campos de sistema);
+        sin `columns` solo acierta una entrada con todas las columnas.
+        """
+        if not self.enabled or not version:
+            return None
+
+        base = self._base_path(dataset_id, version)
+        entry = self._read_index(base + ".json")
+        if entry is None or entry.get('version') != version:
+            self.misses += 1
+            return None
+
+        # Una muestra de 5000 filas no sirve para una carga de 50000,
+        # salvo que la muestra ya contenga todo el dataset
+        complete = entry.get('rows', 0) < entry.get('limit', 0)
+        if entry.get('limit', 0) < limit and not complete:
+            self.misses += 1
+            return None
+
+        if not self._covers(entry, columns):
+            self.misses += 1
+            return None
+
+        data_path = os.path.join(self.cache_dir, entry['file'])
+        try:
+            if entry['file'].endswith('.parquet'):
+                df = pd.read_parquet(data_path)
+            else:
+                df = pd.read_pickle(data_path)
+        except Exception as e:
+            print(f"⚠️ Entrada de caché ilegible ({data_path}): {e}")
+            self._remove_entry(base)
+            self.misses += 1
+            return None
+
+        # Marcar uso reciente para el desalojo LRU
+        now = time.time()
+        try:
+            os.utime(base + ".json", (now, now))
+        except OSError:
+            pass
+        self.hits += 1
+        if columns is not None:
+            wanted = set(columns)
+            df = df[[c for c in df.columns if str(c).startswith(':') or c in wanted]]
+        return df.head(limit) if len(df) > limit else df
+
+    @staticmethod
+    def _covers(entry: Dict, columns: Optional[List[str]]) -> bool:
+        """Indica si la entrada contiene `columns` (None = todas las columnas)."""
+        cached = entry.get('columns')
+        if cached is None:
+            return True
+        return columns is not None and set(columns) <= set(cached)
+
+    def put(self, dataset_id: str, version: Optional[str], limit: int, df: pd.DataFrame,
+            columns: Optional[List[str]] = None) -> None:
+        """
+        Guarda el DataFrame y desaloja versiones antiguas y entradas LRU.
+
+        `columns` indica las columnas descargadas en una carga proyectada (None = todas).
+        Una carga proyectada no reemplaza a una entrada de la misma versión que ya la contiene.
+        """
+        if not self.enabled or not version or df is None or len(df) == 0:
+            return
+
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            current = self._read_index(self._base_path(dataset_id, version) + ".json")
+            if (columns is not None and current is not None and current.get('version') == version
+                    and current.get('limit', 0) >= limit and self._covers(current, columns)):
+                return
+            # Una versión nueva invalida las anteriores del mismo dataset
+            self._remove_dataset(dataset_id)
+
+            base = self._base_path(dataset_id, version)
+            data_path = None
+            if _HAS_PYARROW:
+                try:
+                    df.to_parquet(base + ".parquet", index=False)
+                    data_path = base + ".parquet"
+                except Exception as e:
+                    print(f"ℹ️ Parquet no soportado para {dataset_id} ({e}); usando pickle")
+                    self._remove_entry(base)
+            if data_path is None:
+                df.to_pickle(base + ".pkl")
+                data_path = base + ".pkl"
+
+            entry = {
+                'dataset_id': dataset_id,
+                'version': version,
+                'limit': int(limit),
+                'rows': int(len(df)),
+                'columns': None if columns is None else [str(c) for c in columns],
+                'file': os.path.basename(data_path),
+                'size_bytes': os.path.getsize(data_path),
+                'created_at': time.time(),
+            }
+            with open(base + ".json", 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+
+            self._evict()
+
+    def _entries(self):
+        """Lista (ruta_base, entrada, último_uso) de las entradas en disco."""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        result = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            meta_path = os.path.join(self.cache_dir, name)
+            entry = self._read_index(meta_path)
+            if entry is None:
+                continue
+            result.append((meta_path[:-5], entry, os.path.getmtime(meta_path)))
+        return result
+
+    def _remove_entry(self, base: str) -> None:
+        for ext in (".json", ".parquet", ".pkl"):
+            try:
+                os.remove(base + ext)
+            except OSError:
+                pass
+
+    def _remove_dataset(self, dataset_id: str) -> None:
+        for base, entry, _ in self._entries():
+            if entry.get('dataset_id') == dataset_id:
+                self._remove_entry(base)
+
+    def total_bytes(self) -> int:
+        return sum(entry.get('size_bytes', 0) for _, entry, _ in self._entries())
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(entry.get('size_bytes', 0) for _, entry, _ in entries)
+        # Se conserva siempre la entrada más reciente
+        while len(entries) > 1 and total > self.max_bytes:
+            base, entry, _ = entries.pop(0)
+            self._remove_entry(base)
+            total -= entry.get('size_bytes', 0)
+            self.evictions += 1
+            print(f"🧹 Entrada de caché desalojada: {entry.get('dataset_id')} ({entry.get('version')})")
+
+    def stats(self) -> Dict:
+        entries = self._entries()
+        return {
+            'enabled': self.enabled,
+            'format': 'parquet' if _HAS_PYARROW else 'pickle',
+            'entries': len(entries),
+            'size_mb': round(sum(e.get('size_bytes', 0) for _, e, _ in entries) / (1024**2), 3),
+            'max_mb': round(self.max_bytes / (1024**2), 3),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+# Instancia compartida por todos los calculadores del proceso
+dataset_cache = DatasetDiskCache()
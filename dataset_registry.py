@@ -0,0 +1,144 @@
+"""
+Registro de sesiones: calculadores `DataQualityCalculator` residentes por dataset_id.
+
+Reemplaza el antiguo `calculator` global de main.py. Varios usuarios pueden
+inicializar datasets distintos sin descartar los DataFrames de los demás, y un
+dataset ya cargado se reutiliza (cache hit) en lugar de volver a descargarse.
+
+La memoria total de los DataFrames residentes (medida con
+`memory_usage(deep=True)`) está acotada: al superarse el presupuesto se
+desalojan los datasets usados hace más tiempo (LRU).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# Cargar variables de entorno desde .env
+load_dotenv()
+
+# Presupuesto de memoria para DataFrames residentes (MB)
+REGISTRY_MAX_MEMORY_MB = float(os.getenv("REGISTRY_MAX_MEMORY_MB", 1024))
+
+
+def dataframe_memory_bytes(df) -> int:
+    """Memoria ocupada por un DataFrame (0 si no hay datos)."""
+    if df is None:
+        return 0
+    try:
+        return int(df.memory_usage(deep=True).sum())
+    except Exception:
+        return 0
+
+
+class DatasetRegistry:
+    """
+    Registro LRU de calculadores por dataset_id acotado por memoria.
+
+    Args:
+        max_memory_mb: Presupuesto total para los DataFrames residentes
+    """
+
+    def __init__(self, max_memory_mb: float = REGISTRY_MAX_MEMORY_MB):
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._last_initialized: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, dataset_id: str):
+        """Retorna el calculador del dataset (y lo marca como usado) o None."""
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry['last_access'] = time.time()
+            self._entries.move_to_end(dataset_id)
+            return entry['calculator']
+
+    def get_default(self):
+        """
+        Calculador usado cuando la petición no indica dataset_id
+        (compatibilidad con clientes de un solo dataset): el último inicializado
+        si sigue residente, o el usado más recientemente.
+        """
+        with self._lock:
+            if self._last_initialized in self._entries:
+                return self.get(self._last_initialized)
+            if self._entries:
+                return self.get(next(reversed(self._entries)))
+            return None
+
+    def put(self, calculator) -> None:
+        """Registra (o reemplaza) el calculador de un dataset."""
+        with self._lock:
+            dataset_id = calculator.dataset_id
+            self._entries[dataset_id] = {
+                'calculator': calculator,
+                'size_bytes': dataframe_memory_bytes(calculator.df),
+                'created_at': time.time(),
+                'last_access': time.time(),
+            }
+            self._entries.move_to_end(dataset_id)
+            self._last_initialized = dataset_id
+            self._evict()
+
+    def update_size(self, dataset_id: str) -> None:
+        """Recalcula la memoria del dataset (tras cargar datos) y aplica el presupuesto."""
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            if entry is None:
+                return
+            entry['size_bytes'] = dataframe_memory_bytes(entry['calculator'].df)
+            entry['last_access'] = time.time()
+            self._entries.move_to_end(dataset_id)
+            self._evict()
+
+    def remove(self, dataset_id: str) -> bool:
+        with self._lock:
+            return self._entries.pop(dataset_id, None) is not None
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(e['size_bytes'] for e in self._entries.values())
+
+    def _evict(self) -> None:
+        """Desaloja datasets LRU hasta respetar el presupuesto (conserva el más reciente)."""
+        while len(self._entries) > 1 and self.total_bytes() > self.max_memory_bytes:
+            dataset_id, entry = self._entries.popitem(last=False)
+            self.evictions += 1
+            print(f"🧹 Dataset desalojado del registro: {dataset_id} "
+                  f"({entry['size_bytes'] / (1024**2):.2f} MB)")
+
+    def snapshot(self) -> Dict:
+        """Resumen de los datasets residentes para el endpoint /sessions."""
+        with self._lock:
+            sessions: List[Dict] = []
+            for dataset_id, entry in reversed(self._entries.items()):
+                calc = entry['calculator']
+                sessions.append({
+                    'dataset_id': dataset_id,
+                    'dataset_name': (calc.metadata or {}).get('name', 'Desconocido'),
+                    'rows': int(calc.df_filas),
+                    'columns': int(calc.df_columnas),
+                    'data_loaded': calc.df is not None and len(calc.df) > 0,
+                    'size_mb': round(entry['size_bytes'] / (1024**2), 3),
+                    'last_access': datetime.fromtimestamp(entry['last_access']).isoformat(),
+                })
+            return {
+                'sessions': sessions,
+                'total_sessions': len(sessions),
+                'total_size_mb': round(self.total_bytes() / (1024**2), 3),
+                'max_memory_mb': round(self.max_memory_bytes / (1024**2), 3),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,209 @@
+"""
+Nomenclátor de Colombia (departamentos y municipios) cargado una sola vez por proceso.
+
+La fuente es un CSV estilo DIVIPOLA (DANE) incluido en el repositorio
+(`data/divipola_municipios.csv`: código y nombre de departamento y municipio) más
+un CSV de nombres alternativos (`data/divipola_alias.csv`, p.ej. "Bogotá D.C.").
+
+Estructuras expuestas (todas inmutables):
+- `department_titles` / `municipality_titles`: nombres en formato `str.title()`,
+  usados por la validación de conformidad (coincidencia exacta tras strip + title).
+- `department_keys` / `municipality_keys`: nombre plegado (sin tildes ni
+  mayúsculas) -> código(s) DIVIPOLA, para búsquedas tolerantes.
+- `municipalities_by_department`: código de departamento -> códigos de sus municipios.
+- `department_municipality_pairs` / `pair_index`: pares (código de departamento,
+  municipio plegado) válidos, para la regla jerárquica de conformidad.
+- `department_index` / `municipality_index`: índices de trigramas (`TrigramIndex`)
+  para sugerir nombres válidos ante valores rechazados.
+
+Los calculadores solo referencian la instancia compartida (`get_gazetteer()`),
+por lo que crear un `DataQualityCalculator` ya no reconstruye las listas.
+"""
+import csv
+import os
+import re
+import threading
+import unicodedata
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# Cargar variables de entorno desde .env
+load_dotenv()
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(_DATA_DIR, "divipola_municipios.csv"))
+GAZETTEER_ALIAS_PATH = os.getenv("GAZETTEER_ALIAS_PATH", os.path.join(_DATA_DIR, "divipola_alias.csv"))
+
+_COMBINING_RE = re.compile("[\u0300-\u036f]")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def fold_text(value) -> str:
+    """Plegado para búsquedas: sin tildes, sin mayúsculas y espacios colapsados."""
+    text = unicodedata.normalize('NFKD', str(value))
+    text = _COMBINING_RE.sub('', text).casefold()
+    return _SPACES_RE.sub(' ', text).strip()
+
+
+def fold_series(series: pd.Series) -> pd.Series:
+    """Versión vectorizada de `fold_text` para una Serie de textos."""
+    return (series.astype(str)
+            .str.normalize('NFKD')
+            .str.replace(_COMBINING_RE, '', regex=True)
+            .str.casefold()
+            .str.replace(_SPACES_RE, ' ', regex=True)
+            .str.strip())
+
+
+def _trigrams(key: str) -> set:
+    """Trigramas de caracteres de un texto ya plegado (con relleno en los extremos)."""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Índice invertido de trigramas para sugerir los nombres válidos más parecidos.
+
+    Cada consulta suma las listas de candidatos de sus trigramas con `np.bincount`
+    y ordena por similitud de Jaccard entre conjuntos de trigramas, sin recorrer
+    con distancia de edición todos los nombres.
+
+    Args:
+        names: nombre plegado -> nombre a mostrar
+    """
+
+    def __init__(self, names: Mapping[str, str]):
+        self.keys = list(names)
+        self.names = [names[key] for key in self.keys]
+        postings: Dict[str, List[int]] = {}
+        sizes = []
+        for i, key in enumerate(self.keys):
+            grams = _trigrams(key)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self.sizes = np.array(sizes, dtype=np.int32)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def search(self, value, k: int = 3) -> List[Tuple[str, float]]:
+        """Top-k nombres (nombre, similitud 0-1) más parecidos a `value`."""
+        grams = _trigrams(fold_text(value))
+        hits = [self.postings[g] for g in grams if g in self.postings]
+        if not hits or k <= 0:
+            return []
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.keys))
+        scores = shared / (len(grams) + self.sizes - shared)
+        k = min(k, len(self.keys))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self.names[i], round(float(scores[i]), 3)) for i in top if shared[i] > 0]
+
+
+class Gazetteer:
+    """
+    Índice inmutable de departamentos y municipios con códigos DIVIPOLA.
+
+    Args:
+        path: CSV con columnas codigo_departamento, nombre_departamento,
+            codigo_municipio, nombre_municipio
+        alias_path: CSV opcional con columnas tipo (departamento|municipio), codigo, nombre
+    """
+
+    def __init__(self, path: str = GAZETTEER_PATH, alias_path: Optional[str] = GAZETTEER_ALIAS_PATH):
+        departments: Dict[str, str] = {}
+        municipalities: Dict[str, tuple] = {}
+        with open(path, encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                dept_code = row['codigo_departamento'].strip()
+                muni_code = row['codigo_municipio'].strip()
+                departments.setdefault(dept_code, row['nombre_departamento'].strip())
+                municipalities[muni_code] = (dept_code, row['nombre_municipio'].strip())
+
+        # Nombres por código (oficial primero, luego alias)
+        dept_names = {code: [name] for code, name in departments.items()}
+        muni_names = {code: [name] for code, (_, name) in municipalities.items()}
+        if alias_path and os.path.exists(alias_path):
+            with open(alias_path, encoding='utf-8', newline='') as f:
+                for row in csv.DictReader(f):
+                    target = dept_names if row['tipo'].strip() == 'departamento' else muni_names
+                    if row['codigo'].strip() in target:
+                        target[row['codigo'].strip()].append(row['nombre'].strip())
+
+        dept_keys: Dict[str, str] = {}
+        for code, names in dept_names.items():
+            for name in names:
+                dept_keys[fold_text(name)] = code
+
+        muni_keys: Dict[str, set] = {}
+        by_department: Dict[str, set] = {code: set() for code in departments}
+        for code, names in muni_names.items():
+            by_department[municipalities[code][0]].add(code)
+            for name in names:
+                # Un mismo nombre existe en varios departamentos (p.ej. "La Unión")
+                muni_keys.setdefault(fold_text(name), set()).add(code)
+
+        self.departments: Mapping[str, str] = MappingProxyType(departments)
+        self.municipalities: Mapping[str, tuple] = MappingProxyType(municipalities)
+        self.department_titles: FrozenSet[str] = frozenset(
+            name.title() for names in dept_names.values() for name in names)
+        self.municipality_titles: FrozenSet[str] = frozenset(
+            name.title() for names in muni_names.values() for name in names)
+        self.department_keys: Mapping[str, str] = MappingProxyType(dept_keys)
+        self.municipality_keys: Mapping[str, FrozenSet[str]] = MappingProxyType(
+            {key: frozenset(codes) for key, codes in muni_keys.items()})
+        self.municipalities_by_department: Mapping[str, FrozenSet[str]] = MappingProxyType(
+            {code: frozenset(codes) for code, codes in by_department.items()})
+        # Jerarquía (código de departamento, nombre plegado de municipio) para
+        # validar pares con un único `isin`
+        pairs = {(municipalities[code][0], fold_text(name))
+                 for code, names in muni_names.items() for name in names}
+        self.department_municipality_pairs: FrozenSet[tuple] = frozenset(pairs)
+        self.pair_index = pd.MultiIndex.from_tuples(sorted(pairs), names=['codigo_departamento', 'municipio'])
+        # Índices de sugerencias: nombre plegado -> primer nombre que lo produce
+        dept_display: Dict[str, str] = {}
+        for names in dept_names.values():
+            for name in names:
+                dept_display.setdefault(fold_text(name), name.title())
+        muni_display: Dict[str, str] = {}
+        for names in muni_names.values():
+            for name in names:
+                muni_display.setdefault(fold_text(name), name.title())
+        self.department_index = TrigramIndex(dept_display)
+        self.municipality_index = TrigramIndex(muni_display)
+
+    def department_code(self, name) -> Optional[str]:
+        """Código DIVIPOLA del departamento (búsqueda sin tildes ni mayúsculas)."""
+        return self.department_keys.get(fold_text(name))
+
+    def municipality_codes(self, name) -> FrozenSet[str]:
+        """Códigos DIVIPOLA de los municipios con ese nombre (puede haber varios)."""
+        return self.municipality_keys.get(fold_text(name), frozenset())
+
+    def suggest(self, value, kind: str = 'municipio', k: int = 3) -> List[Tuple[str, float]]:
+        """Nombres válidos más parecidos a `value` (kind: 'departamento' o 'municipio')."""
+        index = self.department_index if kind == 'departamento' else self.municipality_index
+        return index.search(value, k)
+
+    def __repr__(self) -> str:
+        return (f"Gazetteer(departamentos={len(self.departments)}, "
+                f"municipios={len(self.municipalities)})")
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Instancia compartida del nomenclátor; se construye en el primer uso del proceso."""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer()
+                print(f"🗺️ Nomenclátor cargado: {_gazetteer}")
+    return _gazetteer
@@ -0,0 +1,179 @@
+"""
+Decodificador JSON incremental que construye columnas en lugar de registros.
+
+Una página de la API Socrata es un arreglo JSON de objetos (`[{...}, {...}]`).
+`response.json()` seguido de `pd.DataFrame.from_records` mantiene vivos a la vez
+todos los dicts de la página (uno por fila) y el DataFrame resultante.
+`ColumnarJsonDecoder` recibe el cuerpo de la respuesta por fragmentos (ya sin
+gzip), decodifica cada objeto del arreglo con el escáner C de `json` y reparte
+sus valores, por lotes de filas, entre constructores de columna; los dicts del
+lote se descartan en cuanto se reparten. Los valores repetidos de una
+columna se guardan una sola vez (hasta `JSON_DECODER_MAX_SHARED` distintos).
+Las columnas ausentes en una fila quedan como NaN, igual que con `from_records`.
+
+`SocrataPageLoader.fetch_frame` usa este decodificador por página y concatena
+los fragmentos de DataFrame sin materializar la lista completa de registros.
+"""
+import codecs
+import json
+import os
+import re
+from operator import itemgetter
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# Cargar variables de entorno desde .env
+load_dotenv()
+
+# Tamaño de los fragmentos leídos de la respuesta HTTP
+JSON_DECODER_CHUNK_KB = int(os.getenv("JSON_DECODER_CHUNK_KB", 256))
+# Valores distintos por columna que se comparten; por encima (columnas casi únicas) se deja de hacerlo
+JSON_DECODER_MAX_SHARED = int(os.getenv("JSON_DECODER_MAX_SHARED", 4096))
+
+_WHITESPACE_RE = re.compile(r"[ \t\n\r]*")
+# Filas decodificadas que se reparten juntas entre las columnas
+_BATCH_ROWS = 1024
+
+
+class ColumnarJsonDecoder:
+    """
+    Decodifica un arreglo JSON de objetos a columnas, fragmento a fragmento.
+
+    Uso:
+        decoder = ColumnarJsonDecoder()
+        for chunk in response.iter_content(64 * 1024):
+            decoder.feed(chunk)
+        df = decoder.close()
+    """
+
+    def __init__(self):
+        self.rows = 0
+        # columna -> [valores (NaN donde la fila no la trae), textos distintos compartidos]
+        self._columns: Dict[str, List] = {}
+        self._batch: List[Dict] = []
+        self._json = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        # start -> first/item <-> sep -> end
+        self._state = 'start'
+
+    def feed(self, chunk: bytes) -> None:
+        """Agrega bytes del cuerpo y decodifica los objetos completos que contengan."""
+        self._buffer = self._buffer[self._pos:] + self._text.decode(chunk)
+        self._pos = 0
+        self._consume(final=False)
+
+    def close(self) -> pd.DataFrame:
+        """Termina la decodificación y retorna el DataFrame de la página."""
+        self._buffer = self._buffer[self._pos:] + self._text.decode(b'', final=True)
+        self._pos = 0
+        self._consume(final=True)
+        if self._state != 'end':
+            raise ValueError("Respuesta JSON incompleta: el arreglo no se cerró")
+        return self.to_frame()
+
+    def _consume(self, final: bool) -> None:
+        buffer = self._buffer
+        pos = self._pos
+        size = len(buffer)
+        while True:
+            pos = _WHITESPACE_RE.match(buffer, pos).end()
+            if pos >= size:
+                break
+            char = buffer[pos]
+            if self._state == 'start':
+                if char != '[':
+                    raise ValueError(f"Se esperaba un arreglo JSON y se encontró {buffer[pos:pos + 80]!r}")
+                self._state = 'first'
+                pos += 1
+            elif self._state in ('first', 'item'):
+                if self._state == 'first' and char == ']':
+                    self._state = 'end'
+                    pos += 1
+                    continue
+                try:
+                    record, end = self._json.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    # Objeto incompleto: esperar el siguiente fragmento
+                    break
+                self._add(record)
+                pos = end
+                self._state = 'sep'
+            elif self._state == 'sep':
+                if char == ',':
+                    self._state = 'item'
+                elif char == ']':
+                    self._state = 'end'
+                else:
+                    raise ValueError(f"JSON inválido cerca de {buffer[pos:pos + 80]!r}")
+                pos += 1
+            else:
+                raise ValueError(f"Contenido después del arreglo JSON: {buffer[pos:pos + 80]!r}")
+        self._pos = pos
+
+    def _add(self, record) -> None:
+        if not isinstance(record, dict):
+            raise ValueError(f"Se esperaba un objeto por fila y se encontró {type(record).__name__}")
+        self._batch.append(record)
+        if len(self._batch) >= _BATCH_ROWS:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Reparte el lote de filas entre las columnas (una lista por comprensión por columna)."""
+        batch = self._batch
+        if not batch:
+            return
+        keys = {}
+        for record in batch:
+            keys.update(dict.fromkeys(record))
+        # Caso habitual: todas las filas del lote traen todas las columnas
+        complete = all(len(record) == len(keys) for record in batch)
+        columns = self._columns
+        for key in keys:
+            builder = columns.get(key)
+            if builder is None:
+                # Columna nueva: las filas anteriores no la tenían
+                builder = columns[key] = [[np.nan] * self.rows, {}]
+            if complete:
+                values = list(map(itemgetter(key), batch))
+            else:
+                values = [record.get(key, np.nan) for record in batch]
+            distinct = builder[1]
+            if distinct is not None:
+                # Valores repetidos (categorías, fechas, municipios) comparten un solo objeto
+                try:
+                    values = list(map(distinct.setdefault, values, values))
+                except TypeError:
+                    # Valores no hashables (objetos location/point)
+                    distinct = builder[1] = None
+                if distinct is not None and len(distinct) > JSON_DECODER_MAX_SHARED:
+                    builder[1] = None
+            builder[0].extend(values)
+        for key, builder in columns.items():
+            if key not in keys:
+                builder[0].extend([np.nan] * len(batch))
+        self.rows += len(batch)
+        self._batch = []
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame con una columna por clave, en orden de aparición."""
+        self._flush()
+        # pd.Series evita que numpy convierta listas anidadas en dimensiones extra
+        data = {key: pd.Series(values, dtype=object).to_numpy() for key, (values, _) in self._columns.items()}
+        self._columns = {}
+        return pd.DataFrame(data, index=pd.RangeIndex(self.rows), copy=False).infer_objects()
+
+
+def decode_json_records(chunks: Iterable[bytes]) -> pd.DataFrame:
+    """Decodifica el cuerpo de una página (fragmentos de bytes) a un DataFrame columnar."""
+    decoder = ColumnarJsonDecoder()
+    for chunk in chunks:
+        if chunk:
+            decoder.feed(chunk)
+    return decoder.close()
@@ -15,6 +15,12 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from data_quality_calculator import DataQualityCalculator
+from dataset_registry import DatasetRegistry
+from dataset_cache import dataset_cache, dataset_version
+from metric_executor import metric_executor
+from column_projection import PROJECTION_METRICS
+from socrata_loader import SocrataPageLoader
+from streaming_unicidad import StreamingUnicidad
 
 # ═══════════════════════════════════════════════════════════════════════════
 # CONFIGURACIÓN DESDE VARIABLES DE ENTORNO
@@ -97,7 +103,36 @@ async def _preflight_handler(full_path: str):
     """
     return Response(status_code=200)
 
-calculator = None
+# Calculadores residentes por dataset_id (reemplaza al antiguo `calculator` global)
+registry = DatasetRegistry()
+
+
+def _get_calculator(dataset_id: Optional[str]) -> DataQualityCalculator:
+    """Obtiene el calculador inicializado para `dataset_id` desde el registro.
+
+    Si no se indica dataset_id se usa el último dataset inicializado
+    (compatibilidad con clientes que no envían el parámetro).
+    """
+    if dataset_id is None:
+        calculator = registry.get_default()
+        if calculator is None:
+            raise HTTPException(status_code=400, detail="Dataset not initialized. Call /initialize first.")
+        print("⚠️ Warning: dataset_id not provided in request; using initialized dataset_id")
+        return calculator
+
+    calculator = registry.get(dataset_id)
+    if calculator is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Dataset not initialized: {dataset_id}. Call /initialize first."
+        )
+    return calculator
+
+
+async def _ensure_metric_columns(calculator: DataQualityCalculator, metric: str) -> None:
+    """Descarga las columnas que la métrica necesita si los datos residentes son una carga proyectada."""
+    if await calculator.ensure_columns([metric]):
+        registry.update_size(calculator.dataset_id)
 
 class DatasetRequest(BaseModel):
     dataset_id: str
@@ -179,20 +214,35 @@ async def initialize_dataset(request: DatasetRequest) -> DatasetInfoResponse:
     Por defecto NO descarga todos los datos (evita llamar a `obtener_todos_los_datos_socrata`).
     Si `load_full` en la petición es True, entonces se cargan los datos completos.
     """
-    global calculator
     try:
         dataset_id = request.dataset_id
         print(f"🚀 Inicializando dataset con ID: {dataset_id}")
 
         # Obtener metadatos desde Socrata
-        metadata = obtener_metadatos_socrata(dataset_id)
+        metadata = await metric_executor.run_io(obtener_metadatos_socrata, dataset_id)
         print("🗂️ Metadatos obtenidos:")
         try:
             print(json.dumps(metadata, indent=2, ensure_ascii=False))
         except Exception:
             print(metadata)
-        # Inicializar el calculador con metadata (sin cargar datos por defecto)
-        calculator = DataQualityCalculator(dataset_id, metadata)
+
+        # Si el dataset ya está residente en el registro se conservan sus datos
+        # cargados (cache hit) y solo se refrescan los metadatos, salvo que los datos
+        # hayan cambiado en Socrata (otro rowsUpdatedAt): entonces se descartan
+        calculator = registry.get(dataset_id)
+        if calculator is not None and dataset_version(calculator.metadata) != dataset_version(metadata):
+            print(f"🔄 Dataset {dataset_id} cambió en Socrata ({dataset_version(calculator.metadata)} -> "
+                  f"{dataset_version(metadata)}); se descartan los datos residentes")
+            calculator = DataQualityCalculator(dataset_id, metadata)
+            registry.put(calculator)
+        elif calculator is not None:
+            print(f"♻️ Dataset {dataset_id} ya residente en el registro; reutilizando datos cargados")
+            calculator.metadata = metadata
+            registry.put(calculator)
+        else:
+            # Inicializar el calculador con metadata (sin cargar datos por defecto)
+            calculator = DataQualityCalculator(dataset_id, metadata)
+            registry.put(calculator)
 
         rows = 0
         columns = 0
@@ -201,7 +251,9 @@ async def initialize_dataset(request: DatasetRequest) -> DatasetInfoResponse:
 
         # Si el cliente solicitó carga completa, la ejecutamos
         if request.load_full:
-            await calculator.load_data()
+            if calculator.df is None or len(calculator.df) == 0:
+                await calculator.load_data()
+                registry.update_size(dataset_id)
             rows = len(calculator.df)
             columns = len(calculator.df.columns)
             records_count = rows
@@ -237,18 +289,55 @@ async def initialize_dataset(request: DatasetRequest) -> DatasetInfoResponse:
 
 
 @app.post("/load_data")
-async def load_full_data() -> DatasetInfoResponse:
-    """Carga los datos completos del dataset para el `calculator` ya inicializado."""
-    global calculator
-    if calculator is None:
-        raise HTTPException(status_code=400, detail="Dataset not initialized. Call /initialize first.")
+async def load_full_data(dataset_id: Optional[str] = None, force: bool = False, refresh: bool = False,
+                         source: Optional[str] = None, metrics: Optional[str] = None) -> DatasetInfoResponse:
+    """Carga los datos completos del dataset ya inicializado.
+
+    Parámetros:
+        dataset_id: ID del dataset (opcional, usa el último inicializado si se omite)
+        force: Si es True se descarga de nuevo aunque los datos ya estén residentes
+        refresh: Si es True se aplica un refresco incremental: solo se piden las filas
+            con `:updated_at` posterior a la última sincronización y se fusionan por `:id`
+        source: 'csv' (exportación CSV) o 'json' (API paginada); por defecto según
+            LOADER_FORMAT / LOADER_JSON_DATASETS
+        metrics: Métricas separadas por comas (p.ej. 'portabilidad,conformidad'): solo se
+            descargan las columnas que leen; las demás se agregan cuando otra métrica las
+            necesite. Sin `metrics` se cargan todas las columnas
+    """
+    if source is not None and source not in ('csv', 'json'):
+        raise HTTPException(status_code=400, detail="source debe ser 'csv' o 'json'")
+    metric_list = None
+    if metrics is not None:
+        metric_list = [m.strip().lower() for m in metrics.split(',') if m.strip()]
+        unknown = [m for m in metric_list if m not in PROJECTION_METRICS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Métricas desconocidas: {', '.join(unknown)}")
+    calculator = _get_calculator(dataset_id)
+    message = "Full data loaded successfully"
     try:
-        await calculator.load_data()
+        if refresh:
+            # Metadatos actualizados: rowsUpdatedAt es la versión usada por la caché en disco
+            metadata = await metric_executor.run_io(obtener_metadatos_socrata, calculator.dataset_id)
+            if metadata:
+                calculator.metadata = metadata
+            result = await calculator.refresh_data(limit=DEFAULT_RECORDS_LIMIT)
+            registry.update_size(calculator.dataset_id)
+            if result['mode'] == 'delta':
+                message = (f"Delta refresh applied: {result['updated_rows']} updated, "
+                           f"{result['new_rows']} new rows (high-water mark {result['high_water_mark']})")
+        elif force or calculator.df is None or len(calculator.df) == 0:
+            await calculator.load_data(source=source, metrics=metric_list)
+            registry.update_size(calculator.dataset_id)
+        elif await calculator.ensure_columns(metric_list):
+            # Carga proyectada residente: solo se descargan las columnas que faltan
+            registry.update_size(calculator.dataset_id)
+        else:
+            print(f"♻️ Datos de {calculator.dataset_id} ya residentes en el registro; se omite la descarga")
         rows = len(calculator.df)
         columns = len(calculator.df.columns)
         limit_reached = rows >= DEFAULT_RECORDS_LIMIT
         return DatasetInfoResponse(
-            message="Full data loaded successfully",
+            message=message,
             dataset_id=calculator.dataset_id,
             dataset_name=calculator.metadata.get('name', 'Desconocido'),
             rows=rows,
@@ -274,21 +363,8 @@ async def get_actualidad(dataset_id: Optional[str] = None) -> ScoreResponse:
         - Dataset debe estar inicializado
         - dataset_id debe coincidir con el dataset actual
     """
-    if calculator is None:
-        raise HTTPException(status_code=400, detail="Dataset not initialized. Call /initialize first.")
-
-    # Backwards-compatible behavior: if dataset_id not provided in query,
-    # use the already-initialized calculator.dataset_id. This avoids 422 errors
-    # for clients that previously called GET /actualidad without query params.
-    if dataset_id is None:
-        dataset_id = calculator.dataset_id
-        print("⚠️ Warning: dataset_id not provided in request; using initialized dataset_id")
-    else:
-        if calculator.dataset_id != dataset_id:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Dataset mismatch. Initialized: {calculator.dataset_id}, Requested: {dataset_id}"
-            )
+    calculator = _get_calculator(dataset_id)
+    dataset_id = calculator.dataset_id
     
     try:
         print(f"📊 Calculando actualidad para dataset: {dataset_id}")
@@ -313,19 +389,8 @@ async def get_confidencialidad(dataset_id: Optional[str] = None) -> ScoreRespons
         dataset_id (string, recomendado): debe coincidir con el dataset inicializado.
         Si se omite, se usa el dataset inicializado (fallback por compatibilidad).
     """
-    if calculator is None:
-        raise HTTPException(status_code=400, detail="Dataset not initialized. Call /initialize first.")
-
-    # Compatibilidad: si no se pasa dataset_id, usar el inicializado
-    if dataset_id is None:
-        dataset_id = calculator.dataset_id
-        print("⚠️ Warning: dataset_id not provided in request; using initialized dataset_id")
-    else:
-        if calculator.dataset_id != dataset_id:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Dataset mismatch. Initialized: {calculator.dataset_id}, Requested: {dataset_id}"
-            )
+    calculator = _get_calculator(dataset_id)
+    dataset_id = calculator.dataset_id
 
     try:
         print(f"📊 Calculando confidencialidad (metadata-only) para dataset: {dataset_id}")
@@ -424,18 +489,8 @@ async def get_accesibilidad(dataset_id: Optional[str] = None) -> ScoreResponse:
     Retorna:
         ScoreResponse(score=float, details=dict)
     """
-    if calculator is None:
-        raise HTTPException(status_code=400, detail="Dataset not initialized. Call /initialize first.")
-
-    if dataset_id is None:
-        dataset_id = calculator.dataset_id
-        print("⚠️ Warning: dataset_id not provided in request; using initialized dataset_id")
-    else:
-        if calculator.dataset_id != dataset_id:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Dataset mismatch. Initialized: {calculator.dataset_id}, Requested: {dataset_id}"
-            )
+    calculator = _get_calculator(dataset_id)
+    dataset_id = calculator.dataset_id
 
     try:
         print(f"📊 Calculando accesibilidad (metadata-only) para dataset: {dataset_id}")
@@ -497,19 +552,8 @@ async def get_completitud(dataset_id: Optional[str] = None) -> ScoreResponse:
         score: float entre 0-10 (10 = dataset completamente completo)
         details: objeto con detalles del cálculo (filas, columnas, nulos, etc.)
     """
-    if calculator is None:
-        raise HTTPException(status_code=400, detail="Dataset not initialized. Call /initialize first.")
-    
-    # Backwards-compatible behavior: if dataset_id not provided, use initialized dataset_id
-    if dataset_id is None:
-        dataset_id = calculator.dataset_id
-        print("⚠️ Warning: dataset_id not provided in request; using initialized dataset_id")
-    else:
-        if calculator.dataset_id != dataset_id:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Dataset mismatch. Initialized: {calculator.dataset_id}, Requested: {dataset_id}"
-            )
+    calculator = _get_calculator(dataset_id)
+    dataset_id = calculator.dataset_id
     
     # Validar que los datos estén cargados
     if calculator.df is None or len(calculator.df) == 0:
@@ -520,6 +564,7 @@ async def get_completitud(dataset_id: Optional[str] = None) -> ScoreResponse:
     
     try:
         print(f"📊 Calculando completitud para dataset: {dataset_id}")
+        await _ensure_metric_columns(calculator, 'completitud')
         print("🛈 Metadata usada:")
         try:
             print(json.dumps(calculator.metadata, indent=2, ensure_ascii=False))
@@ -527,26 +572,19 @@ async def get_completitud(dataset_id: Optional[str] = None) -> ScoreResponse:
             print(calculator.metadata)
         
         # Llamar a la función con verbose=False (metadata ya impresa en endpoint)
-        score = calculator.calculate_completitud(calculator.metadata, verbose=False)
-        
-        # Imprimir detalles solo en la consola (no en la respuesta)
-        total_filas = len(calculator.df)
-        total_columnas_actuales = len(calculator.df.columns)
-        total_celdas = total_filas * total_columnas_actuales
-        total_nulos = int(calculator.df.isna().sum().sum())
-        proporcion_nulos = total_nulos / total_celdas if total_celdas > 0 else 0
+        score = await metric_executor.run_metric(calculator, 'calculate_completitud', calculator.metadata, verbose=False)
         
-        columnas_metadata = calculator.metadata.get('columns') or []
-        total_columnas_metadata = len(columnas_metadata)
-        
-        # Identificar columnas con alto % de nulos (umbral 50%)
-        umbral_nulos = 0.50
-        num_col_porciento_nulos = 0
-        for col in calculator.df.columns:
-            nulos_col = calculator.df[col].isna().sum()
-            porciento_nulos = (nulos_col / total_filas) if total_filas > 0 else 0
-            if porciento_nulos > umbral_nulos:
-                num_col_porciento_nulos += 1
+        # Detalles calculados en el worker junto con el score: recalcularlos aquí
+        # (máscara de faltantes) bloquearía el event loop
+        detalles = calculator.cached_scores.get('completitud', {}).get('details', {})
+        total_filas = detalles.get('total_filas', 0)
+        total_columnas_actuales = detalles.get('total_columnas', 0)
+        total_columnas_metadata = detalles.get('total_columnas_metadata', 0)
+        total_celdas = detalles.get('total_celdas', 0)
+        total_nulos = detalles.get('total_nulos', 0)
+        proporcion_nulos = detalles.get('proporcion_nulos', 0.0)
+        filas_completas = detalles.get('filas_completas', 0)
+        num_col_porciento_nulos = detalles.get('columnas_alto_nulos', 0)
         
         # Imprimir detalles SOLO en consola
         print(f"\n📋 DETALLES DE COMPLETITUD:")
@@ -554,7 +592,8 @@ async def get_completitud(dataset_id: Optional[str] = None) -> ScoreResponse:
         print(f"  Columnas cargadas: {total_columnas_actuales}")
         print(f"  Columnas en metadata: {total_columnas_metadata}")
         print(f"  Celdas totales: {total_celdas}")
-        print(f"  Celdas nulas: {total_nulos} ({proporcion_nulos*100:.2f}%)")
+        print(f"  Celdas nulas/vacías: {total_nulos} ({proporcion_nulos*100:.2f}%)")
+        print(f"  Filas sin celdas faltantes: {filas_completas}")
         print(f"  Columnas con >50% nulos: {num_col_porciento_nulos}")
         print(f"  Score final: {round(float(score), 2)}")
         
@@ -566,19 +605,28 @@ async def get_completitud(dataset_id: Optional[str] = None) -> ScoreResponse:
 
 
 @app.get("/conformidad")
-async def get_conformidad(dataset_id: Optional[str] = None) -> ScoreResponse:
+async def get_conformidad(dataset_id: Optional[str] = None, suggestions: bool = False, top_k: int = 3) -> ScoreResponse:
     """Calcula la métrica de Conformidad mejorada usando metadata y datos.
 
     Reglas:
     - Si NO se detectan columnas relevantes (departamento, municipio, año, latitud, longitud, correo): Score = 10.0
     - Si se detectan columnas pero no hay datos cargados: Intenta cargar una muestra (5000 registros)
     - Si hay columnas y datos: Valida valores según reglas y retorna score basado en proporción de errores
+    - Si hay columnas de departamento y municipio: valida además que cada municipio pertenezca
+      a su departamento (jerarquía DIVIPOLA), con detalle de tipo 'departamento_municipio'
     
+    Parámetros:
+        suggestions: Si es True, las columnas de departamento/municipio incluyen sugerencias
+            de nombres válidos para los valores rechazados y el conteo de errores que son
+            solo de tildes/mayúsculas (accent_only_errors) frente a errores reales
+        top_k: Número de sugerencias por valor rechazado
+
     Score:
     - 10.0: Sin columnas para validar (máximo) o datos completamente válidos
     - 0.0: Todos los datos son inválidos (mínimo)
     """
     metadata_to_use = None
+    calculator = registry.get_default() if dataset_id is None else registry.get(dataset_id)
 
     # Determine metadata source
     if dataset_id is None:
@@ -592,7 +640,7 @@ async def get_conformidad(dataset_id: Optional[str] = None) -> ScoreResponse:
             metadata_to_use = calculator.metadata
         else:
             print(f"ℹ️ Obteniendo metadatos en línea para dataset_id={dataset_id}")
-            fetched = obtener_metadatos_socrata(dataset_id)
+            fetched = await metric_executor.run_io(obtener_metadatos_socrata, dataset_id)
             if not fetched:
                 raise HTTPException(status_code=404, detail=f"Metadata not found for dataset_id={dataset_id}")
             metadata_to_use = fetched
@@ -614,11 +662,17 @@ async def get_conformidad(dataset_id: Optional[str] = None) -> ScoreResponse:
         if any_found and (getattr(use_calc, 'df', None) is None or len(use_calc.df) == 0):
             print("ℹ️ Columnas relevantes detectadas y no hay datos cargados -> intentando cargar muestra (5000)")
             try:
-                await use_calc.load_data(limit=5000)
+                # Solo las columnas relevantes ($select)
+                await use_calc.load_data(limit=5000, metrics=['conformidad'])
+                registry.update_size(dataset_id)
             except Exception as e:
                 print(f"⚠️ No se pudieron cargar datos para validación: {e}")
+        elif any_found:
+            await _ensure_metric_columns(use_calc, 'conformidad')
 
-        score = use_calc.calculate_conformidad_from_metadata_and_data(metadata_to_use, verbose=True)
+        score = await metric_executor.run_metric(use_calc, 'calculate_conformidad_from_metadata_and_data',
+                                                 metadata_to_use, verbose=True,
+                                                 suggestions=suggestions, top_k=top_k)
 
         # Build details from cache if available
         cached = getattr(use_calc, 'cached_scores', {}).get('conformidad_advanced')
@@ -655,19 +709,8 @@ async def get_portabilidad(dataset_id: Optional[str] = None) -> ScoreResponse:
     Retorna:
         score: float entre 0-10 (10 = dataset completamente portable)
     """
-    if calculator is None:
-        raise HTTPException(status_code=400, detail="Dataset not initialized. Call /initialize first.")
-    
-    # Backwards-compatible behavior: if dataset_id not provided, use initialized dataset_id
-    if dataset_id is None:
-        dataset_id = calculator.dataset_id
-        print("⚠️ Warning: dataset_id not provided in request; using initialized dataset_id")
-    else:
-        if calculator.dataset_id != dataset_id:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Dataset mismatch. Initialized: {calculator.dataset_id}, Requested: {dataset_id}"
-            )
+    calculator = _get_calculator(dataset_id)
+    dataset_id = calculator.dataset_id
     
     # Validar que los datos estén cargados
     if calculator.df is None or len(calculator.df) == 0:
@@ -678,6 +721,7 @@ async def get_portabilidad(dataset_id: Optional[str] = None) -> ScoreResponse:
     
     try:
         print(f"📊 Calculando portabilidad para dataset: {dataset_id}")
+        await _ensure_metric_columns(calculator, 'portabilidad')
         print("🛈 Metadata usada:")
         try:
             print(json.dumps(calculator.metadata, indent=2, ensure_ascii=False))
@@ -685,7 +729,7 @@ async def get_portabilidad(dataset_id: Optional[str] = None) -> ScoreResponse:
             print(calculator.metadata)
         
         # Llamar a la función
-        score = calculator.calculate_portabilidad()
+        score = await metric_executor.run_metric(calculator, 'calculate_portabilidad')
         
         print(f"📈 Métrica de Portabilidad calculada: {score}")
         return ScoreResponse(score=round(float(score), 2))
@@ -721,19 +765,8 @@ async def get_disponibilidad(dataset_id: Optional[str] = None) -> ScoreResponse:
     Retorna:
         score: float entre 0-10 (10 = dataset siempre disponible)
     """
-    if calculator is None:
-        raise HTTPException(status_code=400, detail="Dataset not initialized. Call /initialize first.")
-    
-    # Backwards-compatible behavior: if dataset_id not provided, use initialized dataset_id
-    if dataset_id is None:
-        dataset_id = calculator.dataset_id
-        print("⚠️ Warning: dataset_id not provided in request; using initialized dataset_id")
-    else:
-        if calculator.dataset_id != dataset_id:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Dataset mismatch. Initialized: {calculator.dataset_id}, Requested: {dataset_id}"
-            )
+    calculator = _get_calculator(dataset_id)
+    dataset_id = calculator.dataset_id
     
     try:
         print(f"📊 Calculando disponibilidad para dataset: {dataset_id}")
@@ -761,6 +794,7 @@ async def get_trazabilidad(dataset_id: Optional[str] = None) -> ScoreResponse:
     `dataset_id`, se usa; si no, se obtienen metadatos on-demand.
     """
     metadata_to_use = None
+    calculator = registry.get_default() if dataset_id is None else registry.get(dataset_id)
 
     if dataset_id is None:
         if calculator is None:
@@ -773,7 +807,7 @@ async def get_trazabilidad(dataset_id: Optional[str] = None) -> ScoreResponse:
             metadata_to_use = calculator.metadata
         else:
             print(f"ℹ️ Obteniendo metadatos en línea para dataset_id={dataset_id}")
-            fetched = obtener_metadatos_socrata(dataset_id)
+            fetched = await metric_executor.run_io(obtener_metadatos_socrata, dataset_id)
             if not fetched:
                 raise HTTPException(status_code=404, detail=f"Metadata not found for dataset_id={dataset_id}")
             metadata_to_use = fetched
@@ -806,19 +840,8 @@ async def get_recuperabilidad(dataset_id: Optional[str] = None) -> ScoreResponse
     
     Fórmula: recuperabilidad = (accesibilidad + medidaMetadatosCompletos + metadatosAuditados) / 3
     """
-    if calculator is None:
-        raise HTTPException(status_code=400, detail="Dataset not initialized. Call /initialize first.")
-
-    # Backwards-compatible behavior
-    if dataset_id is None:
-        dataset_id = calculator.dataset_id
-        print("⚠️ Warning: dataset_id not provided in request; using initialized dataset_id")
-    else:
-        if calculator.dataset_id != dataset_id:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Dataset mismatch. Initialized: {calculator.dataset_id}, Requested: {dataset_id}"
-            )
+    calculator = _get_calculator(dataset_id)
+    dataset_id = calculator.dataset_id
 
     # Validar que los datos estén cargados
     if calculator.df is None or len(calculator.df) == 0:
@@ -879,19 +902,8 @@ async def get_credibilidad(dataset_id: Optional[str] = None) -> ScoreResponse:
 
     REQUIERE que los datos estén cargados via POST /load_data.
     """
-    if calculator is None:
-        raise HTTPException(status_code=400, detail="Dataset not initialized. Call /initialize first.")
-
-    # Backwards-compatible behavior: if dataset_id not provided, use initialized dataset_id
-    if dataset_id is None:
-        dataset_id = calculator.dataset_id
-        print("⚠️ Warning: dataset_id not provided in request; using initialized dataset_id")
-    else:
-        if calculator.dataset_id != dataset_id:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Dataset mismatch. Initialized: {calculator.dataset_id}, Requested: {dataset_id}"
-            )
+    calculator = _get_calculator(dataset_id)
+    dataset_id = calculator.dataset_id
 
     # Validar que los datos estén cargados
     if calculator.df is None or len(calculator.df) == 0:
@@ -918,7 +930,8 @@ async def get_credibilidad(dataset_id: Optional[str] = None) -> ScoreResponse:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/unicidad")
-async def get_unicidad(dataset_id: Optional[str] = None, nivel_riesgo: Optional[float] = 1.5) -> ScoreResponse:
+async def get_unicidad(dataset_id: Optional[str] = None, nivel_riesgo: Optional[float] = 1.5,
+                       mode: str = "exact") -> ScoreResponse:
     """Calcula la métrica de Unicidad del dataset (duplicados).
     
     Detecta:
@@ -933,6 +946,8 @@ async def get_unicidad(dataset_id: Optional[str] = None, nivel_riesgo: Optional[
             - 1.0: Penalización suave
             - 1.5: Penalización media (RECOMENDADO)
             - 2.0: Penalización estricta (para datos críticos)
+        mode: "exact" (default) o "near" para contar filas casi duplicadas
+            (difieren solo en espacios, mayúsculas o la hora final; MinHash + LSH)
     
     Validación:
         - Dataset debe estar inicializado
@@ -942,7 +957,11 @@ async def get_unicidad(dataset_id: Optional[str] = None, nivel_riesgo: Optional[
     Retorna:
         score: float entre 0-10 (10 = sin duplicados, 0 = muchos duplicados)
     """
+    if mode not in ("exact", "near"):
+        raise HTTPException(status_code=400, detail="mode must be 'exact' or 'near'")
+
     metadata_to_use = None
+    calculator = registry.get_default() if dataset_id is None else registry.get(dataset_id)
 
     # Determine metadata source
     if dataset_id is None:
@@ -959,23 +978,25 @@ async def get_unicidad(dataset_id: Optional[str] = None, nivel_riesgo: Optional[
         else:
             # Try to fetch metadata on-demand for the provided dataset_id
             print(f"ℹ️ Obteniendo metadatos en línea para dataset_id={dataset_id}")
-            fetched = obtener_metadatos_socrata(dataset_id)
+            fetched = await metric_executor.run_io(obtener_metadatos_socrata, dataset_id)
             if not fetched:
                 raise HTTPException(status_code=404, detail=f"Metadata not found for dataset_id={dataset_id}")
             metadata_to_use = fetched
 
     try:
         print(f"📊 Calculando unicidad para dataset: {dataset_id}")
-        print(f"   Nivel de riesgo: {nivel_riesgo}")
+        print(f"   Nivel de riesgo: {nivel_riesgo} | Modo: {mode}")
 
         # If we have an initialized calculator with data for this dataset, use it; otherwise
         # create a temporary calculator that only holds metadata (note: unicidad needs data,
         # so the temp calculator will return a neutral value if no data is present).
         if calculator is not None and calculator.dataset_id == dataset_id and getattr(calculator, 'df', None) is not None and len(calculator.df) > 0:
-            score = calculator.calculate_unicidad(nivel_riesgo=nivel_riesgo)
+            await _ensure_metric_columns(calculator, 'unicidad')
+            score = await metric_executor.run_metric(calculator, 'calculate_unicidad',
+                                                     nivel_riesgo=nivel_riesgo, mode=mode)
         else:
             temp_calc = DataQualityCalculator(dataset_id, metadata_to_use)
-            score = temp_calc.calculate_unicidad(nivel_riesgo=nivel_riesgo)
+            score = temp_calc.calculate_unicidad(nivel_riesgo=nivel_riesgo, mode=mode)
 
         print(f"📈 Métrica de Unicidad calculada: {score}")
         return ScoreResponse(score=round(float(score), 2))
@@ -983,13 +1004,78 @@ async def get_unicidad(dataset_id: Optional[str] = None, nivel_riesgo: Optional[
         print(f"❌ Error calculando unicidad: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/unicidad/stream")
+async def get_unicidad_stream(dataset_id: str, nivel_riesgo: Optional[float] = 1.5,
+                              limit: Optional[int] = None) -> Dict[str, Any]:
+    """Calcula la Unicidad exacta en streaming, sin cargar el dataset en memoria.
+
+    Las páginas se descargan de Socrata y se procesan a medida que llegan: cada fila
+    se reduce a un hash de 128 bits en una tabla particionada que se vuelca a disco
+    al superar UNICIDAD_STREAM_MEMORY_MB. No requiere /load_data ni está acotado por
+    DEFAULT_RECORDS_LIMIT, por lo que sirve para datasets de millones de filas.
+
+    Parámetros:
+        dataset_id: ID del dataset en datos.gov.co
+        nivel_riesgo: Parámetro de penalización (misma fórmula que /unicidad)
+        limit: Máximo de registros a procesar (None = todo el dataset)
+
+    Retorna:
+        score (0-10), filas y columnas duplicadas, pares de columnas y estadísticas
+        de páginas y volcados a disco.
+    """
+    loader = SocrataPageLoader(dataset_id)
+    stream = StreamingUnicidad()
+    try:
+        print(f"📊 Calculando unicidad en streaming para dataset: {dataset_id}")
+        async for page in loader.iter_pages(limit=limit):
+            await metric_executor.run_io(stream.add_page, page)
+        result = await metric_executor.run_io(stream.finish, nivel_riesgo)
+    except Exception as e:
+        stream.close()
+        print(f"❌ Error calculando unicidad en streaming: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    result['score'] = round(result['score'], 2)
+    result['pages'] = loader.stats['pages']
+    print(f"📈 Unicidad (streaming) sobre {result['total_filas']} filas: {result['score']} "
+          f"({result['stats']['spills']} volcados a disco)")
+    return result
+
+@app.get("/sessions")
+async def get_sessions():
+    """Lista los datasets residentes en el registro de sesiones.
+
+    Retorna, por dataset: filas, columnas, memoria ocupada por el DataFrame
+    (`memory_usage(deep=True)`) y fecha del último acceso, además del total
+    de memoria usada frente al presupuesto y los contadores hit/miss/evicción.
+    `disk_cache` resume la caché persistente en disco (entradas, tamaño, hits/misses).
+    """
+    snapshot = registry.snapshot()
+    snapshot['disk_cache'] = dataset_cache.stats()
+    return snapshot
+
+@app.get("/executor")
+async def get_executor_stats():
+    """Estado del ejecutor de métricas.
+
+    Retorna el modo (process/thread/inline), las tareas en vuelo y en cola por pool
+    y, por métrica, la latencia media y máxima con su desglose: publicación del
+    DataFrame, espera en cola, carga en el worker y cómputo.
+    """
+    return metric_executor.stats()
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    metric_executor.shutdown()
+
 @app.get("/")
 async def root():
     return {
         "message": "Data Quality Assessment API", 
         "status": "running",
         "version": "1.0",
-        "features": ["pagination", "full_dataset_loading"]
+        "features": ["pagination", "full_dataset_loading", "multi_dataset_sessions", "metric_executor",
+                     "streaming_unicidad"]
     }
 
 if __name__ == "__main__":
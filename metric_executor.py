@@ -0,0 +1,342 @@
+"""
+Ejecutor de métricas fuera del event loop.
+
+Los endpoints de main.py son `async def`, pero las métricas sobre datos
+(unicidad, conformidad, completitud, portabilidad...) son CPU-bound y, si se
+ejecutan en el hilo del event loop, congelan todas las demás peticiones.
+
+Este módulo ofrece:
+- Un pool de procesos para las métricas pesadas sobre el DataFrame.
+- Un pool de hilos para E/S bloqueante (peticiones HTTP a Socrata, disco).
+- Copia residente del DataFrame en cada worker, indexada por versión del
+  dataset: el DataFrame se publica una vez en disco (pickle) por versión y cada
+  worker lo lee la primera vez que lo necesita, en lugar de serializarlo en
+  cada llamada. La escritura es atómica (archivo temporal + `os.replace`) y una
+  versión reemplazada se borra cuando terminan las tareas que aún la usan.
+- Profundidad de cola y desglose de latencias por métrica
+  (espera en cola, carga del DataFrame en el worker y cómputo).
+
+Modos (`METRIC_EXECUTOR_MODE`): 'process' (por defecto), 'thread' o 'inline'.
+"""
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+from dotenv import load_dotenv
+
+# Cargar variables de entorno desde .env
+load_dotenv()
+
+METRIC_EXECUTOR_MODE = os.getenv("METRIC_EXECUTOR_MODE", "process").lower()
+METRIC_PROCESS_WORKERS = int(os.getenv("METRIC_PROCESS_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+METRIC_THREAD_WORKERS = int(os.getenv("METRIC_THREAD_WORKERS", 8))
+# DataFrames residentes por worker (LRU)
+METRIC_WORKER_FRAMES = int(os.getenv("METRIC_WORKER_FRAMES", 2))
+METRIC_SHARED_DIR = os.getenv("METRIC_SHARED_DIR", os.path.join(tempfile.gettempdir(), "dq_metric_frames"))
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# LADO DEL WORKER (se ejecuta dentro de cada proceso del pool)
+# ═══════════════════════════════════════════════════════════════════════════
+# frame_key -> (DataFrame, cachés del calculador derivadas de ese DataFrame)
+_WORKER_FRAMES: "OrderedDict[str, tuple]" = OrderedDict()
+# Cachés por versión de datos que se conservan entre llamadas sobre el mismo DataFrame
+_WORKER_SHARED_CACHES = ('_profile_cache', '_value_counts_cache', '_value_counts_key')
+
+
+def _worker_frame(frame_key: str, frame_path: str):
+    """DataFrame residente del worker (y sus cachés); lo lee del disco solo si no lo tiene."""
+    entry = _WORKER_FRAMES.get(frame_key)
+    if entry is not None:
+        _WORKER_FRAMES.move_to_end(frame_key)
+        return entry, True
+    entry = (pd.read_pickle(frame_path), {})
+    _WORKER_FRAMES[frame_key] = entry
+    while len(_WORKER_FRAMES) > METRIC_WORKER_FRAMES:
+        _WORKER_FRAMES.popitem(last=False)
+    return entry, False
+
+
+def _worker_run_metric(frame_key: Optional[str], frame_path: Optional[str], dataset_id: str,
+                       metadata: Dict, method_name: str, args: tuple, kwargs: Dict,
+                       submitted_at: float):
+    """Ejecuta `DataQualityCalculator.<method_name>` sobre la copia residente."""
+    from data_quality_calculator import DataQualityCalculator
+
+    started_at = time.time()
+    t0 = time.perf_counter()
+    (df, caches), frame_hit = ((None, {}), True)
+    if frame_key is not None:
+        (df, caches), frame_hit = _worker_frame(frame_key, frame_path)
+    load_seconds = time.perf_counter() - t0
+
+    calc = DataQualityCalculator(dataset_id, metadata)
+    if df is not None:
+        calc.df = df
+        calc.df_filas = len(df)
+        calc.df_columnas = len(df.columns)
+        # Perfil de columnas y frecuencias ya calculados por métricas anteriores
+        for attr, value in caches.items():
+            setattr(calc, attr, value)
+
+    t1 = time.perf_counter()
+    result = getattr(calc, method_name)(*args, **kwargs)
+    compute_seconds = time.perf_counter() - t1
+    if df is not None:
+        for attr in _WORKER_SHARED_CACHES:
+            if getattr(calc, attr, None) is not None:
+                caches[attr] = getattr(calc, attr)
+
+    timings = {
+        'queue_wait': max(0.0, started_at - submitted_at),
+        'load': load_seconds,
+        'compute': compute_seconds,
+        'frame_cache_hit': frame_hit,
+        'pid': os.getpid(),
+    }
+    return result, calc.cached_scores, timings
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# LADO DEL SERVIDOR
+# ═══════════════════════════════════════════════════════════════════════════
+class MetricExecutor:
+    """
+    Capa de ejecución de métricas y E/S.
+
+    Args:
+        mode: 'process', 'thread' o 'inline'
+        process_workers: Procesos para métricas pesadas
+        thread_workers: Hilos para E/S bloqueante
+    """
+
+    def __init__(self, mode: str = METRIC_EXECUTOR_MODE, process_workers: int = METRIC_PROCESS_WORKERS,
+                 thread_workers: int = METRIC_THREAD_WORKERS, shared_dir: str = METRIC_SHARED_DIR):
+        self.mode = mode if mode in ('process', 'thread', 'inline') else 'process'
+        self.process_workers = max(1, process_workers)
+        self.thread_workers = max(1, thread_workers)
+        self.shared_dir = shared_dir
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        # dataset_id -> (frame_key, frame_path) publicado en disco
+        self._published: Dict[str, tuple] = {}
+        # Una publicación a la vez por dataset
+        self._publish_locks: Dict[str, threading.Lock] = {}
+        # frame_path -> tareas en vuelo que lo leen; versiones reemplazadas pendientes de borrar
+        self._frame_refs: Dict[str, int] = {}
+        self._retired = set()
+        self._in_flight = {'process': 0, 'thread': 0}
+        self._latencies: Dict[str, Dict] = {}
+
+    # ---------- pools ----------
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+            return self._process_pool
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(max_workers=self.thread_workers,
+                                                       thread_name_prefix="dq-io")
+            return self._thread_pool
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=False, cancel_futures=True)
+                self._process_pool = None
+            if self._thread_pool is not None:
+                self._thread_pool.shutdown(wait=False, cancel_futures=True)
+                self._thread_pool = None
+        paths = {path for _, path in self._published.values()} | self._retired
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._published = {}
+        self._frame_refs = {}
+        self._retired = set()
+
+    # ---------- publicación del DataFrame ----------
+    @staticmethod
+    def frame_key(calculator) -> Optional[str]:
+        """Clave de versión del DataFrame: dataset, rowsUpdatedAt y versión local de datos."""
+        if calculator.df is None:
+            return None
+        version = (calculator.metadata or {}).get('rowsUpdatedAt', 'na')
+        return f"{calculator.dataset_id}:{version}:{getattr(calculator, 'data_version', 0)}:{id(calculator.df)}"
+
+    def _publish_frame(self, calculator) -> tuple:
+        """
+        Escribe el DataFrame en disco una sola vez por versión (se ejecuta en un hilo)
+        y reserva la copia para una tarea: liberarla con `_release_frame`.
+        """
+        key = self.frame_key(calculator)
+        if key is None:
+            return None, None
+        with self._lock:
+            dataset_lock = self._publish_locks.setdefault(calculator.dataset_id, threading.Lock())
+        with dataset_lock:
+            published = self._published.get(calculator.dataset_id)
+            if not (published and published[0] == key):
+                os.makedirs(self.shared_dir, exist_ok=True)
+                safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in key)
+                path = os.path.join(self.shared_dir, f"{safe}.pkl")
+                # Un worker nunca ve un archivo a medio escribir
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                calculator.df.to_pickle(tmp_path)
+                os.replace(tmp_path, path)
+                with self._lock:
+                    self._published[calculator.dataset_id] = (key, path)
+                if published:
+                    # La versión anterior se borra cuando no la use ninguna tarea en cola
+                    self._retire_frame(published[1])
+                published = (key, path)
+            with self._lock:
+                self._frame_refs[published[1]] = self._frame_refs.get(published[1], 0) + 1
+            return published
+
+    def _retire_frame(self, path: str) -> None:
+        with self._lock:
+            if self._frame_refs.get(path):
+                self._retired.add(path)
+                return
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _release_frame(self, path: Optional[str]) -> None:
+        """Libera la reserva de una tarea; borra la copia si ya fue reemplazada y nadie la usa."""
+        if path is None:
+            return
+        with self._lock:
+            refs = self._frame_refs.get(path, 0) - 1
+            if refs > 0:
+                self._frame_refs[path] = refs
+                return
+            self._frame_refs.pop(path, None)
+            if path not in self._retired:
+                return
+            self._retired.discard(path)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    # ---------- ejecución ----------
+    async def run_io(self, func: Callable, *args, **kwargs) -> Any:
+        """Ejecuta una función bloqueante de E/S en el pool de hilos."""
+        loop = asyncio.get_running_loop()
+        self._in_flight['thread'] += 1
+        try:
+            return await loop.run_in_executor(self._get_thread_pool(), lambda: func(*args, **kwargs))
+        finally:
+            self._in_flight['thread'] -= 1
+
+    async def run_metric(self, calculator, method_name: str, *args, **kwargs) -> Any:
+        """
+        Ejecuta `calculator.<method_name>(*args, **kwargs)` según el modo configurado.
+
+        En modo 'process' los `cached_scores` producidos en el worker se copian al
+        calculador del servidor (p.ej. los detalles de conformidad).
+        """
+        submitted_at = time.time()
+        t0 = time.perf_counter()
+
+        if self.mode == 'inline':
+            result = getattr(calculator, method_name)(*args, **kwargs)
+            compute = time.perf_counter() - t0
+            self._record(method_name, {'queue_wait': 0.0, 'load': 0.0, 'compute': compute}, compute)
+            return result
+
+        if self.mode == 'thread':
+            result = await self.run_io(getattr(calculator, method_name), *args, **kwargs)
+            total = time.perf_counter() - t0
+            self._record(method_name, {'queue_wait': 0.0, 'load': 0.0, 'compute': total}, total)
+            return result
+
+        frame_key, frame_path = await self.run_io(self._publish_frame, calculator)
+        publish_seconds = time.perf_counter() - t0
+
+        loop = asyncio.get_running_loop()
+        self._in_flight['process'] += 1
+        try:
+            result, cached_scores, timings = await loop.run_in_executor(
+                self._get_process_pool(), _worker_run_metric,
+                frame_key, frame_path, calculator.dataset_id, calculator.metadata,
+                method_name, args, kwargs, submitted_at
+            )
+        except BrokenProcessPool:
+            # Un worker murió (p.ej. por memoria): el pool se recrea en la próxima
+            # llamada y esta métrica se resuelve en un hilo
+            print("⚠️ Pool de procesos caído; la métrica se ejecuta en un hilo")
+            with self._lock:
+                self._process_pool = None
+            result = await self.run_io(getattr(calculator, method_name), *args, **kwargs)
+            total = time.perf_counter() - t0
+            self._record(method_name, {'queue_wait': 0.0, 'load': 0.0, 'compute': total}, total)
+            return result
+        finally:
+            self._in_flight['process'] -= 1
+            self._release_frame(frame_path)
+
+        calculator.cached_scores.update(cached_scores or {})
+        timings['publish'] = publish_seconds
+        self._record(method_name, timings, time.perf_counter() - t0)
+        return result
+
+    # ---------- estadísticas ----------
+    def _record(self, method_name: str, timings: Dict, total: float) -> None:
+        stats = self._latencies.setdefault(method_name, {
+            'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'frame_cache_hits': 0,
+            'breakdown_seconds': {'publish': 0.0, 'queue_wait': 0.0, 'load': 0.0, 'compute': 0.0},
+        })
+        stats['count'] += 1
+        stats['total_seconds'] += total
+        stats['max_seconds'] = max(stats['max_seconds'], total)
+        if timings.get('frame_cache_hit'):
+            stats['frame_cache_hits'] += 1
+        for part in stats['breakdown_seconds']:
+            stats['breakdown_seconds'][part] += float(timings.get(part, 0.0))
+
+    def stats(self) -> Dict:
+        """Profundidad de cola y latencias medias por métrica."""
+        in_flight_process = self._in_flight['process']
+        metrics = {}
+        for name, st in self._latencies.items():
+            n = max(1, st['count'])
+            metrics[name] = {
+                'count': st['count'],
+                'avg_seconds': round(st['total_seconds'] / n, 4),
+                'max_seconds': round(st['max_seconds'], 4),
+                'frame_cache_hits': st['frame_cache_hits'],
+                'avg_breakdown_seconds': {k: round(v / n, 4) for k, v in st['breakdown_seconds'].items()},
+            }
+        return {
+            'mode': self.mode,
+            'process_workers': self.process_workers,
+            'thread_workers': self.thread_workers,
+            'in_flight': dict(self._in_flight),
+            # Tareas que esperan un worker libre
+            'queue_depth': {
+                'process': max(0, in_flight_process - self.process_workers),
+                'thread': max(0, self._in_flight['thread'] - self.thread_workers),
+            },
+            'metrics': metrics,
+        }
+
+
+# Instancia compartida por la aplicación
+metric_executor = MetricExecutor()
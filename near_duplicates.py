@@ -0,0 +1,132 @@
+"""
+Detección aproximada de filas casi duplicadas (MinHash + LSH por bandas).
+
+Cada fila se ve como el conjunto de sus celdas normalizadas (un token por
+columna: minúsculas, espacios colapsados y sin hora final tipo "10:32:05").
+Dos filas que solo difieren en espacios, mayúsculas o en la marca de tiempo
+quedan con los mismos tokens, y las que difieren en pocas columnas tienen una
+similitud de Jaccard alta.
+
+Flujo, lineal en el número de filas:
+1. `row_token_hashes`: hash uint64 por celda, calculado sobre los valores
+   distintos de cada columna (`pd.factorize`) y no celda a celda.
+2. `minhash_signatures`: firma MinHash de cada fila (`num_perm` mínimos).
+3. `near_duplicate_labels`: las firmas se parten en bandas; las filas que
+   comparten una banda son candidatas, se confirman si la fracción de mínimos
+   iguales (Jaccard estimado) supera el umbral y se agrupan por componentes conexas.
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+# Cargar variables de entorno desde .env
+load_dotenv()
+
+NEAR_DUP_PERMUTATIONS = int(os.getenv("UNICIDAD_NEAR_PERMUTACIONES", "64"))
+NEAR_DUP_BANDS = int(os.getenv("UNICIDAD_NEAR_BANDAS", "8"))
+NEAR_DUP_THRESHOLD = float(os.getenv("UNICIDAD_NEAR_UMBRAL", "0.8"))
+
+_SPACES_RE = re.compile(r"\s+")
+# Hora al final de un valor: "2024-01-05T10:32:05.000", "05/01/2024 10:32", "... 10:32 +05:00"
+_TRAILING_TIME_RE = re.compile(r"[t ]?\d{1,2}:\d{2}(:\d{2}(\.\d+)?)?\s*(z|[+-]\d{2}:?\d{2})?$")
+_NULL_TOKEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def normalize_values(values: pd.Series) -> pd.Series:
+    """Normaliza textos para comparar filas: minúsculas, espacios colapsados y sin hora final."""
+    return (values.astype(str)
+            .str.lower()
+            .str.replace(_SPACES_RE, ' ', regex=True)
+            .str.strip()
+            .str.replace(_TRAILING_TIME_RE, '', regex=True)
+            .str.strip())
+
+
+def row_token_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Matriz (filas x columnas) de hashes uint64, uno por celda normalizada.
+
+    La posición de la columna entra en la clave del hash, así el mismo valor en
+    columnas distintas produce tokens distintos. Los nulos comparten un token por columna.
+    """
+    tokens = np.empty((len(df), df.shape[1]), dtype=np.uint64)
+    for pos in range(df.shape[1]):
+        codes, uniques = pd.factorize(df.iloc[:, pos], use_na_sentinel=True)
+        normalized = normalize_values(pd.Series(uniques, dtype=object))
+        hashes = pd.util.hash_pandas_object(normalized, index=False, hash_key=f"{pos:016d}").to_numpy()
+        hashes = np.append(hashes, _NULL_TOKEN + np.uint64(pos))
+        # codes == -1 (nulo) toma el último elemento
+        tokens[:, pos] = hashes[codes]
+    return tokens
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """Finalizador splitmix64: dispersa todos los bits de la entrada en la salida."""
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def minhash_signatures(tokens: np.ndarray, num_perm: int = NEAR_DUP_PERMUTATIONS, seed: int = 1) -> np.ndarray:
+    """Firmas MinHash (filas x num_perm): una función hash splitmix64 con semilla distinta por permutación."""
+    seeds = np.random.default_rng(seed).integers(
+        0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True)
+    signatures = np.empty((tokens.shape[0], num_perm), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for p in range(num_perm):
+            signatures[:, p] = _mix64(tokens ^ seeds[p]).min(axis=1)
+    return signatures
+
+
+def near_duplicate_labels(signatures: np.ndarray, bands: int = NEAR_DUP_BANDS,
+                          threshold: float = NEAR_DUP_THRESHOLD) -> np.ndarray:
+    """
+    Etiqueta de grupo por fila: filas con la misma etiqueta son casi duplicadas.
+
+    Con b bandas de r filas la probabilidad de ser candidatas es 1-(1-J^r)^b; por
+    defecto (8 x 8) el punto de corte queda cerca de J≈0.77. Cada fila se compara
+    solo con la primera fila de su cubeta en cada banda.
+    """
+    n_rows, num_perm = signatures.shape
+    if n_rows == 0:
+        return np.empty(0, dtype=np.int64)
+    rows_per_band = max(1, num_perm // max(1, bands))
+    positions = np.arange(n_rows)
+    sources, targets = [], []
+    for start in range(0, num_perm - rows_per_band + 1, rows_per_band):
+        band = pd.DataFrame(signatures[:, start:start + rows_per_band])
+        band_hash = pd.util.hash_pandas_object(band, index=False).to_numpy()
+        first = pd.Series(positions).groupby(band_hash, sort=False).transform('first').to_numpy()
+        candidates = np.flatnonzero(first != positions)
+        if len(candidates) == 0:
+            continue
+        agreement = (signatures[candidates] == signatures[first[candidates]]).mean(axis=1)
+        confirmed = candidates[agreement >= threshold]
+        sources.append(confirmed)
+        targets.append(first[confirmed])
+
+    if not sources:
+        return positions
+    sources = np.concatenate(sources)
+    targets = np.concatenate(targets)
+    graph = coo_matrix((np.ones(len(sources), dtype=np.int8), (sources, targets)), shape=(n_rows, n_rows))
+    _, labels = connected_components(graph, directed=False)
+    return labels
+
+
+def near_duplicated_mask(df: pd.DataFrame, num_perm: int = NEAR_DUP_PERMUTATIONS,
+                         bands: int = NEAR_DUP_BANDS, threshold: float = NEAR_DUP_THRESHOLD) -> pd.Series:
+    """
+    Filas casi duplicadas de una fila anterior (sin contar la primera de cada grupo),
+    con la misma forma que `DataFrame.duplicated()`.
+    """
+    if len(df) == 0 or df.shape[1] == 0:
+        return pd.Series(False, index=df.index)
+    signatures = minhash_signatures(row_token_hashes(df), num_perm)
+    labels = near_duplicate_labels(signatures, bands, threshold)
+    return pd.Series(pd.Series(labels).duplicated().to_numpy(), index=df.index)
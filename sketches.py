@@ -0,0 +1,320 @@
+"""
+Sketches combinables (mergeable) para perfilar columnas muy grandes en memoria acotada.
+
+- `HyperLogLog`: número de valores distintos (error típico 1.04/sqrt(2^p), ~0.8% con p=14
+  y 16 KB por columna) en lugar de la tabla hash completa de `nunique()`.
+- `SpaceSaving`: los k valores más frecuentes con su conteo (sobreestimado como mucho
+  en el mínimo del resumen) en lugar de `value_counts()` completo.
+- `TDigest`: cuantiles aproximados de columnas numéricas con `compression` centroides.
+
+Todos se actualizan por lotes vectorizados y se combinan con `merge`, así que cada
+página o partición se puede perfilar por separado y unir al final. `ColumnSketch`
+agrupa los tres para una columna y `profile_column_sketch` produce un `ColumnProfile`
+aproximado procesando la columna por bloques de `PROFILE_SKETCH_CHUNK_ROWS` filas.
+"""
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from column_profile import MISSING_VALUE_TOKENS, ColumnProfile, _canonical, text_value_flags, value_lengths
+
+# Cargar variables de entorno desde .env
+load_dotenv()
+
+# off: siempre exacto | auto: sketches desde PROFILE_SKETCH_MIN_ROWS filas | always
+PROFILE_SKETCHES = os.getenv("PROFILE_SKETCHES", "auto").lower()
+PROFILE_SKETCH_MIN_ROWS = int(os.getenv("PROFILE_SKETCH_MIN_ROWS", 1_000_000))
+PROFILE_SKETCH_CHUNK_ROWS = int(os.getenv("PROFILE_SKETCH_CHUNK_ROWS", 100_000))
+PROFILE_SKETCH_HLL_PRECISION = int(os.getenv("PROFILE_SKETCH_HLL_PRECISION", 14))
+PROFILE_SKETCH_TOP_K = int(os.getenv("PROFILE_SKETCH_TOP_K", 1000))
+PROFILE_SKETCH_TDIGEST_COMPRESSION = int(os.getenv("PROFILE_SKETCH_TDIGEST_COMPRESSION", 100))
+
+
+def use_sketches(rows: int) -> bool:
+    """Indica si un DataFrame de `rows` filas se perfila con sketches según la configuración."""
+    if PROFILE_SKETCHES == 'always':
+        return True
+    if PROFILE_SKETCHES == 'auto':
+        return rows >= PROFILE_SKETCH_MIN_ROWS
+    return False
+
+
+def hash_values(values: pd.Series, categorize: bool = True) -> np.ndarray:
+    """
+    Hash uint64 por valor (estable entre lotes); dict/list se hashean por su JSON ordenado.
+
+    Con valores ya distintos `categorize=False` evita factorizarlos otra vez (el hash es el mismo).
+    """
+    try:
+        return pd.util.hash_pandas_object(values, index=False, categorize=categorize).to_numpy()
+    except TypeError:
+        return pd.util.hash_pandas_object(values.map(_canonical).astype(str), index=False,
+                                          categorize=categorize).to_numpy()
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Longitud en bits de cada uint64 (0 para 0), exacta usando `frexp` sobre mitades de 32 bits."""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    high_bits = np.frexp(high)[1]
+    low_bits = np.frexp(low)[1]
+    return np.where(high_bits > 0, high_bits + 32, low_bits)
+
+
+class HyperLogLog:
+    """Estimador HyperLogLog de cardinalidad con 2^precision registros."""
+
+    def __init__(self, precision: int = PROFILE_SKETCH_HLL_PRECISION):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        if len(hashes) == 0:
+            return
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rest = hashes << np.uint64(self.precision)
+        # rho = posición del primer bit 1 en los 64-p bits restantes
+        rho = np.minimum(64 - _bit_length(rest) + 1, 64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rho)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError("HyperLogLog con distinta precisión")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m ** 2 / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int((self.registers == 0).sum())
+        if estimate <= 2.5 * self.m and zeros:
+            # Corrección para cardinalidades pequeñas (conteo lineal)
+            estimate = self.m * np.log(self.m / zeros)
+        return int(round(estimate))
+
+
+class SpaceSaving:
+    """
+    Resumen Space-Saving de los `k` valores más frecuentes.
+
+    Los conteos sobreestiman como mucho en `min_count` (el menor conteo del resumen
+    lleno). La combinación de dos resúmenes suma los conteos y completa los valores
+    ausentes con el mínimo del otro resumen (Agarwal et al., "Mergeable Summaries").
+    """
+
+    def __init__(self, k: int = PROFILE_SKETCH_TOP_K):
+        self.k = k
+        self.counts = pd.Series(dtype=np.int64)
+        self.min_count = 0
+
+    @classmethod
+    def from_counts(cls, counts: pd.Series, k: int = PROFILE_SKETCH_TOP_K) -> "SpaceSaving":
+        """Resumen a partir de conteos exactos (p.ej. `value_counts` de un lote)."""
+        summary = cls(k)
+        counts = counts[counts > 0].sort_values(ascending=False, kind='stable')
+        # Índice de valores planos (sin categorías) para poder unir resúmenes
+        counts.index = counts.index.astype(object)
+        summary.counts = counts.iloc[:k].astype(np.int64)
+        summary.min_count = int(counts.iloc[k]) if len(counts) > k else 0
+        return summary
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        union = self.counts.index.union(other.counts.index, sort=False)
+        merged = (self.counts.reindex(union, fill_value=self.min_count)
+                  + other.counts.reindex(union, fill_value=other.min_count))
+        merged = merged.sort_values(ascending=False, kind='stable')
+        self.min_count = int(merged.iloc[self.k]) if len(merged) > self.k else self.min_count + other.min_count
+        self.counts = merged.iloc[:self.k].astype(np.int64)
+        return self
+
+    def top(self, n: Optional[int] = None) -> pd.Series:
+        return self.counts if n is None else self.counts.iloc[:n]
+
+
+class TDigest:
+    """t-digest con fusión por lotes (función de escala k1) para cuantiles aproximados."""
+
+    def __init__(self, compression: int = PROFILE_SKETCH_TDIGEST_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+
+    @property
+    def total(self) -> float:
+        return float(self.weights.sum())
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        # Límite de cada centroide por la función k1: k(q) = δ/(2π)·asin(2q-1)
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1))
+        groups = np.floor(k - k[0]).astype(np.int64)
+        boundaries = np.flatnonzero(np.diff(groups)) + 1
+        starts = np.concatenate(([0], boundaries))
+        new_weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / new_weights
+        self.weights = new_weights
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self._compress(np.concatenate((self.means, values)),
+                           np.concatenate((self.weights, np.ones(len(values)))))
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        if len(other.means):
+            self._compress(np.concatenate((self.means, other.means)),
+                           np.concatenate((self.weights, other.weights)))
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self.means) == 0:
+            return None
+        centers = (np.cumsum(self.weights) - self.weights / 2) / self.total
+        return float(np.interp(q, centers, self.means))
+
+
+class ColumnSketch:
+    """HyperLogLog + Space-Saving (+ t-digest si es numérica) de una columna, combinable por partes."""
+
+    def __init__(self, numeric: bool = False, precision: int = PROFILE_SKETCH_HLL_PRECISION,
+                 top_k: int = PROFILE_SKETCH_TOP_K, compression: int = PROFILE_SKETCH_TDIGEST_COMPRESSION):
+        self.hll = HyperLogLog(precision)
+        self.heavy_hitters = SpaceSaving(top_k)
+        self.digest = TDigest(compression) if numeric else None
+
+    def update(self, values: pd.Series) -> None:
+        """Agrega un lote de valores no nulos."""
+        if len(values) == 0:
+            return
+        self.hll.add_hashes(hash_values(values))
+        try:
+            counts = values.value_counts(sort=False)
+        except TypeError:
+            counts = values.map(_canonical).value_counts(sort=False)
+        self.heavy_hitters.merge(SpaceSaving.from_counts(counts, self.heavy_hitters.k))
+        if self.digest is not None:
+            self.digest.update(values.to_numpy(dtype=np.float64))
+
+    def update_distinct(self, distinct: pd.Series, counts: np.ndarray, hashes: np.ndarray,
+                        numbers: Optional[np.ndarray] = None) -> None:
+        """
+        Agrega un lote ya factorizado: valores distintos, su frecuencia y sus hashes.
+
+        HyperLogLog solo necesita cada valor una vez, así que el resultado es el mismo
+        que `update` con todas las filas. `numbers` son los valores (con repeticiones)
+        para el t-digest.
+        """
+        if len(distinct) == 0:
+            return
+        self.hll.add_hashes(hashes)
+        self.heavy_hitters.merge(SpaceSaving.from_counts(
+            pd.Series(counts, index=pd.Index(distinct.to_numpy(dtype=object), dtype=object)),
+            self.heavy_hitters.k))
+        if self.digest is not None and numbers is not None:
+            self.digest.update(numbers)
+
+    def merge(self, other: "ColumnSketch") -> "ColumnSketch":
+        self.hll.merge(other.hll)
+        self.heavy_hitters.merge(other.heavy_hitters)
+        if self.digest is not None and other.digest is not None:
+            self.digest.merge(other.digest)
+        return self
+
+
+def profile_column_sketch(series: pd.Series, name=None, chunk_rows: int = PROFILE_SKETCH_CHUNK_ROWS,
+                          missing_tokens=MISSING_VALUE_TOKENS) -> ColumnProfile:
+    """
+    `ColumnProfile` aproximado de una columna procesada por bloques.
+
+    Nulos, vacíos, mínimo/máximo, varianza y longitudes son exactos (se acumulan
+    por bloque); `distinct_count` sale de HyperLogLog y el perfil conserva el
+    `ColumnSketch` (valores frecuentes y cuantiles) en `profile.sketch`.
+    """
+    profile = ColumnProfile(series.name if name is None else name, str(series.dtype), len(series))
+    profile.approximate = True
+    numeric = pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype)
+    sketch = ColumnSketch(numeric=numeric)
+
+    n = s1 = s2 = 0.0               # longitudes: conteo, suma, suma de cuadrados
+    count = mean = m2 = 0.0         # varianza (Welford por bloques)
+    negatives = 0
+    inferred = None
+    missing_chunks = []
+    for start in range(0, len(series), max(1, chunk_rows)):
+        chunk = series.iloc[start:start + chunk_rows]
+        # Una factorización por bloque: el resto se calcula sobre los valores distintos
+        try:
+            codes, uniques = pd.factorize(chunk, use_na_sentinel=True)
+            distinct = pd.Series(uniques)
+            hashes = hash_values(distinct, categorize=False) if len(distinct) else None
+            raw = distinct.to_numpy(dtype=object)
+        except TypeError:
+            # Celdas no hashables (dict/list): su forma canónica, como `hash_values`
+            codes, uniques = pd.factorize(chunk.map(_canonical), use_na_sentinel=True)
+            distinct = pd.Series(np.asarray(uniques, dtype=object))
+            hashes = hash_values(distinct.astype(str), categorize=False)
+            first = np.unique(codes[codes >= 0], return_index=True)[1]
+            raw = chunk[codes >= 0].iloc[first].to_numpy(dtype=object)
+        present = codes >= 0
+        counts = np.bincount(codes[present], minlength=len(distinct))
+        profile.null_count += int(len(chunk) - present.sum())
+        raw = pd.Series(raw)
+        _, missing, blank = text_value_flags(raw, missing_tokens)
+        missing_chunks.append(np.append(missing, True)[codes])
+        if len(distinct) == 0:
+            continue
+        values = chunk[present] if numeric else None
+        sketch.update_distinct(distinct, counts, hashes,
+                               values.to_numpy(dtype=np.float64) if numeric else None)
+        if inferred is None:
+            inferred = pd.api.types.infer_dtype(raw, skipna=True)
+
+        profile.empty_count += int(counts[blank].sum())
+        lengths = value_lengths(raw)
+        n, s1, s2 = n + counts.sum(), s1 + (lengths * counts).sum(), s2 + (lengths ** 2 * counts).sum()
+
+        if numeric:
+            arr = values.to_numpy(dtype=np.float64)
+            chunk_min, chunk_max = values.min(), values.max()
+            profile.min = chunk_min if profile.min is None else min(profile.min, chunk_min)
+            profile.max = chunk_max if profile.max is None else max(profile.max, chunk_max)
+            negatives += int((arr < 0).sum())
+            c_count, c_mean = len(arr), arr.mean()
+            c_m2 = ((arr - c_mean) ** 2).sum()
+            delta = c_mean - mean
+            total = count + c_count
+            mean += delta * c_count / total
+            m2 += c_m2 + delta ** 2 * count * c_count / total
+            count = total
+
+    profile.non_null = profile.rows - profile.null_count
+    if missing_chunks:
+        profile.missing_mask = np.concatenate(missing_chunks)
+        profile.missing_count = int(profile.missing_mask.sum())
+    profile.inferred_type = inferred or 'empty'
+    profile.distinct_count = min(sketch.hll.count(), profile.non_null) if profile.non_null else 0
+    if n:
+        profile.len_mean = s1 / n
+        if n > 1:
+            profile.len_std = float(np.sqrt(max((s2 - s1 ** 2 / n) / (n - 1), 0.0)))
+    if numeric:
+        profile.negative_count = negatives
+        profile.variance = m2 / (count - 1) if count > 1 else float('nan')
+    profile.sketch = sketch
+    return profile
+
+
+def profile_frame_sketch(df: pd.DataFrame, chunk_rows: int = PROFILE_SKETCH_CHUNK_ROWS,
+                         missing_tokens=MISSING_VALUE_TOKENS):
+    """Perfil aproximado de todas las columnas de `df` (nombre -> ColumnProfile)."""
+    return {col: profile_column_sketch(df[col], col, chunk_rows, missing_tokens) for col in df.columns}
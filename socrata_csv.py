@@ -0,0 +1,230 @@
+"""
+Ingesta de datasets Socrata desde la exportación CSV.
+
+La API JSON entrega una lista de dicts por página que luego se convierte en
+DataFrame: un objeto Python por celda y por fila mientras dura la carga. La
+exportación CSV se descarga como flujo (`stream=True`, gzip transparente) y se
+analiza directamente a columnas con pyarrow.csv o con el motor C de pandas, sin
+pasar por registros intermedios.
+
+Fuentes (`LOADER_CSV_SOURCE`):
+- `resource`: `/resource/{id}.csv` con SoQL (`$select`, `$where`, `$order=:id`,
+  `$limit`); la cabecera usa los `fieldName` de las columnas.
+- `rows`: exportación masiva `/api/views/{id}/rows.csv?accessType=DOWNLOAD`, sin
+  SoQL; la cabecera usa los nombres visibles, que se traducen a `fieldName` con
+  los metadatos, y la lectura se corta al llegar al límite.
+
+Tipos: todas las columnas se leen como texto (se conservan ceros a la izquierda
+como en "05001"). El analizador no infiere tipos: pyarrow los fija con el primer
+bloque y un "N/A" que aparezca más adelante en una columna number haría fallar la
+lectura. El tipado lo hace `column_types.coerce_frame` en `_set_dataframe` con los
+`dataTypeName` de los metadatos, igual que con la API JSON. Solo el campo vacío
+es nulo: "N/A", "null", etc. se conservan como texto para que completitud los
+cuente con su vocabulario de faltantes.
+
+Solo se reintentan los errores de red y HTTP 429/5xx; un CSV que no se puede
+analizar falla de inmediato y `load_data` recurre a la API JSON.
+
+La API JSON sigue disponible como respaldo y se puede elegir por dataset
+(`LOADER_FORMAT`, `LOADER_JSON_DATASETS`).
+"""
+import asyncio
+import csv
+import io
+import os
+import time
+from typing import Dict, Optional
+
+import pandas as pd
+import requests
+import urllib3
+from dotenv import load_dotenv
+
+from socrata_loader import (LOADER_MAX_RETRIES, LOADER_RETRY_BACKOFF, SOCRATA_API_KEY, SOCRATA_BASE_URL,
+                            SOCRATA_RESOURCE_ENDPOINT, TIMEOUT_REQUEST, SocrataPageError, _RETRYABLE_STATUS)
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    _HAS_PYARROW = True
+except ImportError:
+    _HAS_PYARROW = False
+
+# Cargar variables de entorno desde .env
+load_dotenv()
+
+# Formato de ingesta por defecto (csv | json) y datasets que siempre usan la API JSON
+LOADER_FORMAT = os.getenv("LOADER_FORMAT", "csv").lower()
+LOADER_JSON_DATASETS = frozenset(
+    d.strip() for d in os.getenv("LOADER_JSON_DATASETS", "").split(',') if d.strip())
+LOADER_CSV_SOURCE = os.getenv("LOADER_CSV_SOURCE", "resource").lower()
+LOADER_CSV_ENGINE = os.getenv("LOADER_CSV_ENGINE", "pyarrow" if _HAS_PYARROW else "c").lower()
+LOADER_CSV_BLOCK_MB = float(os.getenv("LOADER_CSV_BLOCK_MB", 4))
+
+# Errores de descarga que justifican un reintento (los de análisis no)
+_RETRYABLE_ERRORS = (requests.RequestException, urllib3.exceptions.HTTPError, OSError)
+
+
+def load_format_for(dataset_id: str) -> str:
+    """Formato de ingesta para un dataset: 'json' si está en LOADER_JSON_DATASETS, si no LOADER_FORMAT."""
+    if dataset_id in LOADER_JSON_DATASETS:
+        return 'json'
+    return 'json' if LOADER_FORMAT == 'json' else 'csv'
+
+
+class SocrataCsvLoader:
+    """
+    Descarga en flujo y análisis columnar de la exportación CSV de un dataset.
+
+    Uso:
+        loader = SocrataCsvLoader('ijus-ubej', metadata)
+        df = await loader.fetch_frame(limit=50000, select=':*,*')
+
+    Args:
+        dataset_id: Identificador del dataset
+        metadata: Metadatos de `/api/views/{id}` (tipos y nombres de columnas)
+        source: 'resource' (SoQL) o 'rows' (exportación masiva)
+        engine: 'pyarrow' o 'c' (motor C de pandas)
+        max_retries: Reintentos ante errores de red o HTTP 429/5xx
+        timeout: Timeout en segundos de la conexión y de cada lectura
+    """
+
+    def __init__(
+        self,
+        dataset_id: str,
+        metadata: Optional[Dict] = None,
+        source: str = LOADER_CSV_SOURCE,
+        engine: str = LOADER_CSV_ENGINE,
+        max_retries: int = LOADER_MAX_RETRIES,
+        timeout: int = TIMEOUT_REQUEST,
+    ):
+        self.dataset_id = dataset_id
+        self.metadata = metadata or {}
+        self.source = 'rows' if source == 'rows' else 'resource'
+        self.engine = 'pyarrow' if engine == 'pyarrow' and _HAS_PYARROW else 'c'
+        self.max_retries = max(0, int(max_retries))
+        self.timeout = timeout
+        if self.source == 'rows':
+            self.url = f"{SOCRATA_BASE_URL}/api/views/{dataset_id}/rows.csv"
+        else:
+            self.url = f"{SOCRATA_BASE_URL}{SOCRATA_RESOURCE_ENDPOINT}/{dataset_id}.csv"
+
+        self._session = requests.Session()
+        self._session.headers["Accept-Encoding"] = "gzip"
+        if SOCRATA_API_KEY:
+            self._session.headers["X-App-Token"] = SOCRATA_API_KEY
+
+        # Estadísticas de la última carga
+        self.stats = {'rows': 0, 'retries': 0, 'elapsed_seconds': 0.0}
+
+    def _params(self, limit: int, select: Optional[str], where: Optional[str]) -> Dict:
+        if self.source == 'rows':
+            return {'accessType': 'DOWNLOAD'}
+        params = {'$limit': limit, '$order': ':id'}
+        if select:
+            params['$select'] = select
+        if where:
+            params['$where'] = where
+        return params
+
+    def _open(self, params: Dict):
+        """Abre la descarga en flujo y retorna un objeto tipo archivo con el CSV (ya descomprimido)."""
+        response = self._session.get(self.url, params=params, stream=True, timeout=self.timeout)
+        if response.status_code in _RETRYABLE_STATUS:
+            response.close()
+            raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+        if response.status_code != 200:
+            text = response.text[:200]
+            response.close()
+            raise SocrataPageError(f"HTTP {response.status_code}: {text}")
+        response.raw.decode_content = True
+        return response.raw
+
+    def _display_to_field(self) -> Dict[str, str]:
+        """Nombre visible -> fieldName, para la cabecera de rows.csv."""
+        mapping = {}
+        for column in self.metadata.get('columns') or []:
+            if isinstance(column, dict) and column.get('name') and column.get('fieldName'):
+                mapping[str(column['name'])] = str(column['fieldName'])
+        return mapping
+
+    def _parse(self, stream, limit: int) -> pd.DataFrame:
+        """Analiza el CSV del flujo a un DataFrame columnar (hasta `limit` filas)."""
+        buffered = io.BufferedReader(stream, buffer_size=1 << 20)
+        header_line = buffered.readline().decode('utf-8-sig')
+        if not header_line.strip():
+            return pd.DataFrame()
+        header = next(csv.reader([header_line]))
+        if self.source == 'rows':
+            mapping = self._display_to_field()
+            header = [mapping.get(col, col) for col in header]
+
+        if self.engine == 'pyarrow':
+            # El resto del flujo (la cabecera ya se consumió) se analiza por bloques
+            reader = pa_csv.open_csv(
+                buffered,
+                read_options=pa_csv.ReadOptions(column_names=header,
+                                                block_size=int(LOADER_CSV_BLOCK_MB * 1024 * 1024)),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={col: pa.string() for col in header},
+                    null_values=[''], strings_can_be_null=True, quoted_strings_can_be_null=True),
+            )
+            batches = []
+            rows = 0
+            for batch in reader:
+                batches.append(batch)
+                rows += batch.num_rows
+                if rows >= limit:
+                    break
+            if not batches:
+                return pd.DataFrame(columns=header)
+            table = pa.Table.from_batches(batches, schema=reader.schema).slice(0, limit)
+            return table.to_pandas()
+
+        return pd.read_csv(
+            buffered, encoding='utf-8', names=header, header=None, engine='c', nrows=limit,
+            dtype=str, keep_default_na=False, na_values=[''],
+            low_memory=False,
+        )
+
+    def _read_frame(self, limit: int, select: Optional[str], where: Optional[str]) -> pd.DataFrame:
+        """Descarga y análisis bloqueantes (se ejecutan en un hilo) con reintentos."""
+        params = self._params(limit, select, where)
+        attempt = 0
+        while True:
+            try:
+                stream = self._open(params)
+                try:
+                    return self._parse(stream, limit)
+                finally:
+                    stream.close()
+            except SocrataPageError:
+                raise
+            except _RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise SocrataPageError(f"CSV de {self.dataset_id} falló tras {attempt + 1} intentos: {e}") from e
+                attempt += 1
+                self.stats['retries'] += 1
+                time.sleep(LOADER_RETRY_BACKOFF * (2 ** (attempt - 1)))
+            except Exception as e:
+                # Error de análisis: repetir la descarga daría el mismo resultado
+                raise SocrataPageError(f"CSV de {self.dataset_id} no se pudo analizar: {e}") from e
+
+    async def fetch_frame(self, limit: int, select: Optional[str] = None,
+                          where: Optional[str] = None) -> pd.DataFrame:
+        """
+        Descarga hasta `limit` filas de la exportación CSV como DataFrame.
+
+        Args:
+            limit: Máximo de filas
+            select: Cláusula SoQL `$select` (solo fuente 'resource')
+            where: Cláusula SoQL `$where` (solo fuente 'resource')
+        """
+        start = time.perf_counter()
+        self.stats = {'rows': 0, 'retries': 0, 'elapsed_seconds': 0.0}
+        df = await asyncio.to_thread(self._read_frame, limit, select, where)
+        self.stats['rows'] = len(df)
+        self.stats['elapsed_seconds'] = time.perf_counter() - start
+        print(f"📄 CSV descargado: {len(df)} filas ({self.source}, motor {self.engine}, "
+              f"reintentos={self.stats['retries']}, {self.stats['elapsed_seconds']:.2f}s)")
+        return df
@@ -0,0 +1,523 @@
+"""
+Cargador asíncrono de registros desde la API Socrata (datos.gov.co).
+
+Descarga las páginas de `/resource/{dataset_id}.json` de forma concurrente
+con un límite configurable de peticiones en vuelo, reintentos por página y
+reensamblado en orden. Las peticiones HTTP se ejecutan en hilos mediante
+`asyncio.to_thread`, por lo que el event loop de FastAPI sigue atendiendo
+otros endpoints mientras se carga un dataset.
+
+Paginación (`LOADER_PAGINATION`):
+- `keyset` (por defecto): páginas `$order=:id` con `$where=:id > 'último visto'`.
+  El costo de cada página no crece con la posición (a diferencia de `$offset`
+  profundos) y el resultado es estable. El rango de `:id` se parte en
+  `LOADER_KEYSET_PARTITIONS` tramos (límites obtenidos con una consulta de una
+  fila por tramo) que se recorren en paralelo.
+- `offset`: páginas `$limit/$offset` concurrentes; se usa también como respaldo
+  si el servidor rechaza las consultas por `:id`.
+
+`fetch_records` retorna la lista de dicts; `fetch_frame` pide las páginas con
+gzip, las decodifica en flujo directamente a columnas (`json_columns`) y
+concatena los fragmentos de DataFrame.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import requests
+from dotenv import load_dotenv
+
+from json_columns import JSON_DECODER_CHUNK_KB, decode_json_records
+
+# Cargar variables de entorno desde .env
+load_dotenv()
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURACIÓN DESDE VARIABLES DE ENTORNO
+# ═══════════════════════════════════════════════════════════════════════════
+SOCRATA_BASE_URL = os.getenv("SOCRATA_BASE_URL", "https://www.datos.gov.co")
+SOCRATA_RESOURCE_ENDPOINT = os.getenv("SOCRATA_RESOURCE_ENDPOINT", "/resource")
+SOCRATA_API_KEY = os.getenv("SOCRATA_API_KEY", "")
+TIMEOUT_REQUEST = int(os.getenv("TIMEOUT_REQUEST", 30))
+
+# Tamaño de página y concurrencia del cargador
+LOADER_PAGE_SIZE = int(os.getenv("LOADER_PAGE_SIZE", 1000))
+LOADER_MAX_CONCURRENCY = int(os.getenv("LOADER_MAX_CONCURRENCY", 8))
+LOADER_MAX_RETRIES = int(os.getenv("LOADER_MAX_RETRIES", 3))
+LOADER_RETRY_BACKOFF = float(os.getenv("LOADER_RETRY_BACKOFF", 0.5))
+
+# Paginación por clave (:id): páginas más grandes y tramos de :id en paralelo
+LOADER_PAGINATION = os.getenv("LOADER_PAGINATION", "keyset").lower()
+LOADER_KEYSET_PAGE_SIZE = int(os.getenv("LOADER_KEYSET_PAGE_SIZE", 10000))
+LOADER_KEYSET_PARTITIONS = int(os.getenv("LOADER_KEYSET_PARTITIONS", 8))
+
+# Códigos HTTP que justifican reintentar la página
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class SocrataPageError(Exception):
+    """Error definitivo al obtener una página (agotados los reintentos)."""
+
+
+# Tramo de :id: (límite inferior inclusivo, límite superior exclusivo, filas esperadas)
+KeysetPartition = Tuple[Optional[str], Optional[str], Optional[int]]
+
+
+def _soql_literal(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class SocrataPageLoader:
+    """
+    Descarga concurrente y ordenada de las páginas de un dataset Socrata.
+
+    Uso:
+        loader = SocrataPageLoader('ijus-ubej')
+        records = await loader.fetch_records(limit=50000)
+
+    Args:
+        dataset_id: Identificador del dataset (p.ej. 'ijus-ubej')
+        page_size: Registros por página ($limit de cada petición); por defecto
+            `LOADER_KEYSET_PAGE_SIZE` en modo keyset y `LOADER_PAGE_SIZE` en modo offset
+        max_concurrency: Máximo de páginas en vuelo simultáneamente
+        max_retries: Reintentos por página ante errores de red o HTTP 429/5xx
+        timeout: Timeout en segundos de cada petición
+        pagination: 'keyset' (por :id) u 'offset'
+        partitions: Tramos de :id recorridos en paralelo en modo keyset
+    """
+
+    def __init__(
+        self,
+        dataset_id: str,
+        page_size: Optional[int] = None,
+        max_concurrency: int = LOADER_MAX_CONCURRENCY,
+        max_retries: int = LOADER_MAX_RETRIES,
+        timeout: int = TIMEOUT_REQUEST,
+        pagination: str = LOADER_PAGINATION,
+        partitions: int = LOADER_KEYSET_PARTITIONS,
+    ):
+        self.dataset_id = dataset_id
+        self.pagination = 'offset' if pagination == 'offset' else 'keyset'
+        if page_size is None:
+            page_size = LOADER_KEYSET_PAGE_SIZE if self.pagination == 'keyset' else LOADER_PAGE_SIZE
+        self.page_size = max(1, int(page_size))
+        self.partitions = max(1, int(partitions))
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_retries = max(0, int(max_retries))
+        self.timeout = timeout
+        self.base_url = f"{SOCRATA_BASE_URL}{SOCRATA_RESOURCE_ENDPOINT}/{dataset_id}.json"
+
+        self._session = requests.Session()
+        # Respuestas comprimidas: requests/urllib3 las descomprimen al leer
+        self._session.headers["Accept-Encoding"] = "gzip"
+        if SOCRATA_API_KEY:
+            self._session.headers["X-App-Token"] = SOCRATA_API_KEY
+
+        # Estadísticas de la última carga
+        self.stats = {'pages': 0, 'retries': 0, 'elapsed_seconds': 0.0}
+
+    def _get_json(self, params: Dict) -> List[Dict]:
+        """Petición HTTP bloqueante (se ejecuta en un hilo)."""
+        response = self._session.get(self.base_url, params=params, timeout=self.timeout)
+        if response.status_code in _RETRYABLE_STATUS:
+            raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+        if response.status_code != 200:
+            # Errores 4xx no se reintentan
+            raise SocrataPageError(f"HTTP {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    def _iter_body(self, params: Dict) -> Iterator[bytes]:
+        """Cuerpo de la respuesta en fragmentos (petición en flujo, gzip ya descomprimido)."""
+        response = self._session.get(self.base_url, params=params, timeout=self.timeout, stream=True)
+        try:
+            if response.status_code in _RETRYABLE_STATUS:
+                raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+            if response.status_code != 200:
+                raise SocrataPageError(f"HTTP {response.status_code}: {response.text[:200]}")
+            yield from response.iter_content(chunk_size=JSON_DECODER_CHUNK_KB * 1024)
+        finally:
+            response.close()
+
+    def _get_frame(self, params: Dict) -> pd.DataFrame:
+        """Petición bloqueante decodificada directamente a columnas (`ColumnarJsonDecoder`)."""
+        return decode_json_records(self._iter_body(params))
+
+    async def _request(self, params: Dict, columnar: bool = False):
+        """Ejecuta una petición con reintentos y backoff exponencial (lista de dicts o DataFrame)."""
+        attempt = 0
+        while True:
+            try:
+                return await asyncio.to_thread(self._get_frame if columnar else self._get_json, params)
+            except SocrataPageError:
+                raise
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise SocrataPageError(f"Página {params} falló tras {attempt + 1} intentos: {e}") from e
+                attempt += 1
+                self.stats['retries'] += 1
+                await asyncio.sleep(LOADER_RETRY_BACKOFF * (2 ** (attempt - 1)))
+
+    async def count_rows(self, where: Optional[str] = None) -> Optional[int]:
+        """Número total de filas del dataset (None si no se pudo obtener)."""
+        params = {'$select': 'count(*) AS n'}
+        if where:
+            params['$where'] = where
+        try:
+            result = await self._request(params)
+            if result:
+                return int(result[0].get('n') or result[0].get('count') or 0)
+        except Exception as e:
+            print(f"⚠️ No se pudo obtener el conteo de filas: {e}")
+        return None
+
+    async def _fetch_page(self, semaphore: asyncio.Semaphore, offset: int, page_limit: int,
+                          query: Optional[Dict] = None, columnar: bool = False):
+        params = dict(query or {})
+        params.update({
+            '$limit': page_limit,
+            '$offset': offset,
+            # Orden estable: sin $order las páginas por offset pueden solaparse
+            '$order': ':id',
+        })
+        async with semaphore:
+            page = await self._request(params, columnar)
+        self.stats['pages'] += 1
+        return page
+
+    async def _fetch_keyset_page(self, semaphore: asyncio.Semaphore, partition: KeysetPartition,
+                                 after: Optional[str], page_limit: int, query: Dict, columnar: bool = False):
+        lower, upper, _ = partition
+        conditions = [query['$where']] if query.get('$where') else []
+        if after is not None:
+            conditions.append(f":id > {_soql_literal(after)}")
+        elif lower is not None:
+            conditions.append(f":id >= {_soql_literal(lower)}")
+        if upper is not None:
+            conditions.append(f":id < {_soql_literal(upper)}")
+        params = dict(query)
+        params.pop('$where', None)
+        if conditions:
+            params['$where'] = ' AND '.join(f"({c})" for c in conditions)
+        params.update({'$limit': page_limit, '$order': ':id'})
+        async with semaphore:
+            page = await self._request(params, columnar)
+        self.stats['pages'] += 1
+        return page
+
+    async def _id_at(self, semaphore: asyncio.Semaphore, offset: int, where: Optional[str]) -> Optional[str]:
+        """`:id` de la fila en la posición `offset` (una sola fila), para fijar los límites de los tramos."""
+        params = {'$select': ':id', '$order': ':id', '$limit': 1, '$offset': offset}
+        if where:
+            params['$where'] = where
+        async with semaphore:
+            rows = await self._request(params)
+        return rows[0].get(':id') if rows else None
+
+    async def _plan_partitions(self, semaphore: asyncio.Semaphore, target: Optional[int],
+                               total: Optional[int], where: Optional[str]) -> List[KeysetPartition]:
+        """
+        Parte las primeras `target` filas (orden :id) en tramos de tamaño similar.
+
+        Sin conteo conocido, o con pocas páginas, se usa un único tramo abierto.
+        """
+        if target is None or total is None or self.partitions == 1 or target <= self.page_size:
+            return [(None, None, target)]
+        n = min(self.partitions, -(-target // self.page_size))
+        cuts = [round(k * target / n) for k in range(1, n)]
+        probes = cuts + ([target] if target < total else [])
+        ids = await asyncio.gather(*[self._id_at(semaphore, off, where) for off in probes])
+        if any(i is None for i in ids):
+            # El dataset cambió entre el conteo y los sondeos: un único tramo
+            return [(None, None, target)]
+        bounds = [None] + list(ids[:len(cuts)])
+        upper_last = ids[-1] if target < total else None
+        sizes = [b - a for a, b in zip([0] + cuts, cuts + [target])]
+        uppers = bounds[1:] + [upper_last]
+        return list(zip(bounds, uppers, sizes))
+
+    @staticmethod
+    def _last_id(page) -> Optional[str]:
+        """`:id` de la última fila de una página (lista de dicts o DataFrame)."""
+        if isinstance(page, pd.DataFrame):
+            return page[':id'].iloc[-1] if ':id' in page.columns else None
+        return page[-1].get(':id')
+
+    @staticmethod
+    def _without_id(page):
+        """Quita `:id` de una página cuando solo se pidió para avanzar."""
+        if isinstance(page, pd.DataFrame):
+            return page.drop(columns=':id', errors='ignore')
+        for record in page:
+            record.pop(':id', None)
+        return page
+
+    async def _iter_partition(self, semaphore: asyncio.Semaphore, partition: KeysetPartition,
+                              query: Dict, strip_id: bool, columnar: bool = False) -> AsyncIterator:
+        """Recorre un tramo de :id página a página (`:id > último visto`)."""
+        budget = partition[2]
+        after = None
+        fetched = 0
+        while budget is None or fetched < budget:
+            page_limit = self.page_size if budget is None else min(self.page_size, budget - fetched)
+            page = await self._fetch_keyset_page(semaphore, partition, after, page_limit, query, columnar)
+            if len(page) == 0:
+                break
+            after = self._last_id(page)
+            fetched += len(page)
+            if after is None and len(page) == page_limit:
+                # Sin :id no se puede pedir la página siguiente: fallar en lugar de truncar
+                raise SocrataPageError("Página keyset sin ':id'; no se puede continuar la paginación")
+            if strip_id:
+                page = self._without_id(page)
+            yield page
+            if len(page) < page_limit:
+                break
+
+    async def _collect_partition(self, semaphore: asyncio.Semaphore, partition: KeysetPartition,
+                                 query: Dict, strip_id: bool, columnar: bool = False) -> List:
+        pages = []
+        async for page in self._iter_partition(semaphore, partition, query, strip_id, columnar):
+            pages.append(page)
+        return pages
+
+    @staticmethod
+    def _keyset_query(query: Dict) -> Tuple[Dict, bool]:
+        """Asegura que `:id` esté en `$select` (necesario para avanzar); indica si hay que quitarlo después."""
+        select = query.get('$select')
+        if not select:
+            # Sin $select la API no entrega :id; se pide junto con todas las columnas
+            return dict(query, **{'$select': ':id,*'}), True
+        fields = {field.strip() for field in select.split(',')}
+        if ':id' in fields or ':*' in fields:
+            return query, False
+        return dict(query, **{'$select': f"{select},:id"}), True
+
+    async def _fetch_pages_offset(self, semaphore: asyncio.Semaphore, limit: int,
+                                  total: Optional[int], query: Dict, columnar: bool = False) -> List:
+        if total is not None:
+            target = min(limit, total)
+            offsets = list(range(0, target, self.page_size))
+            return await asyncio.gather(*[
+                self._fetch_page(semaphore, off, min(self.page_size, target - off), query, columnar)
+                for off in offsets
+            ])
+        pages = []
+        offset = 0
+        finished = False
+        while offset < limit and not finished:
+            wave_offsets = []
+            for _ in range(self.max_concurrency):
+                if offset >= limit:
+                    break
+                wave_offsets.append(offset)
+                offset += self.page_size
+            wave = await asyncio.gather(*[
+                self._fetch_page(semaphore, off, min(self.page_size, limit - off), query, columnar)
+                for off in wave_offsets
+            ])
+            for off, page in zip(wave_offsets, wave):
+                pages.append(page)
+                if len(page) < min(self.page_size, limit - off):
+                    # Última página alcanzada: descartar las posteriores de la tanda
+                    finished = True
+                    break
+        return pages
+
+    async def _fetch_pages_keyset(self, semaphore: asyncio.Semaphore, limit: int,
+                                  total: Optional[int], query: Dict, columnar: bool = False) -> List:
+        target = limit if total is None else min(limit, total)
+        partitions = await self._plan_partitions(semaphore, target, total, query.get('$where'))
+        self.stats['partitions'] = len(partitions)
+        keyset_query, strip_id = self._keyset_query(query)
+        per_partition = await asyncio.gather(*[
+            self._collect_partition(semaphore, partition, keyset_query, strip_id, columnar)
+            for partition in partitions
+        ])
+        return [page for pages in per_partition for page in pages]
+
+    async def _fetch_pages(self, limit: int, select: Optional[str], where: Optional[str],
+                           columnar: bool) -> List:
+        """Páginas (listas de dicts o DataFrames) en el orden de la paginación secuencial."""
+        start = time.perf_counter()
+        self.stats = {'pages': 0, 'retries': 0, 'elapsed_seconds': 0.0, 'pagination': self.pagination}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        query = {}
+        if select:
+            query['$select'] = select
+        if where:
+            query['$where'] = where
+
+        total = await self.count_rows(where)
+        pages = None
+        if self.pagination == 'keyset':
+            try:
+                pages = await self._fetch_pages_keyset(semaphore, limit, total, query, columnar)
+            except SocrataPageError as e:
+                print(f"⚠️ Paginación por :id no disponible ({e}); usando $offset")
+                self.stats['pagination'] = 'offset'
+        if pages is None:
+            pages = await self._fetch_pages_offset(semaphore, limit, total, query, columnar)
+
+        self.stats['elapsed_seconds'] = time.perf_counter() - start
+        print(f"📄 Páginas descargadas: {self.stats['pages']} "
+              f"({self.stats['pagination']}, tramos={self.stats.get('partitions', 1)}, "
+              f"concurrencia={self.max_concurrency}, reintentos={self.stats['retries']}, "
+              f"{self.stats['elapsed_seconds']:.2f}s)")
+        return pages
+
+    async def fetch_records(self, limit: int, select: Optional[str] = None,
+                            where: Optional[str] = None) -> List[Dict]:
+        """
+        Descarga hasta `limit` registros con páginas concurrentes.
+
+        En modo keyset cada tramo de :id avanza con `:id > último visto` y los
+        tramos se descargan en paralelo. En modo offset, si el conteo total está
+        disponible se planifican todas las páginas de una vez (acotadas por el
+        semáforo); si no, se descargan en tandas de `max_concurrency` páginas
+        hasta encontrar una página incompleta.
+
+        Args:
+            limit: Máximo de registros
+            select: Cláusula SoQL `$select` (p.ej. ':*,*' para incluir campos de sistema)
+            where: Cláusula SoQL `$where` (p.ej. filtro por `:updated_at`)
+
+        Returns:
+            list: Registros en el mismo orden que devolvería la paginación secuencial
+        """
+        records = []
+        for page in await self._fetch_pages(limit, select, where, columnar=False):
+            records.extend(page)
+        return records[:limit]
+
+    async def fetch_frame(self, limit: int, select: Optional[str] = None,
+                          where: Optional[str] = None) -> pd.DataFrame:
+        """
+        Igual que `fetch_records`, pero cada página se decodifica en flujo a columnas
+        (`json_columns.ColumnarJsonDecoder`) y los fragmentos se concatenan: nunca
+        existe la lista completa de dicts.
+
+        Returns:
+            DataFrame: Filas en el orden de la paginación secuencial (índice 0..n-1)
+        """
+        pages = await self._fetch_pages(limit, select, where, columnar=True)
+        pages = [page for page in pages if len(page) > 0]
+        if not pages:
+            return pd.DataFrame()
+        frame = pd.concat(pages, ignore_index=True, copy=False) if len(pages) > 1 else pages[0]
+        return frame.iloc[:limit]
+
+    async def _iter_pages_keyset(self, semaphore: asyncio.Semaphore, target: Optional[int],
+                                 total: Optional[int], query: Dict) -> AsyncIterator[List[Dict]]:
+        """
+        Páginas de todos los tramos en orden de :id. Cada tramo se descarga en su
+        propia tarea hacia una cola corta, así los tramos posteriores avanzan
+        mientras se consume el actual sin acumular el dataset.
+        """
+        partitions = await self._plan_partitions(semaphore, target, total, query.get('$where'))
+        self.stats['partitions'] = len(partitions)
+        keyset_query, strip_id = self._keyset_query(query)
+        queues = [asyncio.Queue(maxsize=2) for _ in partitions]
+
+        async def produce(partition, queue):
+            try:
+                async for page in self._iter_partition(semaphore, partition, keyset_query, strip_id):
+                    await queue.put(page)
+                await queue.put(None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await queue.put(e)
+
+        tasks = [asyncio.ensure_future(produce(partition, queue)) for partition, queue in zip(partitions, queues)]
+        try:
+            for queue in queues:
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def iter_pages(self, limit: Optional[int] = None, select: Optional[str] = None,
+                         where: Optional[str] = None) -> AsyncIterator[List[Dict]]:
+        """
+        Entrega las páginas en orden a medida que llegan, sin acumular el dataset.
+
+        Mantiene como máximo `max_concurrency` páginas en vuelo; al llegar una
+        página incompleta se cancelan las posteriores. En modo keyset los tramos
+        de :id avanzan en paralelo y se entregan uno tras otro; si las consultas
+        por :id fallan antes de entregar la primera página se usa `$offset`. Pensado para
+        métricas en streaming (p.ej. `StreamingUnicidad`) sobre datasets que no
+        caben en memoria.
+
+        Args:
+            limit: Máximo de registros (None = todo el dataset)
+            select: Cláusula SoQL `$select`
+            where: Cláusula SoQL `$where`
+        """
+        start = time.perf_counter()
+        self.stats = {'pages': 0, 'retries': 0, 'elapsed_seconds': 0.0, 'pagination': self.pagination}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        query = {}
+        if select:
+            query['$select'] = select
+        if where:
+            query['$where'] = where
+
+        total = await self.count_rows(where)
+        target = limit if total is None else (total if limit is None else min(limit, total))
+
+        if self.pagination == 'keyset':
+            yielded = False
+            try:
+                async for page in self._iter_pages_keyset(semaphore, target, total, query):
+                    yielded = True
+                    yield page
+                return
+            except SocrataPageError as e:
+                # Con páginas ya entregadas reiniciar por $offset las duplicaría
+                if yielded:
+                    raise
+                print(f"⚠️ Paginación por :id no disponible ({e}); usando $offset")
+                self.stats['pagination'] = 'offset'
+            finally:
+                self.stats['elapsed_seconds'] = time.perf_counter() - start
+
+        pending = deque()
+        offset = 0
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < self.max_concurrency:
+                    if target is not None and offset >= target:
+                        exhausted = True
+                        break
+                    page_limit = self.page_size if target is None else min(self.page_size, target - offset)
+                    task = asyncio.ensure_future(self._fetch_page(semaphore, offset, page_limit, query))
+                    pending.append((page_limit, task))
+                    offset += page_limit
+                if not pending:
+                    break
+                page_limit, task = pending.popleft()
+                page = await task
+                if page:
+                    yield page
+                if len(page) < page_limit:
+                    # Última página alcanzada: descartar las que siguen en vuelo
+                    exhausted = True
+                    for _, other in pending:
+                        other.cancel()
+                    pending.clear()
+        finally:
+            for _, other in pending:
+                other.cancel()
+            self.stats['elapsed_seconds'] = time.perf_counter() - start
@@ -0,0 +1,279 @@
+"""
+Unicidad en streaming con memoria acotada (datasets más grandes que la RAM).
+
+`StreamingUnicidad` consume las páginas a medida que llegan del cargador y
+nunca guarda el DataFrame completo:
+
+- Filas: cada fila se reduce a un hash de 128 bits (dos hashes de 64 bits
+  independientes de la suma de sus celdas no nulas), repartido por sus bits
+  altos en `partitions` particiones. Cuando la memoria de las particiones
+  supera el presupuesto se deduplican y, si sigue sin caber, se vuelcan a
+  disco (`.bin` por partición). Al final cada partición se fusiona por separado:
+  filas duplicadas = filas vistas - hashes distintos.
+- Columnas: huella de 128 bits por columna acumulada página a página (hash de
+  cada celda ponderado por su posición global), igual que la huella de
+  `DataQualityCalculator._duplicated_column_pairs` pero sin necesitar todas las
+  filas a la vez. Una columna que aparece tarde (Socrata omite los campos nulos
+  en JSON) hereda la contribución de los nulos de las filas anteriores.
+
+El score usa la misma fórmula que `calculate_unicidad`.
+"""
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# Cargar variables de entorno desde .env
+load_dotenv()
+
+UNICIDAD_STREAM_MEMORY_MB = float(os.getenv("UNICIDAD_STREAM_MEMORY_MB", "256"))
+UNICIDAD_STREAM_PARTITIONS = int(os.getenv("UNICIDAD_STREAM_PARTITIONS", "64"))
+UNICIDAD_STREAM_DIR = os.getenv("UNICIDAD_STREAM_DIR", "./cache/unicidad")
+
+_HASH_KEYS = ("unicidad-fila-01", "unicidad-fila-02")
+_NULL_CELL = np.uint64(0x9E3779B97F4A7C15)
+# Cada entrada de la tabla: dos uint64
+_ENTRY_DTYPE = np.dtype([('h1', np.uint64), ('h2', np.uint64)])
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """Finalizador splitmix64 (vectorizado sobre uint64)."""
+    with np.errstate(over='ignore'):
+        values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return values ^ (values >> np.uint64(31))
+
+
+def _canonical_text(value) -> str:
+    """Texto estable de una celda no nula, igual para cualquier página (dict/list como JSON ordenado)."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True, default=str, ensure_ascii=False)
+    return str(value)
+
+
+def _cell_hashes(series: pd.Series) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Hashes de 64 bits (dos claves) por celda y máscara de nulos.
+
+    Se calcula sobre los valores distintos de la página (`pd.factorize`) y se
+    expande por códigos, así cada valor se serializa una sola vez por página.
+    """
+    try:
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        texts = pd.Series([_canonical_text(v) for v in uniques], dtype=object)
+    except TypeError:
+        # Celdas no hashables (dict/list): factorizar su forma canónica
+        canonical = series.map(lambda v: None if not isinstance(v, (dict, list)) and pd.isna(v)
+                               else _canonical_text(v))
+        codes, uniques = pd.factorize(canonical, use_na_sentinel=True)
+        texts = pd.Series(list(uniques), dtype=object)
+    null_mask = codes < 0
+    result = []
+    for key in _HASH_KEYS:
+        hashes = pd.util.hash_pandas_object(texts, index=False, hash_key=key).to_numpy()
+        # Índice -1 (nulo) toma el último elemento
+        result.append(np.append(hashes, _NULL_CELL)[codes])
+    return result[0], result[1], null_mask
+
+
+class StreamingUnicidad:
+    """
+    Conteo exacto (a nivel de hash de 128 bits) de filas y columnas duplicadas por páginas.
+
+    Uso:
+        stream = StreamingUnicidad()
+        for page in pages:
+            stream.add_page(page)        # lista de registros o DataFrame
+        resultado = stream.finish(nivel_riesgo=1.5)
+
+    Args:
+        memory_budget_mb: Memoria máxima de la tabla de hashes de filas antes de volcar a disco
+        partitions: Número de particiones (potencia de 2) de la tabla de hashes
+        spill_dir: Directorio base de los volcados (se crea un subdirectorio temporal)
+    """
+
+    def __init__(self, memory_budget_mb: float = UNICIDAD_STREAM_MEMORY_MB,
+                 partitions: int = UNICIDAD_STREAM_PARTITIONS, spill_dir: str = UNICIDAD_STREAM_DIR):
+        self.partition_bits = max(0, int(np.ceil(np.log2(max(1, partitions)))))
+        self.partitions = 1 << self.partition_bits
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.spill_root = spill_dir
+        self._spill_dir: Optional[str] = None
+
+        self._buffers: List[List[np.ndarray]] = [[] for _ in range(self.partitions)]
+        self._buffer_bytes = 0
+        self._spilled = np.zeros(self.partitions, dtype=bool)
+
+        self.total_filas = 0
+        self.columns: List[str] = []
+        self._column_fp: Dict[str, np.ndarray] = {}
+        self._column_salts: Dict[str, Tuple[np.uint64, np.uint64]] = {}
+        # Huella acumulada de una columna que hubiera sido nula en todas las filas vistas
+        self._null_fp = np.zeros(2, dtype=np.uint64)
+        self.stats = {'pages': 0, 'spills': 0, 'spilled_bytes': 0, 'compactions': 0}
+
+    # ----- Entrada -----
+
+    def add_page(self, page) -> None:
+        """Agrega una página (lista de dicts de Socrata o DataFrame) a los conteos."""
+        df = page if isinstance(page, pd.DataFrame) else pd.DataFrame.from_records(page)
+        n = len(df)
+        if n == 0:
+            return
+        for col in df.columns:
+            if col not in self._column_fp:
+                # Columna nueva: las filas anteriores la tenían nula
+                self.columns.append(col)
+                self._column_fp[col] = self._null_fp.copy()
+                self._column_salts[col] = self._column_salt(col)
+
+        positions = np.arange(self.total_filas, self.total_filas + n, dtype=np.uint64)
+        weights = (_mix64(positions), _mix64(positions ^ np.uint64(0xD6E8FEB86659FD93)))
+        row_h = [np.zeros(n, dtype=np.uint64), np.zeros(n, dtype=np.uint64)]
+
+        with np.errstate(over='ignore'):
+            for k in range(2):
+                self._null_fp[k] += _mix64(np.full(n, _NULL_CELL, dtype=np.uint64) ^ weights[k]).sum(dtype=np.uint64)
+            for col in self.columns:
+                if col in df.columns:
+                    hashes = _cell_hashes(df[col])
+                    null_mask = hashes[2]
+                else:
+                    hashes = (np.full(n, _NULL_CELL, dtype=np.uint64),) * 2
+                    null_mask = np.ones(n, dtype=bool)
+                salts = self._column_salts[col]
+                for k in range(2):
+                    self._column_fp[col][k] += _mix64(hashes[k] ^ weights[k]).sum(dtype=np.uint64)
+                    # Filas: los nulos no aportan (una columna ausente en la página no cambia el hash)
+                    cell = _mix64(hashes[k] ^ salts[k])
+                    cell[null_mask] = 0
+                    row_h[k] += cell
+
+        entries = np.empty(n, dtype=_ENTRY_DTYPE)
+        entries['h1'] = row_h[0]
+        entries['h2'] = row_h[1]
+        self._add_entries(entries)
+        self.total_filas += n
+        self.stats['pages'] += 1
+
+    @staticmethod
+    def _column_salt(col: str) -> Tuple[np.uint64, np.uint64]:
+        """Sal por nombre de columna (estable entre páginas aunque cambie el orden de las columnas)."""
+        text = pd.Series([str(col)], dtype=object)
+        return tuple(pd.util.hash_pandas_object(text, index=False, hash_key=key).to_numpy()[0]
+                     for key in _HASH_KEYS)
+
+    # ----- Tabla de hashes particionada -----
+
+    def _add_entries(self, entries: np.ndarray) -> None:
+        part = (entries['h1'] >> np.uint64(64 - self.partition_bits)).astype(np.int64) \
+            if self.partition_bits else np.zeros(len(entries), dtype=np.int64)
+        order = np.argsort(part, kind='stable')
+        bounds = np.searchsorted(part[order], np.arange(self.partitions + 1))
+        for p in range(self.partitions):
+            chunk = entries[order[bounds[p]:bounds[p + 1]]]
+            if len(chunk):
+                self._buffers[p].append(chunk)
+                self._buffer_bytes += chunk.nbytes
+        if self._buffer_bytes > self.memory_budget:
+            self._compact()
+            if self._buffer_bytes > self.memory_budget // 2:
+                self._spill()
+
+    def _compact(self) -> None:
+        """Deduplica cada partición en memoria (solo importa cuántos hashes distintos hay)."""
+        self._buffer_bytes = 0
+        for p, chunks in enumerate(self._buffers):
+            if len(chunks) > 1 or (chunks and len(chunks[0]) > 1):
+                chunks[:] = [np.unique(np.concatenate(chunks))]
+            self._buffer_bytes += sum(c.nbytes for c in chunks)
+        self.stats['compactions'] += 1
+
+    def _partition_path(self, p: int) -> str:
+        if self._spill_dir is None:
+            os.makedirs(self.spill_root, exist_ok=True)
+            self._spill_dir = tempfile.mkdtemp(prefix='unicidad_', dir=self.spill_root)
+        return os.path.join(self._spill_dir, f"part_{p:04d}.bin")
+
+    def _spill(self) -> None:
+        """Vuelca todas las particiones en memoria a sus archivos (modo append)."""
+        for p, chunks in enumerate(self._buffers):
+            if not chunks:
+                continue
+            data = np.concatenate(chunks)
+            with open(self._partition_path(p), 'ab') as f:
+                data.tofile(f)
+            self._spilled[p] = True
+            self.stats['spilled_bytes'] += data.nbytes
+            chunks.clear()
+        self._buffer_bytes = 0
+        self.stats['spills'] += 1
+
+    def distinct_rows(self) -> int:
+        """Hashes de fila distintos: fusiona cada partición (disco + memoria) por separado."""
+        distinct = 0
+        for p in range(self.partitions):
+            parts = list(self._buffers[p])
+            if self._spilled[p]:
+                parts.append(np.fromfile(self._partition_path(p), dtype=_ENTRY_DTYPE))
+            if parts:
+                distinct += len(np.unique(np.concatenate(parts)))
+        return distinct
+
+    def duplicated_column_pairs(self) -> List[Tuple[str, str]]:
+        """Pares (columna original, columna repetida) con la misma huella de 128 bits."""
+        first_by_fp: Dict[tuple, str] = {}
+        pairs = []
+        for col in self.columns:
+            key = tuple(int(v) for v in self._column_fp[col])
+            if key in first_by_fp:
+                pairs.append((first_by_fp[key], col))
+            else:
+                first_by_fp[key] = col
+        return pairs
+
+    # ----- Resultado -----
+
+    def finish(self, nivel_riesgo: float = 1.5) -> Dict:
+        """Conteos finales y score de unicidad (misma fórmula que `calculate_unicidad`)."""
+        try:
+            total_filas = self.total_filas
+            total_columnas = len(self.columns)
+            if total_filas == 0:
+                return {'score': 5.0, 'total_filas': 0, 'total_columnas': total_columnas,
+                        'filas_duplicadas': 0, 'columnas_duplicadas': 0, 'pares_columnas': [],
+                        'stats': dict(self.stats)}
+
+            filas_duplicadas = total_filas - self.distinct_rows()
+            pares = self.duplicated_column_pairs()
+            proporcion_filas_dup = filas_duplicadas / total_filas
+            proporcion_columnas_dup = len(pares) / (total_columnas - 1) if total_columnas > 1 else 0
+
+            medida_filas = (1 - min(proporcion_filas_dup, 1.0)) ** nivel_riesgo
+            medida_columnas = (1 - min(proporcion_columnas_dup, 1.0)) ** nivel_riesgo
+            score = max(0, min(10, (medida_filas + medida_columnas) / 2 * 10))
+            return {
+                'score': float(score),
+                'total_filas': total_filas,
+                'total_columnas': total_columnas,
+                'filas_duplicadas': int(filas_duplicadas),
+                'columnas_duplicadas': len(pares),
+                'pares_columnas': pares,
+                'stats': dict(self.stats),
+            }
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Elimina los volcados en disco."""
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+        self._spilled[:] = False
+        self._buffers = [[] for _ in range(self.partitions)]
+        self._buffer_bytes = 0
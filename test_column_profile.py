@@ -0,0 +1,103 @@
+"""
+Script de prueba para el perfil de columnas compartido por las métricas
+"""
+import numpy as np
+import pandas as pd
+
+import column_profile
+from data_quality_calculator import DataQualityCalculator
+
+
+def test_perfil_columnas_una_pasada():
+    print("\n" + "=" * 70)
+    print("TEST DEL PERFIL DE COLUMNAS (UNA PASADA, CACHEADO POR VERSIÓN)")
+    print("=" * 70)
+
+    df = pd.DataFrame({
+        'texto': ['a', 'bbb', '  ', None, 'a', ''],
+        'numero': [3, -1, 7, -2, 0, 5],
+        'decimal': [0.5, np.nan, 1.5, np.nan, np.nan, 2.5],
+        'ubicacion': [{'lat': 1}, {'lat': 1}, None, {'lat': 2}, None, None],
+    })
+    perfiles = column_profile.profile_frame(df)
+    for perfil in perfiles.values():
+        print(f"   {perfil}")
+
+    texto = perfiles['texto']
+    longitudes = df['texto'].dropna().astype(str).str.len()
+    assert (texto.null_count, texto.empty_count, texto.distinct_count) == (1, 2, 4)
+    assert abs(texto.len_mean - longitudes.mean()) < 1e-12
+    assert abs(texto.len_std - longitudes.std()) < 1e-12
+
+    numero = perfiles['numero']
+    assert (numero.min, numero.max, numero.negative_count) == (-2, 7, 2)
+    assert abs(numero.variance - df['numero'].var()) < 1e-12
+
+    assert perfiles['decimal'].null_count == 3 and perfiles['decimal'].distinct_count == 3
+    # Celdas dict (location de Socrata) no rompen el conteo de distintos
+    assert perfiles['ubicacion'].distinct_count == 2 and perfiles['ubicacion'].null_count == 3
+
+    # Todas las métricas leen el mismo perfil: una sola pasada por versión de datos
+    llamadas = []
+    original = column_profile.profile_frame
+
+    def contar(frame, *args, **kwargs):
+        llamadas.append(len(frame))
+        return original(frame, *args, **kwargs)
+
+    import data_quality_calculator
+    data_quality_calculator.profile_frame = contar
+    try:
+        calc = DataQualityCalculator('test-perfil', {'columns': []})
+        calc._set_dataframe(df)
+        calc.calculate_completitud(verbose=False)
+        calc.calculate_precision()
+        calc.calculate_conformidad()
+        calc.calculate_consistencia()
+        assert len(llamadas) == 1, llamadas
+        # _optimize_dtypes actualiza el dtype del perfil al convertir
+        assert calc.column_profile()['decimal'].dtype == 'float32'
+
+        calc._set_dataframe(df.head(2))
+        calc.calculate_completitud(verbose=False)
+        assert llamadas == [6, 2]
+    finally:
+        data_quality_calculator.profile_frame = original
+    print("   OK - perfil calculado una vez y reutilizado por todas las métricas")
+
+
+def test_valores_faltantes_por_vocabulario():
+    print("\n" + "=" * 70)
+    print("TEST DE VALORES FALTANTES (VOCABULARIO + MÁSCARA CACHEADA)")
+    print("=" * 70)
+
+    df = pd.DataFrame({
+        'nombre': ['Ana', '', ' ', 'N/A', 'null', None, 'Luis', ' - '],
+        'categoria': pd.Categorical(['a', 'NA', 'b', 'b', 'Sin Dato', 'a', 'a', 'a']),
+        'valor': [1.0, np.nan, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0],
+    })
+    calc = DataQualityCalculator('test-faltantes', {'columns': [{'name': c} for c in df.columns]})
+    calc.df = df
+    calc.df_filas, calc.df_columnas = df.shape
+
+    mascara = calc.missing_bitmap()
+    print(f"   Faltantes por columna: {mascara.sum().to_dict()}")
+    assert mascara['nombre'].tolist() == [False, True, True, True, True, True, False, True]
+    assert mascara.sum().to_dict() == {'nombre': 6, 'categoria': 2, 'valor': 1}
+    assert calc.missing_bitmap() is mascara
+
+    # La regla del 50% usa los faltantes: 'nombre' supera el umbral aunque solo tenga 1 NaN
+    score = calc.calculate_completitud(verbose=False)
+    proporcion = 9 / 24
+    esperado = (10 * (1 - proporcion ** 1.5) + 10 * (1 - (1 / 3) ** 2) + 10) / 3
+    assert abs(score - esperado) < 1e-9
+
+    # Vocabulario configurable: sin marcadores solo cuentan nulos y textos vacíos
+    calc.missing_tokens = frozenset({''})
+    assert calc.missing_bitmap().sum().to_dict() == {'nombre': 3, 'categoria': 0, 'valor': 1}
+    print(f"   OK - score {score:.4f} con celdas 'N/A', '-', 'null' como faltantes")
+
+
+if __name__ == "__main__":
+    test_perfil_columnas_una_pasada()
+    test_valores_faltantes_por_vocabulario()
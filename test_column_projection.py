@@ -0,0 +1,100 @@
+"""
+Script de prueba para la proyección de columnas por métrica (sin red)
+"""
+import asyncio
+import pandas as pd
+import data_quality_calculator
+from column_projection import plan_columns, projection_select
+from data_quality_calculator import DataQualityCalculator
+
+METADATA = {'columns': [
+    {'fieldName': 'nombre', 'name': 'Nombre', 'dataTypeName': 'text'},
+    {'fieldName': 'd_formato', 'name': 'Formato', 'dataTypeName': 'text'},
+    {'fieldName': 'c_medio_de_conservaci_n_y', 'name': 'Medio de conservación', 'dataTypeName': 'text'},
+    {'fieldName': 'depto', 'name': 'Departamento', 'dataTypeName': 'text'},
+    {'fieldName': 'valor', 'name': 'Valor', 'dataTypeName': 'number'},
+    {'fieldName': 'observaciones', 'name': 'Observaciones', 'dataTypeName': 'text'},
+]}
+
+FORMATOS = ['CSV', 'Excel', 'PDF', 'Web', 'json']
+REGISTROS = [
+    {':id': f'row-{i:04d}', ':updated_at': '2024-01-01T00:00:00.000Z', 'nombre': f'Recurso {i}',
+     'd_formato': FORMATOS[i % 5], 'c_medio_de_conservaci_n_y': 'Digital', 'depto': 'Antioquia',
+     'valor': str(i), 'observaciones': 'N/A' if i % 3 else f'nota {i}'}
+    for i in range(200)
+]
+
+
+class FakeLoader:
+    """Respeta `$select` como la API; la segunda descarga llega en otro orden para probar la unión por :id."""
+    selects = []
+
+    def __init__(self, dataset_id):
+        pass
+
+    async def fetch_frame(self, limit, select=None, where=None):
+        FakeLoader.selects.append(select)
+        registros = REGISTROS[:limit]
+        if select and select != ':*,*':
+            campos = select.split(',')
+            registros = [{k: r[k] for k in campos if k in r} for r in registros]
+        if len(FakeLoader.selects) > 1:
+            registros = registros[::-1]
+        return pd.DataFrame.from_records(registros)
+
+
+def test_proyeccion_de_columnas():
+    print("\n" + "=" * 70)
+    print("TEST DE LA PROYECCIÓN DE COLUMNAS")
+    print("=" * 70)
+
+    assert plan_columns(['portabilidad'], METADATA) == ['d_formato', 'c_medio_de_conservaci_n_y']
+    assert plan_columns(['actualidad'], METADATA) == []
+    assert plan_columns(['completitud'], METADATA) is None
+    assert plan_columns(['portabilidad'], {}) is None
+    # Los nombres visibles de conformidad se traducen a fieldName
+    assert plan_columns(['conformidad'], METADATA, {'departamento': ['Departamento']}) == ['depto']
+    assert projection_select(['d_formato']) == ':id,:updated_at,d_formato'
+
+    loader_original = data_quality_calculator.SocrataPageLoader
+    cache_habilitada = data_quality_calculator.dataset_cache.enabled
+    data_quality_calculator.SocrataPageLoader = FakeLoader
+    data_quality_calculator.dataset_cache.enabled = False
+    try:
+        _verificar_carga_incremental()
+    finally:
+        data_quality_calculator.SocrataPageLoader = loader_original
+        data_quality_calculator.dataset_cache.enabled = cache_habilitada
+
+
+def _verificar_carga_incremental():
+    completo = DataQualityCalculator('test-proy', METADATA)
+    asyncio.run(completo.load_data(limit=150, source='json'))
+    FakeLoader.selects = []
+
+    calc = DataQualityCalculator('test-proy', METADATA)
+    asyncio.run(calc.load_data(limit=150, source='json', metrics=['portabilidad']))
+    print(f"   Proyección portabilidad: {FakeLoader.selects[-1]}")
+    assert FakeLoader.selects[-1] == ':id,:updated_at,d_formato,c_medio_de_conservaci_n_y'
+    assert list(calc.df.columns) == ['d_formato', 'c_medio_de_conservaci_n_y']
+    assert calc.calculate_portabilidad() == completo.calculate_portabilidad()
+
+    # Conformidad: solo se descarga la columna que falta y se une por :id
+    agregadas = asyncio.run(calc.ensure_columns(['conformidad']))
+    print(f"   Columnas agregadas para conformidad: {agregadas} ({FakeLoader.selects[-1]})")
+    assert agregadas == ['depto'] and FakeLoader.selects[-1] == ':id,:updated_at,depto'
+    assert asyncio.run(calc.ensure_columns(['portabilidad', 'conformidad'])) == []
+    assert len(FakeLoader.selects) == 2
+
+    # Completitud necesita todas: se completan y el resultado coincide con la carga completa
+    asyncio.run(calc.ensure_columns(['completitud']))
+    assert calc.loaded_columns is None
+    assert list(calc.df.columns) == list(completo.df.columns)
+    assert list(calc.system_fields[':id']) == list(completo.system_fields[':id'])
+    pd.testing.assert_frame_equal(calc.df, completo.df)
+    assert calc.calculate_completitud(verbose=False) == completo.calculate_completitud(verbose=False)
+    print("   OK - columnas por métrica, unión por :id y resultado igual a la carga completa")
+
+
+if __name__ == "__main__":
+    test_proyeccion_de_columnas()
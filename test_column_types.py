@@ -0,0 +1,90 @@
+"""
+Script de prueba para el tipado de columnas en la ingesta (dataTypeName de Socrata)
+"""
+import numpy as np
+import pandas as pd
+from column_types import coerce_frame
+from data_quality_calculator import DataQualityCalculator
+
+METADATA = {'columns': [
+    {'fieldName': 'cantidad', 'dataTypeName': 'number'},
+    {'fieldName': 'valor', 'dataTypeName': 'number'},
+    {'fieldName': 'fecha', 'dataTypeName': 'calendar_date'},
+    {'fieldName': 'activo', 'dataTypeName': 'checkbox'},
+    {'fieldName': 'codigo', 'dataTypeName': 'number'},
+    {'fieldName': 'ubicacion', 'dataTypeName': 'point'},
+    {'fieldName': 'nombre', 'dataTypeName': 'text'},
+]}
+
+
+def test_tipado_desde_metadatos():
+    print("\n" + "=" * 70)
+    print("TEST DE TIPADO DE COLUMNAS DESDE LOS METADATOS")
+    print("=" * 70)
+
+    n = 1000
+    registros = pd.DataFrame({
+        'cantidad': [str(i % 200) for i in range(n)],
+        'valor': ['N/A' if i % 10 == 0 else f"{-i * 0.5:.1f}" for i in range(n)],
+        'fecha': [f"2024-01-{i % 28 + 1:02d}T00:00:00.000" for i in range(n)],
+        'activo': ['true', 'false'] * (n // 2),
+        # Un valor no numérico: la columna se conserva sin cambios
+        'codigo': ['001', 'ABC'] * (n // 2),
+        'ubicacion': [{'type': 'Point', 'coordinates': [-74.1, 4.6]}] * n,
+        'nombre': [f"registro {i}" for i in range(n)],
+    })
+
+    df, convertidas = coerce_frame(registros, METADATA)
+    print(f"   Convertidas: {convertidas}")
+    assert convertidas == {'cantidad': 'uint8', 'valor': 'float64', 'fecha': 'datetime64[ns]', 'activo': 'bool'}
+    assert df['valor'].isna().sum() == 100
+    assert df['fecha'].iloc[0] == pd.Timestamp('2024-01-01')
+    assert df['codigo'].dtype == object and df['ubicacion'].dtype == object
+    # Idempotente: una segunda pasada no convierte nada
+    assert coerce_frame(df, METADATA)[1] == {}
+
+    # En la ingesta: las métricas numéricas ven los negativos de 'valor'
+    sin_tipos = DataQualityCalculator('test-tipos', {})
+    sin_tipos._set_dataframe(registros.drop(columns='ubicacion'))
+    con_tipos = DataQualityCalculator('test-tipos', METADATA)
+    con_tipos._set_dataframe(registros.drop(columns='ubicacion'))
+    antes = sin_tipos.df.memory_usage(deep=True).sum()
+    despues = con_tipos.df.memory_usage(deep=True).sum()
+    print(f"   Memoria: {antes / 1024:.0f} KB -> {despues / 1024:.0f} KB")
+    assert despues < antes / 2
+    assert con_tipos.column_profile()['valor'].negative_count == 900
+    assert sin_tipos.calculate_conformidad() == 10
+    assert np.isclose(con_tipos.calculate_conformidad(), 10 * np.exp(-5 * 900 / 2900))
+    print("   OK - columnas tipadas una sola vez en la ingesta")
+
+
+def test_flotantes_sin_perdida_de_precision():
+    print("\n" + "=" * 70)
+    print("TEST DE REDUCCIÓN A FLOAT32 SIN PÉRDIDA")
+    print("=" * 70)
+
+    metadata = {'columns': [
+        {'fieldName': 'nit', 'dataTypeName': 'number'},
+        {'fieldName': 'monto', 'dataTypeName': 'money'},
+        {'fieldName': 'puntaje', 'dataTypeName': 'number'},
+    ]}
+    calc = DataQualityCalculator('test-float32', metadata)
+    calc._set_dataframe(pd.DataFrame({
+        # NIT enteros con un nulo: se tipan como float64
+        'nit': [str(900123450 + i) for i in range(50)] + [None],
+        'monto': ['1234567.89'] * 25 + ['98765432.10'] * 25 + [None],
+        'puntaje': [f"{i * 0.5:.1f}" for i in range(50)] + [None],
+    }))
+    print(f"   Tipos: {calc.df.dtypes.astype(str).to_dict()}")
+    # float32 redondearía los NIT (50 -> 2 distintos) y los montos
+    assert calc.df['nit'].dtype == np.float64 and calc.df['nit'].nunique() == 50
+    assert calc.df['nit'].iloc[49] == 900123499
+    assert calc.df['monto'].dtype == np.float64 and calc.df['monto'].iloc[0] == 1234567.89
+    # Valores representables exactamente en float32 sí se reducen
+    assert calc.df['puntaje'].dtype == np.float32
+    print("   OK - float32 solo cuando la conversión no pierde precisión")
+
+
+if __name__ == "__main__":
+    test_tipado_desde_metadatos()
+    test_flotantes_sin_perdida_de_precision()
@@ -0,0 +1,119 @@
+"""
+Script de prueba para la validación vectorizada de Conformidad
+"""
+import pandas as pd
+from data_quality_calculator import DataQualityCalculator
+
+
+def test_conformidad_detalles_por_columna():
+    print("\n" + "=" * 70)
+    print("TEST DE CONFORMIDAD (VALIDACIÓN VECTORIZADA)")
+    print("=" * 70)
+
+    calc = DataQualityCalculator('test-conf', {})
+    calc._set_dataframe(pd.DataFrame({
+        'departamento': ['Antioquia', ' boyacá ', 'Narnia', None, 'Atlántico', 'Gondor'],
+        'año': ['2020', ' 1999', '2020.0', '1800', 'abc', None],
+        'latitud': ['4.5', '-1', '13', None, 'x', '7'],
+        'longitud': [-75.5, -80.0, -60.0, -70.0, None, -66.0],
+        'correo_contacto': ['a@b.co', 'malo@', 'x.y@dominio.gov.co ', None, 'sin correo', 'u@d.org'],
+    }))
+
+    score = calc.calculate_conformidad_from_metadata_and_data({}, verbose=True)
+    details = calc.cached_scores['conformidad_advanced']['details']
+    por_columna = {c['column']: c for c in details['columns_validated']}
+
+    for col, info in por_columna.items():
+        print(f"   {col:<16} total={info['total']} errores={info['errors']} ejemplos={info['examples']}")
+
+    assert por_columna['departamento']['errors'] == 2
+    assert por_columna['departamento']['examples'] == ['Narnia', 'Gondor']
+    assert por_columna['año']['errors'] == 3
+    assert por_columna['año']['examples'] == ['2020.0', '1800', 'abc']
+    assert por_columna['latitud']['errors'] == 2
+    assert por_columna['longitud']['errors'] == 1
+    assert por_columna['correo_contacto']['examples'] == ['malo@', 'sin correo']
+    assert details['total_validated'] == 5 + 5 + 5 + 5 + 5
+    assert details['total_errors'] == 2 + 3 + 2 + 1 + 2
+    assert 0 < score < 1
+    print(f"   OK - score {score:.4f}, detalles por columna correctos")
+
+
+def test_conformidad_por_valores_distintos():
+    print("\n" + "=" * 70)
+    print("TEST DE CONFORMIDAD SOBRE VALORES DISTINTOS")
+    print("=" * 70)
+
+    calc = DataQualityCalculator('test-conf-vc', {})
+    calc._set_dataframe(pd.DataFrame({
+        'departamento': ['Antioquia'] * 900 + ['Narnia'] * 90 + ['Gondor'] * 10,
+    }))
+
+    calc.calculate_conformidad_from_metadata_and_data({}, verbose=False)
+    info = calc.cached_scores['conformidad_advanced']['details']['columns_validated'][0]
+    print(f"   total={info['total']} errores={info['errors']} ejemplos={info['examples']}")
+
+    # 3 valores distintos validados, errores ponderados por frecuencia
+    assert info['total'] == 1000 and info['errors'] == 100
+    assert info['examples'] == ['Narnia'] * 5
+
+    # Las frecuencias quedan cacheadas hasta que cambian los datos
+    counts = calc._value_counts('departamento')
+    assert calc._value_counts('departamento') is counts
+    calc._set_dataframe(pd.DataFrame({'departamento': ['Narnia']}))
+    assert calc._value_counts('departamento') is not counts
+    assert calc._value_counts('departamento').to_dict() == {'Narnia': 1}
+    print("   OK - errores ponderados por frecuencia y caché invalidada al recargar")
+
+
+def test_conformidad_jerarquia_departamento_municipio():
+    print("\n" + "=" * 70)
+    print("TEST DE CONFORMIDAD: MUNICIPIO DENTRO DE SU DEPARTAMENTO")
+    print("=" * 70)
+
+    calc = DataQualityCalculator('test-conf-jerarquia', {})
+    calc._set_dataframe(pd.DataFrame({
+        'departamento': ['Antioquia', 'ANTIOQUIA', 'Valle del Cauca', 'Antioquia', 'Narnia', 'Cundinamarca'] * 50,
+        'municipio': ['Medellín', 'medellin', 'Cali', 'Cali', 'Cali', 'La Unión'] * 50,
+    }))
+
+    calc.calculate_conformidad_from_metadata_and_data({}, verbose=False)
+    columnas = calc.cached_scores['conformidad_advanced']['details']['columns_validated']
+    par = next(c for c in columnas if c['type'] == 'departamento_municipio')
+    print(f"   {par}")
+
+    # "Narnia / Cali" no cuenta: el departamento ya es un error de su propia regla
+    assert par['column'] == 'departamento / municipio'
+    assert par['total'] == 250
+    # "Antioquia / Cali" y "Cundinamarca / La Unión" no existen en DIVIPOLA
+    assert par['errors'] == 100
+    assert par['examples'][:2] == ['Antioquia / Cali', 'Cundinamarca / La Unión']
+    print("   OK - pares departamento/municipio validados contra la jerarquía")
+
+
+def test_conformidad_anio_tipado_con_nulos():
+    print("\n" + "=" * 70)
+    print("TEST DE CONFORMIDAD: AÑO NUMÉRICO CON NULOS")
+    print("=" * 70)
+
+    # Enteros con un nulo: column_types los tipa como float y _optimize_dtypes como float32
+    metadata = {'columns': [{'fieldName': 'año', 'name': 'año', 'dataTypeName': 'number'}]}
+    calc = DataQualityCalculator('test-conf-anio', metadata)
+    calc._set_dataframe(pd.DataFrame({'año': ['2020', '1999', None, '2021', '1800'] * 20}))
+    print(f"   dtype de año: {calc.df['año'].dtype}")
+    assert not pd.api.types.is_integer_dtype(calc.df['año'].dtype)
+
+    calc.calculate_conformidad_from_metadata_and_data(metadata, verbose=False)
+    info = calc.cached_scores['conformidad_advanced']['details']['columns_validated'][0]
+    print(f"   total={info['total']} errores={info['errors']} ejemplos={info['examples'][:2]}")
+    # Solo 1800 está fuera de rango; 2020.5 sería error por tener parte decimal
+    assert info['total'] == 80 and info['errors'] == 20
+    assert calc._conformidad_error_mask('año', pd.Series([2020.5, 2020.0]), set(), set()).tolist() == [True, False]
+    print("   OK - años enteros tipados como float se validan por rango")
+
+
+if __name__ == "__main__":
+    test_conformidad_detalles_por_columna()
+    test_conformidad_por_valores_distintos()
+    test_conformidad_jerarquia_departamento_municipio()
+    test_conformidad_anio_tipado_con_nulos()
@@ -0,0 +1,58 @@
+"""
+Script de prueba para la caché persistente en disco de datasets
+"""
+import tempfile
+import pandas as pd
+from dataset_cache import DatasetDiskCache
+
+
+def test_cache_por_version_y_limite():
+    print("\n" + "=" * 70)
+    print("TEST DE LA CACHÉ EN DISCO")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = DatasetDiskCache(cache_dir=tmp, max_mb=50, enabled=True)
+        df = pd.DataFrame({
+            'municipio': pd.Categorical(['Cali', 'Pasto'] * 500),
+            'valor': [str(i) for i in range(1000)],
+        })
+
+        cache.put('abcd-1234', '1700000000', 5000, df)
+
+        # Misma versión: acierto (la carga tenía menos filas que el límite -> dataset completo)
+        leido = cache.get('abcd-1234', '1700000000', 50000)
+        assert leido is not None and leido.equals(df)
+
+        # Versión distinta: fallo
+        assert cache.get('abcd-1234', '1700000999', 5000) is None
+
+        # Una muestra truncada no satisface un límite mayor
+        cache.put('efgh-5678', 'v1', 500, df.head(500))
+        assert cache.get('efgh-5678', 'v1', 1000) is None
+        assert len(cache.get('efgh-5678', 'v1', 200)) == 200
+
+        stats = cache.stats()
+        print(f"   Estadísticas: {stats}")
+        assert stats['hits'] == 2 and stats['misses'] == 2
+        assert stats['entries'] == 2
+
+        # Carga proyectada: solo sirve para sus columnas y no reemplaza a la entrada completa
+        cache.put('abcd-1234', '1700000000', 5000, df[['valor']], columns=['valor'])
+        assert list(cache.get('abcd-1234', '1700000000', 5000, columns=['valor']).columns) == ['valor']
+        assert cache.get('abcd-1234', '1700000000', 5000).equals(df)
+        cache.put('mnop-3456', 'v1', 5000, df[['valor']], columns=['valor'])
+        assert cache.get('mnop-3456', 'v1', 5000) is None
+        assert cache.get('mnop-3456', 'v1', 5000, columns=['municipio']) is None
+        assert cache.get('mnop-3456', 'v1', 5000, columns=['valor']) is not None
+
+        # Desalojo: presupuesto mínimo conserva solo la entrada más reciente
+        cache.max_bytes = 1
+        cache.put('ijkl-9012', 'v1', 5000, df)
+        assert cache.stats()['entries'] == 1
+        assert cache.get('ijkl-9012', 'v1', 5000) is not None
+        print("   OK - claves por versión, límite de filas y desalojo correctos")
+
+
+if __name__ == "__main__":
+    test_cache_por_version_y_limite()
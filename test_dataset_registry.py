@@ -0,0 +1,77 @@
+"""
+Script de prueba para el registro de sesiones (LRU acotado por memoria)
+"""
+import asyncio
+import pandas as pd
+from data_quality_calculator import DataQualityCalculator
+from dataset_registry import DatasetRegistry, dataframe_memory_bytes
+
+
+def crear_calculador(dataset_id, filas):
+    calc = DataQualityCalculator(dataset_id, {'name': dataset_id})
+    calc._set_dataframe(pd.DataFrame({'texto': [f'valor_{i}' for i in range(filas)]}))
+    return calc
+
+
+def test_registro_lru_por_memoria():
+    print("\n" + "=" * 70)
+    print("TEST DEL REGISTRO DE SESIONES")
+    print("=" * 70)
+
+    tamano = dataframe_memory_bytes(crear_calculador('x', 20000).df)
+    # Presupuesto para ~2 datasets
+    registry = DatasetRegistry(max_memory_mb=(tamano * 2.5) / (1024 ** 2))
+
+    for dataset_id in ['aaaa-0001', 'bbbb-0002']:
+        registry.put(crear_calculador(dataset_id, 20000))
+
+    # Acceder a 'aaaa' lo convierte en el más reciente -> 'bbbb' es el LRU
+    assert registry.get('aaaa-0001') is not None
+    registry.put(crear_calculador('cccc-0003', 20000))
+
+    residentes = [s['dataset_id'] for s in registry.snapshot()['sessions']]
+    print(f"   Residentes: {residentes}")
+    print(f"   Desalojos: {registry.evictions}")
+
+    assert 'bbbb-0002' not in residentes
+    assert set(residentes) == {'aaaa-0001', 'cccc-0003'}
+    assert registry.get_default().dataset_id == 'cccc-0003'
+    assert registry.total_bytes() <= registry.max_memory_bytes
+    print("   OK - desalojo LRU respeta el presupuesto de memoria")
+
+
+def test_inicializar_descarta_datos_de_otra_version():
+    print("\n" + "=" * 70)
+    print("TEST DE /initialize CON UNA VERSIÓN NUEVA DEL DATASET")
+    print("=" * 70)
+
+    import main
+
+    version = {'actual': 1700000000}
+    metadatos_original = main.obtener_metadatos_socrata
+    main.obtener_metadatos_socrata = lambda dataset_id: {'name': dataset_id, 'rowsUpdatedAt': version['actual']}
+    try:
+        asyncio.run(main.initialize_dataset(main.DatasetRequest(dataset_id='init-0001')))
+        residente = main.registry.get('init-0001')
+        residente._set_dataframe(pd.DataFrame({'texto': ['fila vieja'] * 10}))
+
+        # Misma versión: se reutilizan los datos cargados
+        asyncio.run(main.initialize_dataset(main.DatasetRequest(dataset_id='init-0001')))
+        assert main.registry.get('init-0001') is residente and residente.df_filas == 10
+
+        # rowsUpdatedAt distinto: los datos residentes ya no corresponden a los metadatos
+        version['actual'] = 1800000000
+        asyncio.run(main.initialize_dataset(main.DatasetRequest(dataset_id='init-0001')))
+        nuevo = main.registry.get('init-0001')
+        print(f"   Residente tras el cambio de versión: df={nuevo.df}, metadatos={nuevo.metadata}")
+        assert nuevo is not residente and nuevo.df is None
+        assert nuevo.metadata['rowsUpdatedAt'] == 1800000000
+    finally:
+        main.obtener_metadatos_socrata = metadatos_original
+        main.registry.remove('init-0001')
+    print("   OK - los datos de una versión anterior no se sirven con metadatos nuevos")
+
+
+if __name__ == "__main__":
+    test_registro_lru_por_memoria()
+    test_inicializar_descarta_datos_de_otra_version()
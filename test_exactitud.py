@@ -0,0 +1,75 @@
+"""
+Script de prueba para las métricas de Exactitud (sintáctica y semántica)
+"""
+import time
+import pandas as pd
+from data_quality_calculator import DataQualityCalculator
+
+
+def test_exactitud_sintactica_casi_duplicados():
+    print("\n" + "=" * 70)
+    print("TEST DE EXACTITUD SINTÁCTICA (ÍNDICE DE CASI-DUPLICADOS)")
+    print("=" * 70)
+
+    calc = DataQualityCalculator('test-exactitud', {})
+    calc._set_dataframe(pd.DataFrame({
+        # Solo difieren en mayúsculas/espacios
+        'ciudad': ['Bogota', 'bogota ', 'Cali', None, 'Medellin'] * 4,
+        # Errores de digitación
+        'entidad': ['Ministerio de Educación Nacional', 'Ministerio de Educacion Nacional',
+                    'Alcaldía', 'Gobernación', 'Policía'] * 4,
+        'codigo': ['x1', 'y22', 'z333', 'w4444', 'v'] * 4,
+        'numero': [1, 2, 3, 4, 5] * 4,
+    }))
+
+    resultado = {col: calc._tiene_valores_similares(col) for col in ('ciudad', 'entidad', 'codigo')}
+    print(f"   Columnas con valores similares: {resultado}")
+    assert resultado == {'ciudad': True, 'entidad': True, 'codigo': False}
+
+    score = calc.calculate_exactitud_sintactica()
+    print(f"   Score: {score}")
+    assert score == 10 * (1 - (2 / 4) ** 2)
+
+    # Muchos valores distintos: un único ajuste TF-IDF por columna
+    calc._set_dataframe(pd.DataFrame({'id': [f"registro {i:06d} {i * 7919 % 104729}" for i in range(20000)]}))
+    inicio = time.perf_counter()
+    calc.calculate_exactitud_sintactica()
+    duracion = time.perf_counter() - inicio
+    print(f"   20000 valores distintos evaluados en {duracion:.2f}s")
+    assert duracion < 30
+    print("   OK - casi-duplicados detectados sin comparar cada par por separado")
+
+
+def test_exactitud_semantica_por_lotes():
+    print("\n" + "=" * 70)
+    print("TEST DE EXACTITUD SEMÁNTICA (TF-IDF POR LOTES)")
+    print("=" * 70)
+
+    calc = DataQualityCalculator('test-semantica', {'columnas': {'codigo': {'descripcion': 'codigo interno x1'}}})
+    calc._set_dataframe(pd.DataFrame({
+        'departamento': ['Antioquia departamento', 'departamento de Caldas'] * 5,
+        'nombre entidad': ['entidad salud', 'entidad educacion'] * 5,
+        'codigo': ['x1', 'y2'] * 5,
+        'observaciones': ['sin novedad', 'revisado'] * 5,
+        'vacia': [None] * 10,
+    }))
+
+    similitudes = calc._similitudes_por_filas(['departamento', 'nombre entidad', 'observaciones'],
+                                              ['Antioquia departamento', 'entidad salud', 'sin novedad'])
+    print(f"   Similitudes: {similitudes.round(3).tolist()}")
+    assert similitudes[0] > 0.3 and similitudes[1] > 0.3 and similitudes[2] == 0
+
+    score = calc.calculate_exactitud_semantica()
+    print(f"   Score: {score}")
+    # 'observaciones' no se parece a su descripción y 'vacia' no tiene valores (5 columnas)
+    assert score == 10 - 10 * (2 / 5) ** 2
+
+    # Columnas vacías o sin texto comparable no rompen el cálculo
+    assert calc._similitudes_por_filas([], []).size == 0
+    assert calc._similitudes_por_filas(['-'], ['']).tolist() == [0.0]
+    print("   OK - similitudes de todas las columnas con un único ajuste")
+
+
+if __name__ == "__main__":
+    test_exactitud_sintactica_casi_duplicados()
+    test_exactitud_semantica_por_lotes()
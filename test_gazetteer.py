@@ -0,0 +1,77 @@
+"""
+Script de prueba para el nomenclátor DIVIPOLA de departamentos y municipios
+"""
+import time
+import pandas as pd
+from data_quality_calculator import DataQualityCalculator
+from gazetteer import fold_text, get_gazetteer
+
+
+def test_nomenclator_divipola():
+    print("\n" + "=" * 70)
+    print("TEST DEL NOMENCLÁTOR DIVIPOLA")
+    print("=" * 70)
+
+    gaz = get_gazetteer()
+    print(f"   {gaz}")
+    assert len(gaz.departments) == 33
+    assert len(gaz.municipalities) > 1100
+
+    # Búsquedas sin tildes ni mayúsculas
+    assert fold_text("  BOGOTÁ,   D.C. ") == "bogota, d.c."
+    assert gaz.department_code("antioquia") == "05"
+    assert gaz.department_code("Bogota D.C.") == "11"
+    assert gaz.municipality_codes("MEDELLIN") == {"05001"}
+    # "La Unión" existe en varios departamentos
+    assert len(gaz.municipality_codes("la union")) > 1
+    assert "05001" in gaz.municipalities_by_department["05"]
+
+    # Nombres en formato title() para la validación de conformidad
+    assert "Medellín" in gaz.municipality_titles
+    assert "Bogotá D.C." in gaz.department_titles
+
+    # Los calculadores comparten la misma instancia (no se reconstruye)
+    inicio = time.perf_counter()
+    calcs = [DataQualityCalculator(f"test-{i}", {}) for i in range(200)]
+    duracion = time.perf_counter() - inicio
+    assert all(c.gazetteer is gaz for c in calcs)
+    print(f"   200 calculadores creados en {duracion * 1000:.1f} ms")
+    print("   OK - índices de departamentos y municipios correctos")
+
+
+def test_sugerencias_por_trigramas():
+    print("\n" + "=" * 70)
+    print("TEST DE SUGERENCIAS DEL NOMENCLÁTOR (ÍNDICE DE TRIGRAMAS)")
+    print("=" * 70)
+
+    gaz = get_gazetteer()
+    for valor in ("Medellin", "Barranqilla", "Cartajena"):
+        print(f"   {valor:<12} -> {gaz.suggest(valor)}")
+
+    assert gaz.suggest("Medellin")[0] == ("Medellín", 1.0)
+    assert gaz.suggest("Barranqilla")[0][0] == "Barranquilla"
+    assert gaz.suggest("antioqia", kind='departamento', k=1)[0][0] == "Antioquia"
+    assert len(gaz.suggest("Cartajena", k=5)) == 5
+
+    inicio = time.perf_counter()
+    for _ in range(1000):
+        gaz.suggest("Barranqilla")
+    por_consulta = (time.perf_counter() - inicio) / 1000
+    print(f"   {por_consulta * 1e6:.0f} µs por consulta")
+    assert por_consulta < 0.005
+
+    calc = DataQualityCalculator('test-sugerencias', {})
+    calc._set_dataframe(pd.DataFrame({'municipio': ['Medellin', 'Medellín', 'Barranqilla', 'Bogota', 'Medellin']}))
+    calc.calculate_conformidad_from_metadata_and_data({}, verbose=False, suggestions=True, top_k=2)
+    details = calc.cached_scores['conformidad_advanced']['details']
+    columna = details['columns_validated'][0]
+    assert columna['errors'] == 4
+    assert columna['accent_only_errors'] == 3 and columna['real_errors'] == 1
+    assert columna['suggestions']['Barranqilla'] == ['Barranquilla', 'Barrancas']
+    assert details['total_accent_only_errors'] == 3
+    print("   OK - sugerencias top-k y conteo de errores solo de tildes")
+
+
+if __name__ == "__main__":
+    test_nomenclator_divipola()
+    test_sugerencias_por_trigramas()
@@ -0,0 +1,83 @@
+"""
+Script de prueba para el decodificador JSON columnar y `fetch_frame` (sin red)
+"""
+import asyncio
+import json
+import pandas as pd
+from json_columns import decode_json_records
+from socrata_loader import SocrataPageLoader
+
+TOTAL_FILAS = 2350
+
+
+def _iguales(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    if list(a.columns) != list(b.columns) or len(a) != len(b):
+        return False
+    return all(all((x != x and y != y) or x == y for x, y in zip(a[c], b[c])) for c in a.columns)
+
+
+class ColumnarFakeLoader(SocrataPageLoader):
+    """Sirve páginas JSON por fragmentos de bytes, con filtros por :id."""
+
+    def __init__(self, **kwargs):
+        super().__init__('fake-0000', **kwargs)
+        self.filas = [{':id': f"row-{i:06d}", 'municipio': ['Cali', 'Pasto', 'Neiva'][i % 3], 'valor': str(i)}
+                      for i in range(TOTAL_FILAS)]
+        for i in range(0, TOTAL_FILAS, 7):
+            del self.filas[i]['valor']
+
+    def _get_json(self, params):
+        if params.get('$select') == 'count(*) AS n':
+            return [{'n': str(TOTAL_FILAS)}]
+        filas = self.filas
+        if params.get('$select') == ':id':
+            return [{':id': filas[params['$offset']][':id']}]
+        for condicion in params.get('$where', '').split(' AND '):
+            condicion = condicion.strip('()')
+            if condicion:
+                op, valor = condicion.split(' ')[1], condicion.split("'")[1]
+                filas = [f for f in filas if (f[':id'] >= valor if op == '>=' else
+                                               f[':id'] > valor if op == '>' else f[':id'] < valor)]
+        pagina = filas[params.get('$offset', 0):params.get('$offset', 0) + params['$limit']]
+        campos = params.get('$select', ':*,*').split(',')
+        if ':*' not in campos:
+            pagina = [{k: v for k, v in fila.items() if k in campos} for fila in pagina]
+        return pagina
+
+    def _iter_body(self, params):
+        cuerpo = json.dumps(self._get_json(params)).encode('utf-8')
+        for i in range(0, len(cuerpo), 100):
+            yield cuerpo[i:i + 100]
+
+
+def test_decodificador_columnar():
+    print("\n" + "=" * 70)
+    print("TEST DEL DECODIFICADOR JSON COLUMNAR")
+    print("=" * 70)
+
+    registros = [{'a': '1', 'ubicacion': {'type': 'Point', 'coordinates': [-74.1, 4.6]}, 'activo': True},
+                 {'a': '2', 'lista': [1, 2]},
+                 {'b': 'ñandú "x"', 'activo': False}] * 500
+    cuerpo = json.dumps(registros, ensure_ascii=False).encode('utf-8')
+    for tamano in (1, 13, 4096):
+        df = decode_json_records(cuerpo[i:i + tamano] for i in range(0, len(cuerpo), tamano))
+        assert _iguales(df, pd.DataFrame.from_records(registros)), f"Fragmentos de {tamano} bytes"
+    assert decode_json_records([b' [ ] ']).shape == (0, 0)
+    print("   OK - mismo resultado que from_records con cualquier fragmentación")
+
+    for modo in ('keyset', 'offset'):
+        loader = ColumnarFakeLoader(page_size=300, max_concurrency=4, pagination=modo)
+        df = asyncio.run(loader.fetch_frame(limit=5000, select=':*,*'))
+        esperado = pd.DataFrame.from_records(asyncio.run(loader.fetch_records(limit=5000, select=':*,*')))
+        print(f"   fetch_frame ({modo}): {df.shape}, páginas: {loader.stats['pages']}")
+        assert _iguales(df, esperado)
+        assert list(df.index) == list(range(TOTAL_FILAS))
+        assert df['valor'].isna().sum() == len(range(0, TOTAL_FILAS, 7))
+
+    df = asyncio.run(ColumnarFakeLoader(page_size=300).fetch_frame(limit=1000, select='municipio'))
+    assert list(df.columns) == ['municipio'] and len(df) == 1000
+    print("   OK - páginas decodificadas a columnas y concatenadas en orden")
+
+
+if __name__ == "__main__":
+    test_decodificador_columnar()
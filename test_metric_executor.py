@@ -0,0 +1,99 @@
+"""
+Script de prueba para el ejecutor de métricas (pool de procesos, sin red)
+"""
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from data_quality_calculator import DataQualityCalculator
+from metric_executor import MetricExecutor
+
+
+def crear_calculador():
+    calc = DataQualityCalculator('test-exec', {'name': 'Prueba ejecutor', 'rowsUpdatedAt': 1700000000})
+    calc._set_dataframe(pd.DataFrame({
+        'a': [1, 2, 2, 3, 3, 3],
+        'b': ['x', 'y', 'y', 'z', 'z', 'z'],
+        'c': [1, 2, 2, 3, 3, 3],
+    }))
+    return calc
+
+
+def test_metricas_en_pool_de_procesos():
+    print("\n" + "=" * 70)
+    print("TEST DEL EJECUTOR DE MÉTRICAS")
+    print("=" * 70)
+
+    calc = crear_calculador()
+    esperado = calc.calculate_unicidad(nivel_riesgo=1.5)
+
+    executor = MetricExecutor(mode='process', process_workers=1, thread_workers=2)
+
+    async def ejecutar():
+        primero = await executor.run_metric(calc, 'calculate_unicidad', nivel_riesgo=1.5)
+        segundo = await executor.run_metric(calc, 'calculate_unicidad', nivel_riesgo=1.5)
+        # Nueva versión de los datos: el worker debe releer el DataFrame
+        calc._set_dataframe(calc.df.drop_duplicates())
+        tercero = await executor.run_metric(calc, 'calculate_unicidad', nivel_riesgo=1.5)
+        io = await executor.run_io(lambda x: x * 2, 21)
+        # El resumen de completitud vuelve del worker en cached_scores (sin recalcular en el servidor)
+        await executor.run_metric(calc, 'calculate_completitud', verbose=False)
+        return primero, segundo, tercero, io
+
+    try:
+        primero, segundo, tercero, io = asyncio.run(ejecutar())
+        stats = executor.stats()
+    finally:
+        executor.shutdown()
+
+    print(f"   Score directo: {esperado}, en proceso: {primero}, {segundo}; tras recarga: {tercero}")
+    print(f"   Estadísticas: {stats['metrics']['calculate_unicidad']}")
+
+    assert primero == esperado and segundo == esperado
+    assert tercero == calc.calculate_unicidad(nivel_riesgo=1.5)
+    assert io == 42
+    assert calc.cached_scores['completitud']['details']['total_filas'] == len(calc.df)
+    assert calc.cached_scores['completitud']['details']['filas_completas'] == len(calc.df)
+    metrica = stats['metrics']['calculate_unicidad']
+    assert metrica['count'] == 3
+    # Solo la segunda llamada reutiliza el DataFrame residente del worker
+    assert metrica['frame_cache_hits'] == 1
+    assert stats['queue_depth'] == {'process': 0, 'thread': 0}
+    print("   OK - resultados idénticos y DataFrame reutilizado en el worker")
+
+
+def test_publicacion_con_tareas_en_vuelo():
+    print("\n" + "=" * 70)
+    print("TEST DE PUBLICACIÓN DEL DATAFRAME CON TAREAS EN VUELO")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = MetricExecutor(mode='process', process_workers=1, thread_workers=4, shared_dir=tmp)
+        calc = crear_calculador()
+
+        # Publicaciones concurrentes de la misma versión: un solo archivo, sin temporales
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            reservas = list(pool.map(lambda _: executor._publish_frame(calc), range(4)))
+        assert len({path for _, path in reservas}) == 1
+        assert os.listdir(tmp) == [os.path.basename(reservas[0][1])]
+        for _, path in reservas[1:]:
+            executor._release_frame(path)
+
+        # Nueva versión con una tarea en cola sobre la anterior: la copia vieja sigue legible
+        anterior = reservas[0][1]
+        calc._set_dataframe(calc.df.drop_duplicates())
+        _, nueva = executor._publish_frame(calc)
+        assert nueva != anterior and os.path.exists(anterior)
+        assert len(pd.read_pickle(anterior)) == 6
+        executor._release_frame(anterior)
+        assert not os.path.exists(anterior) and os.path.exists(nueva)
+        executor._release_frame(nueva)
+        executor.shutdown()
+        assert os.listdir(tmp) == []
+    print("   OK - escritura atómica y versiones viejas borradas al terminar sus tareas")
+
+
+if __name__ == "__main__":
+    test_metricas_en_pool_de_procesos()
+    test_publicacion_con_tareas_en_vuelo()
@@ -0,0 +1,46 @@
+"""
+Script de prueba para la métrica de portabilidad (conteo por formato)
+"""
+import time
+import numpy as np
+import pandas as pd
+from data_quality_calculator import DataQualityCalculator
+
+
+def test_portabilidad_por_formato():
+    print("\n" + "=" * 70)
+    print("TEST DE PORTABILIDAD (TABLA DE FORMATOS)")
+    print("=" * 70)
+
+    calc = DataQualityCalculator('test-portabilidad', {})
+    calc._set_dataframe(pd.DataFrame({
+        'd_formato': ['Excel', ' CSV ', 'geojson', 'Web', 'Pdf', 'Otro', None, 'xlsx'],
+        'c_medio_de_conservaci_n_y': ['Digital'] * 8,
+    }))
+    score = calc.calculate_portabilidad()
+
+    # 4 muy portables, 1 mediano + 2 desconocidos (medianos), 1 no portable
+    cruda = (4 * 1.0 + 3 * 0.5 + 1 * 0.0) / 8
+    esperado = 10 * (1 - (1 - cruda) ** 1.2) * 0.9
+    print(f"   Score: {score} (esperado {esperado})")
+    assert abs(score - esperado) < 1e-12
+    assert calc.cached_scores['portabilidad'] == score
+
+    # Sin columna de formato: todos desconocidos (medianos)
+    calc._set_dataframe(pd.DataFrame({'otra': range(10)}))
+    assert abs(calc.calculate_portabilidad() - 10 * (1 - 0.5 ** 1.2) * 0.9) < 1e-12
+
+    # Un millón de recursos se cuentan por formato, sin recorrer filas
+    formatos = np.array(['Excel', 'Web', 'Pdf', 'json', 'Hoja de calculo'], dtype=object)
+    calc._set_dataframe(pd.DataFrame({'d_formato': np.repeat(formatos, 200000)}))
+    inicio = time.perf_counter()
+    score = calc.calculate_portabilidad()
+    duracion = time.perf_counter() - inicio
+    print(f"   1000000 recursos en {duracion:.2f}s")
+    assert abs(score - 10 * (1 - (1 - 3.5 / 5) ** 1.2) * 0.9) < 1e-12
+    assert duracion < 10
+    print("   OK - portabilidad calculada por formato")
+
+
+if __name__ == "__main__":
+    test_portabilidad_por_formato()
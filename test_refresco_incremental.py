@@ -0,0 +1,76 @@
+"""
+Script de prueba para el refresco incremental por :updated_at (sin red)
+"""
+import asyncio
+import pandas as pd
+import data_quality_calculator
+from data_quality_calculator import DataQualityCalculator
+
+BASE = [
+    {':id': 'row-1', ':updated_at': '2024-01-01T00:00:00.000Z', 'municipio': 'Cali', 'valor': '1'},
+    {':id': 'row-2', ':updated_at': '2024-01-02T00:00:00.000Z', 'municipio': 'Pasto', 'valor': '2'},
+    {':id': 'row-3', ':updated_at': '2024-01-03T00:00:00.000Z', 'municipio': 'Neiva', 'valor': '3'},
+]
+DELTA = [
+    {':id': 'row-2', ':updated_at': '2024-02-01T00:00:00.000Z', 'municipio': 'Pasto', 'valor': '20'},
+    {':id': 'row-4', ':updated_at': '2024-02-02T00:00:00.000Z', 'municipio': 'Tunja', 'valor': '4'},
+]
+
+
+class FakeLoader:
+    consultas = []
+
+    def __init__(self, dataset_id):
+        pass
+
+    async def fetch_frame(self, limit, select=None, where=None):
+        FakeLoader.consultas.append(where)
+        return pd.DataFrame.from_records(DELTA if where else BASE)
+
+
+def test_refresco_incremental():
+    print("\n" + "=" * 70)
+    print("TEST DEL REFRESCO INCREMENTAL")
+    print("=" * 70)
+
+    loader_original = data_quality_calculator.SocrataPageLoader
+    cache_habilitada = data_quality_calculator.dataset_cache.enabled
+    data_quality_calculator.SocrataPageLoader = FakeLoader
+    data_quality_calculator.dataset_cache.enabled = False
+    try:
+        _verificar_refresco()
+    finally:
+        data_quality_calculator.SocrataPageLoader = loader_original
+        data_quality_calculator.dataset_cache.enabled = cache_habilitada
+
+
+def _verificar_refresco():
+    calc = DataQualityCalculator('test-0001', {})
+    asyncio.run(calc.load_data(limit=100, source='json'))
+    assert list(calc.df.columns) == ['municipio', 'valor'], "Los campos de sistema no deben quedar en df"
+    assert calc.sync_high_water == '2024-01-03T00:00:00.000Z'
+
+    resultado = asyncio.run(calc.refresh_data(limit=100))
+    print(f"   Resultado: {resultado}")
+    print(f"   Consulta delta: {FakeLoader.consultas[-1]}")
+
+    assert FakeLoader.consultas[-1] == ":updated_at > '2024-01-03T00:00:00.000Z'"
+    assert resultado['mode'] == 'delta'
+    assert resultado['updated_rows'] == 1 and resultado['new_rows'] == 1
+    assert list(calc.df['valor']) == ['1', '20', '3', '4']
+    assert list(calc.system_fields[':id']) == ['row-1', 'row-2', 'row-3', 'row-4']
+    assert calc.sync_high_water == '2024-02-02T00:00:00.000Z'
+    assert calc.df_filas == 4
+
+    # Delta truncado por el límite: no se avanza la marca sobre filas que quedaron fuera
+    calc = DataQualityCalculator('test-0001', {})
+    asyncio.run(calc.load_data(limit=100, source='json'))
+    resultado = asyncio.run(calc.refresh_data(limit=len(DELTA)))
+    print(f"   Delta truncado: {resultado}")
+    assert resultado['mode'] == 'full'
+    assert calc.sync_high_water == '2024-01-03T00:00:00.000Z'
+    print("   OK - upsert por :id y nueva marca de sincronización")
+
+
+if __name__ == "__main__":
+    test_refresco_incremental()
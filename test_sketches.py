@@ -0,0 +1,130 @@
+"""
+Script de prueba para los sketches combinables (HyperLogLog, Space-Saving, t-digest)
+"""
+import numpy as np
+import pandas as pd
+
+import sketches
+from column_profile import profile_column
+from data_quality_calculator import DataQualityCalculator
+from sketches import ColumnSketch, HyperLogLog, TDigest, hash_values, profile_column_sketch
+
+
+def test_sketches_combinables():
+    print("\n" + "=" * 70)
+    print("TEST DE SKETCHES COMBINABLES")
+    print("=" * 70)
+
+    rng = np.random.default_rng(0)
+    valores = pd.Series([f"valor_{v}" for v in rng.zipf(1.3, 400000)])
+    mitad = len(valores) // 2
+
+    # Dos particiones perfiladas por separado y combinadas
+    a, b = ColumnSketch(), ColumnSketch()
+    a.update(valores[:mitad])
+    b.update(valores[mitad:])
+    a.merge(b)
+
+    exacto = valores.nunique()
+    estimado = a.hll.count()
+    print(f"   Distintos: exacto={exacto} HyperLogLog={estimado}")
+    assert abs(estimado - exacto) / exacto < 0.03
+
+    top_exacto = valores.value_counts().head(5)
+    top_sketch = a.heavy_hitters.top(5)
+    print(f"   Top-5: {top_sketch.to_dict()}")
+    assert top_sketch.index.tolist() == top_exacto.index.tolist()
+    assert (top_sketch.to_numpy() >= top_exacto.to_numpy()).all()
+
+    numeros = rng.normal(size=200000)
+    d1, d2 = TDigest(), TDigest()
+    d1.update(numeros[:100000])
+    d2.update(numeros[100000:])
+    d1.merge(d2)
+    for q in (0.01, 0.5, 0.99):
+        assert abs(d1.quantile(q) - np.quantile(numeros, q)) < 0.05
+    print(f"   Mediana t-digest: {d1.quantile(0.5):.4f} ({len(d1.means)} centroides)")
+
+    # HyperLogLog combinado = HyperLogLog de todo
+    h1, h2, todo = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    h1.add_hashes(hash_values(valores[:mitad]))
+    h2.add_hashes(hash_values(valores[mitad:]))
+    todo.add_hashes(hash_values(valores))
+    assert (h1.merge(h2).registers == todo.registers).all()
+    print("   OK - resúmenes por partición combinados sin perder precisión")
+
+
+def test_perfil_aproximado_en_metricas():
+    print("\n" + "=" * 70)
+    print("TEST DEL PERFIL CON SKETCHES EN LAS MÉTRICAS")
+    print("=" * 70)
+
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({
+        'departamento': rng.choice(['Antioquia', 'Narnia', 'Cundinamarca', None], 50000),
+        'codigo': [f"c{v}" for v in rng.integers(0, 20000, 50000)],
+        'valor': rng.integers(-10, 1000, 50000),
+    })
+
+    exacto = profile_column(df['valor'])
+    aproximado = profile_column_sketch(df['valor'], chunk_rows=7000)
+    assert aproximado.approximate and aproximado.null_count == exacto.null_count
+    assert aproximado.negative_count == exacto.negative_count
+    assert abs(aproximado.variance - exacto.variance) < 1e-6
+    assert abs(aproximado.distinct_count - exacto.distinct_count) / exacto.distinct_count < 0.03
+
+    original = sketches.PROFILE_SKETCHES
+    sketches.PROFILE_SKETCHES = 'always'
+    try:
+        calc = DataQualityCalculator('test-sketch', {})
+        calc._set_dataframe(df)
+        perfiles = calc.column_profile()
+        print(f"   {perfiles['codigo']}")
+        assert all(p.approximate for p in perfiles.values())
+        # Decisión de categoría de _optimize_dtypes con el conteo aproximado
+        assert str(calc.df['departamento'].dtype) == 'category'
+        assert str(calc.df['codigo'].dtype) == 'object'
+        assert calc.calculate_precision() == 10.0
+
+        calc.calculate_conformidad_from_metadata_and_data({}, verbose=False)
+        info = calc.cached_scores['conformidad_advanced']['details']['columns_validated'][0]
+        print(f"   Conformidad: {info}")
+        assert info['approximate'] and info['coverage'] == 1.0
+        assert info['errors'] == int((df['departamento'] == 'Narnia').sum())
+    finally:
+        sketches.PROFILE_SKETCHES = original
+    print("   OK - métricas alimentadas por el perfil aproximado")
+
+
+def test_perfil_por_bloques_factorizados():
+    print("\n" + "=" * 70)
+    print("TEST DEL PERFIL POR BLOQUES FACTORIZADOS")
+    print("=" * 70)
+
+    rng = np.random.default_rng(2)
+    serie = pd.Series(list(rng.choice(['Cali', ' N/A ', '', '   ', 'NULL', None], 6000))
+                      + list(rng.integers(0, 50, 3000)) + [{'lat': 1}, {'lat': 1}, [1, 2]], dtype=object)
+    exacto = profile_column(serie)
+    aproximado = profile_column_sketch(serie, chunk_rows=1000)
+    print(f"   vacíos={aproximado.empty_count} faltantes={aproximado.missing_count}")
+    assert aproximado.null_count == exacto.null_count
+    assert aproximado.empty_count == exacto.empty_count
+    assert (aproximado.missing_mask == exacto.missing_mask).all()
+    assert abs(aproximado.len_mean - exacto.len_mean) < 1e-9
+    assert abs(aproximado.len_std - exacto.len_std) < 1e-9
+
+    # Hashear solo los distintos de cada bloque deja los mismos registros que todas las filas
+    textos = pd.Series([f"c{v}" for v in rng.integers(0, 3000, 20000)])
+    directo = ColumnSketch()
+    for inicio in range(0, len(textos), 4000):
+        directo.update(textos.iloc[inicio:inicio + 4000])
+    por_bloques = profile_column_sketch(textos, chunk_rows=4000).sketch
+    assert (directo.hll.registers == por_bloques.hll.registers).all()
+    assert directo.heavy_hitters.counts.sort_index().equals(por_bloques.heavy_hitters.counts.sort_index())
+    print("   OK - conteos exactos y sketches iguales a la actualización fila por fila")
+
+
+if __name__ == "__main__":
+    test_sketches_combinables()
+    test_perfil_aproximado_en_metricas()
+    test_perfil_por_bloques_factorizados()
@@ -0,0 +1,120 @@
+"""
+Script de prueba para la ingesta desde la exportación CSV (sin red)
+"""
+import asyncio
+import io
+import pandas as pd
+import data_quality_calculator
+import socrata_csv
+from data_quality_calculator import DataQualityCalculator
+from socrata_csv import SocrataCsvLoader
+from socrata_loader import SocrataPageError
+
+METADATA = {'columns': [
+    {'fieldName': 'codigo', 'name': 'Código', 'dataTypeName': 'text'},
+    {'fieldName': 'valor', 'name': 'Valor', 'dataTypeName': 'number'},
+    {'fieldName': 'fecha', 'name': 'Fecha', 'dataTypeName': 'calendar_date'},
+]}
+
+RESOURCE_CSV = ('":id",":updated_at","codigo","valor","fecha"\n'
+                + ''.join(f'"row-{i:04d}","2024-01-01T00:00:00.000Z","{i:05d}",'
+                          f'{"N/A" if i % 10 == 0 else i},2024-01-{i % 28 + 1:02d}T00:00:00.000\n'
+                          for i in range(300)))
+ROWS_CSV = '﻿"Código","Valor","Fecha"\n' + ''.join(f'"{i:05d}",{i},2024-01-01\n' for i in range(5000))
+
+
+class FakeCsvLoader(SocrataCsvLoader):
+    """Sirve el CSV desde memoria en lugar de abrir la descarga HTTP."""
+    contenido = RESOURCE_CSV
+    peticiones = []
+
+    def _open(self, params):
+        FakeCsvLoader.peticiones.append(params)
+        if FakeCsvLoader.contenido is None:
+            raise SocrataPageError("HTTP 404: exportación no disponible")
+        return io.BytesIO(FakeCsvLoader.contenido.encode('utf-8'))
+
+
+class FakeJsonLoader:
+    def __init__(self, dataset_id):
+        pass
+
+    async def fetch_frame(self, limit, select=None, where=None):
+        return pd.DataFrame.from_records(
+            [{':id': 'row-1', 'codigo': '00001', 'valor': '1', 'fecha': '2024-01-01T00:00:00.000'}])
+
+
+def test_ingesta_csv():
+    print("\n" + "=" * 70)
+    print("TEST DE INGESTA DESDE LA EXPORTACIÓN CSV")
+    print("=" * 70)
+
+    for motor in ('pyarrow', 'c'):
+        df = asyncio.run(FakeCsvLoader('test-csv', METADATA, engine=motor).fetch_frame(1000, select=':*,*'))
+        print(f"   Motor {motor}: {df.shape}")
+        assert df.shape == (300, 5)
+        # Texto según los metadatos: se conservan los ceros a la izquierda y "N/A"
+        assert df['codigo'].iloc[7] == '00007'
+        assert df['valor'].iloc[0] == 'N/A'
+
+        # rows.csv: cabecera con nombres visibles y lectura cortada en el límite
+        FakeCsvLoader.contenido = ROWS_CSV
+        df = asyncio.run(FakeCsvLoader('test-csv', METADATA, source='rows', engine=motor).fetch_frame(1234))
+        FakeCsvLoader.contenido = RESOURCE_CSV
+        assert list(df.columns) == ['codigo', 'valor', 'fecha'] and len(df) == 1234
+        assert df['codigo'].iloc[0] == '00000'
+    assert FakeCsvLoader.peticiones[0] == {'$limit': 1000, '$order': ':id', '$select': ':*,*'}
+
+    # "N/A" después del primer bloque de pyarrow: la columna number se lee como texto
+    bloque_original = socrata_csv.LOADER_CSV_BLOCK_MB
+    socrata_csv.LOADER_CSV_BLOCK_MB = 0.001
+    FakeCsvLoader.contenido = '"codigo","valor"\n' + ''.join(
+        f'"{i:05d}",{"N/A" if i == 2900 else i}\n' for i in range(3000))
+    try:
+        for motor in ('pyarrow', 'c'):
+            df = asyncio.run(FakeCsvLoader('test-csv', METADATA, engine=motor).fetch_frame(5000))
+            assert len(df) == 3000 and df['valor'].iloc[2900] == 'N/A' and df['valor'].iloc[5] == '5'
+
+        # Un CSV que no se puede analizar no se descarga de nuevo
+        FakeCsvLoader.contenido = '"codigo","valor"\n"1","2"\n"3","4","5","6"\n'
+        FakeCsvLoader.peticiones = []
+        try:
+            asyncio.run(FakeCsvLoader('test-csv', METADATA, engine='pyarrow', max_retries=3).fetch_frame(10))
+            raise AssertionError("Se esperaba SocrataPageError")
+        except SocrataPageError:
+            pass
+        assert len(FakeCsvLoader.peticiones) == 1
+    finally:
+        socrata_csv.LOADER_CSV_BLOCK_MB = bloque_original
+        FakeCsvLoader.contenido = RESOURCE_CSV
+
+    csv_original = data_quality_calculator.SocrataCsvLoader
+    json_original = data_quality_calculator.SocrataPageLoader
+    cache_habilitada = data_quality_calculator.dataset_cache.enabled
+    data_quality_calculator.SocrataCsvLoader = FakeCsvLoader
+    data_quality_calculator.SocrataPageLoader = FakeJsonLoader
+    data_quality_calculator.dataset_cache.enabled = False
+    try:
+        calc = DataQualityCalculator('test-csv', METADATA)
+        asyncio.run(calc.load_data(limit=1000))
+        print(f"   load_data (CSV): {calc.df_filas} filas, tipos {calc.df.dtypes.astype(str).to_dict()}")
+        assert calc.df_filas == 300
+        assert list(calc.system_fields[':id'][:2]) == ['row-0000', 'row-0001']
+        assert str(calc.df['valor'].dtype).startswith('float') and calc.df['valor'].isna().sum() == 30
+        assert str(calc.df['fecha'].dtype) == 'datetime64[ns]'
+
+        # Sin exportación CSV: respaldo con la API JSON
+        FakeCsvLoader.contenido = None
+        calc = DataQualityCalculator('test-csv', METADATA)
+        asyncio.run(calc.load_data(limit=1000))
+        assert calc.df_filas == 1
+    finally:
+        FakeCsvLoader.contenido = RESOURCE_CSV
+        data_quality_calculator.SocrataCsvLoader = csv_original
+        data_quality_calculator.SocrataPageLoader = json_original
+        data_quality_calculator.dataset_cache.enabled = cache_habilitada
+    print("   OK - CSV analizado a columnas con respaldo JSON")
+
+
+if __name__ == "__main__":
+    test_ingesta_csv()
@@ -0,0 +1,200 @@
+"""
+Script de prueba para el cargador concurrente de páginas (sin red)
+"""
+import asyncio
+import re
+import time
+from socrata_loader import SocrataPageError, SocrataPageLoader
+
+TOTAL_FILAS = 2350
+
+
+class FakeLoader(SocrataPageLoader):
+    """Simula la API Socrata: latencia por página y fallos transitorios."""
+
+    def __init__(self, *args, **kwargs):
+        # Este servidor simulado solo entiende $limit/$offset
+        kwargs.setdefault('pagination', 'offset')
+        super().__init__('fake-0000', *args, **kwargs)
+        self.fallos_pendientes = {1000: 2}  # la página offset=1000 falla 2 veces
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+
+    def _get_json(self, params):
+        if '$select' in params:
+            return [{'n': str(TOTAL_FILAS)}]
+        self.en_vuelo += 1
+        self.max_en_vuelo = max(self.max_en_vuelo, self.en_vuelo)
+        try:
+            time.sleep(0.05)
+            offset = params['$offset']
+            if self.fallos_pendientes.get(offset, 0) > 0:
+                self.fallos_pendientes[offset] -= 1
+                raise ConnectionError("fallo simulado")
+            fin = min(offset + params['$limit'], TOTAL_FILAS)
+            return [{'id': str(i)} for i in range(offset, fin)]
+        finally:
+            self.en_vuelo -= 1
+
+
+def test_carga_concurrente_ordenada():
+    print("\n" + "=" * 70)
+    print("TEST DEL CARGADOR CONCURRENTE DE PÁGINAS")
+    print("=" * 70)
+
+    import socrata_loader
+    socrata_loader.LOADER_RETRY_BACKOFF = 0.01
+
+    loader = FakeLoader(page_size=200, max_concurrency=4, max_retries=3)
+    records = asyncio.run(loader.fetch_records(limit=5000))
+
+    ids = [int(r['id']) for r in records]
+    print(f"   Registros obtenidos: {len(records)} (esperados {TOTAL_FILAS})")
+    print(f"   Páginas: {loader.stats['pages']}, reintentos: {loader.stats['retries']}")
+    print(f"   Máximo de páginas en vuelo: {loader.max_en_vuelo}")
+
+    assert ids == list(range(TOTAL_FILAS)), "El orden de los registros no se conservó"
+    assert loader.stats['retries'] == 2
+    assert 1 < loader.max_en_vuelo <= 4
+
+    # Límite menor que el total
+    records = asyncio.run(FakeLoader(page_size=200, max_concurrency=4).fetch_records(limit=450))
+    assert [int(r['id']) for r in records] == list(range(450))
+    print("   OK - orden, reintentos y límite de concurrencia correctos")
+
+
+def test_paginas_en_streaming():
+    print("\n" + "=" * 70)
+    print("TEST DE PÁGINAS EN STREAMING (iter_pages)")
+    print("=" * 70)
+
+    async def consumir(loader, limit):
+        paginas = []
+        async for pagina in loader.iter_pages(limit=limit):
+            paginas.append(len(pagina))
+            assert loader.max_en_vuelo <= 4
+        return paginas
+
+    loader = FakeLoader(page_size=500, max_concurrency=4)
+    loader.fallos_pendientes = {}
+    paginas = asyncio.run(consumir(loader, None))
+    print(f"   Tamaños de página: {paginas}")
+    assert paginas == [500, 500, 500, 500, 350]
+
+    paginas = asyncio.run(consumir(FakeLoader(page_size=500, max_concurrency=4), 1200))
+    assert paginas == [500, 500, 200]
+    print("   OK - páginas entregadas en orden con concurrencia acotada")
+
+
+class KeysetFakeLoader(SocrataPageLoader):
+    """Simula la API Socrata con filtros por :id ($where) y cuenta los $offset profundos."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__('fake-0000', *args, pagination='keyset', **kwargs)
+        self.ids = [f"row-{i:06d}" for i in range(TOTAL_FILAS)]
+        self.offsets_de_datos = []
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+
+    def _get_json(self, params):
+        if params.get('$select') == 'count(*) AS n':
+            return [{'n': str(TOTAL_FILAS)}]
+        if params.get('$select') == ':id':
+            # Sondeo de límites de tramo: una sola fila
+            assert params['$limit'] == 1
+            offset = params['$offset']
+            return [{':id': self.ids[offset]}] if offset < TOTAL_FILAS else []
+        if '$offset' in params:
+            self.offsets_de_datos.append(params['$offset'])
+        assert params['$order'] == ':id'
+        self.en_vuelo += 1
+        self.max_en_vuelo = max(self.max_en_vuelo, self.en_vuelo)
+        try:
+            time.sleep(0.02)
+            filas = self.ids
+            for op, valor in re.findall(r":id (>=|>|<) '([^']*)'", params.get('$where', '')):
+                filas = [i for i in filas if (i >= valor if op == '>=' else i > valor if op == '>' else i < valor)]
+            inicio = params.get('$offset', 0)
+            pagina = filas[inicio:inicio + params['$limit']]
+            campos = params.get('$select', '').split(',')
+            # Como la API: sin $select no se entregan los campos de sistema
+            con_id = ':id' in campos or ':*' in campos
+            return [{':id': i, 'id': str(int(i[4:]))} if con_id else {'id': str(int(i[4:]))} for i in pagina]
+        finally:
+            self.en_vuelo -= 1
+
+
+def test_paginacion_por_id():
+    print("\n" + "=" * 70)
+    print("TEST DE PAGINACIÓN POR :id (KEYSET) EN TRAMOS PARALELOS")
+    print("=" * 70)
+
+    loader = KeysetFakeLoader(page_size=300, max_concurrency=4, partitions=4)
+    records = asyncio.run(loader.fetch_records(limit=5000))
+    print(f"   Registros: {len(records)}, páginas: {loader.stats['pages']}, "
+          f"tramos: {loader.stats['partitions']}, en vuelo: {loader.max_en_vuelo}")
+    assert [int(r['id']) for r in records] == list(range(TOTAL_FILAS))
+    assert loader.offsets_de_datos == []
+    assert loader.stats['partitions'] == 4
+    assert 1 < loader.max_en_vuelo <= 4
+
+    # Límite menor que el total y $select sin :id (se agrega y se quita de los registros)
+    loader = KeysetFakeLoader(page_size=300, max_concurrency=4, partitions=4)
+    records = asyncio.run(loader.fetch_records(limit=1000, select='id'))
+    assert [int(r['id']) for r in records] == list(range(1000))
+    assert all(':id' not in r for r in records)
+
+    # Streaming: páginas en orden de :id a través de los tramos
+    async def consumir(loader, limit):
+        ids = []
+        async for pagina in loader.iter_pages(limit=limit):
+            ids.extend(int(r['id']) for r in pagina)
+        return ids
+
+    assert asyncio.run(consumir(KeysetFakeLoader(page_size=300, partitions=3), None)) == list(range(TOTAL_FILAS))
+    assert asyncio.run(consumir(KeysetFakeLoader(page_size=300, partitions=3), 1234)) == list(range(1234))
+    # Sin $select (como /unicidad/stream) y un solo tramo: se pide :id para recorrer todas las páginas
+    assert asyncio.run(consumir(KeysetFakeLoader(page_size=300, partitions=1), None)) == list(range(TOTAL_FILAS))
+
+    # Una página completa sin :id no debe truncar la carga en silencio: antes de
+    # entregar páginas se continúa con $offset
+    loader = KeysetFakeLoader(page_size=300, partitions=1)
+    loader._keyset_query = lambda query: (query, False)
+    assert asyncio.run(consumir(loader, None)) == list(range(TOTAL_FILAS))
+    assert loader.stats['pagination'] == 'offset'
+
+    # Servidor que rechaza las consultas por :id: respaldo $offset también en streaming
+    loader = KeysetRechazadoLoader(page_size=300, partitions=3)
+    assert asyncio.run(consumir(loader, 1000)) == list(range(1000))
+    assert loader.stats['pagination'] == 'offset'
+
+    # Un fallo después de entregar páginas se propaga (reiniciar las duplicaría)
+    loader = KeysetRechazadoLoader(page_size=300, partitions=1, rechazar_desde=1)
+    try:
+        asyncio.run(consumir(loader, None))
+        raise AssertionError("Se esperaba SocrataPageError")
+    except SocrataPageError:
+        pass
+    print("   OK - páginas por :id sin $offset profundos, en orden y con límite")
+
+
+class KeysetRechazadoLoader(KeysetFakeLoader):
+    """Rechaza (HTTP 400) las páginas por :id a partir de la número `rechazar_desde`."""
+
+    def __init__(self, *args, rechazar_desde=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rechazar_desde = rechazar_desde
+        self.paginas_keyset = 0
+
+    def _get_json(self, params):
+        if '$order' in params and '$offset' not in params:
+            self.paginas_keyset += 1
+            if self.paginas_keyset > self.rechazar_desde:
+                raise SocrataPageError("HTTP 400: consulta por :id no soportada")
+        return super()._get_json(params)
+
+
+if __name__ == "__main__":
+    test_carga_concurrente_ordenada()
+    test_paginas_en_streaming()
+    test_paginacion_por_id()
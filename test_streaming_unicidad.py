@@ -0,0 +1,55 @@
+"""
+Script de prueba para la Unicidad en streaming con volcado a disco
+"""
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from data_quality_calculator import DataQualityCalculator
+from streaming_unicidad import StreamingUnicidad
+
+
+def test_unicidad_streaming_igual_a_exacta():
+    print("\n" + "=" * 70)
+    print("TEST DE UNICIDAD EN STREAMING (TABLA PARTICIONADA + DISCO)")
+    print("=" * 70)
+
+    rng = np.random.default_rng(11)
+    n = 30000
+    df = pd.DataFrame({f"c{i}": [str(v) for v in rng.integers(0, 25, n)] for i in range(3)})
+    df['copia_c1'] = df['c1']
+    df['ubicacion'] = [{'latitude': '4.6', 'longitude': str(v)} for v in rng.integers(0, 2, n)]
+    df.loc[::5, 'c2'] = None
+    # Columna que solo aparece a partir de la segunda página (Socrata omite campos nulos)
+    df['tardia'] = None
+    df.loc[5000:, 'tardia'] = [str(v) for v in rng.integers(0, 2, n - 5000)]
+
+    calc = DataQualityCalculator('test-stream')
+    calc._set_dataframe(df)
+    esperado = calc.calculate_unicidad(nivel_riesgo=1.5)
+    filas_esperadas = int(calc._duplicated_rows_mask().sum())
+
+    spill_root = tempfile.mkdtemp()
+    stream = StreamingUnicidad(memory_budget_mb=0.1, partitions=8, spill_dir=spill_root)
+    for inicio in range(0, n, 5000):
+        pagina = df.iloc[inicio:inicio + 5000]
+        registros = [{k: v for k, v in r.items() if v is not None and v == v} for r in pagina.to_dict('records')]
+        stream.add_page(registros)
+    resultado = stream.finish(nivel_riesgo=1.5)
+    print(f"   Exacto: {esperado:.4f} | Streaming: {resultado['score']:.4f}")
+    print(f"   Filas duplicadas: {resultado['filas_duplicadas']} | Pares: {resultado['pares_columnas']}")
+    print(f"   Estadísticas: {resultado['stats']}")
+
+    assert resultado['filas_duplicadas'] == filas_esperadas
+    assert resultado['pares_columnas'] == [('c1', 'copia_c1')]
+    assert abs(resultado['score'] - esperado) < 1e-9
+    assert resultado['stats']['spills'] > 0
+    # Los volcados se eliminan al terminar
+    assert os.listdir(spill_root) == []
+    print("   OK - mismos conteos que el cálculo en memoria, con volcado a disco")
+
+
+if __name__ == "__main__":
+    test_unicidad_streaming_igual_a_exacta()
@@ -97,5 +97,100 @@ def test_unicidad_local():
     print("TEST COMPLETADO")
     print("="*70)
 
+def test_unicidad_filas_por_hash():
+    """Filas duplicadas detectadas por hash, incluyendo celdas anidadas (location de Socrata)"""
+
+    print("\n" + "="*70)
+    print("TEST DE FILAS DUPLICADAS POR HASH")
+    print("="*70)
+
+    calculator = DataQualityCalculator("test_hash")
+    calculator._set_dataframe(pd.DataFrame({
+        'id': [1, 2, 1, 3, 3, 4],
+        'valor': [0.5, np.nan, 0.5, np.nan, np.nan, 1.0],
+        # Mismo objeto con las claves en distinto orden cuenta como igual
+        'ubicacion': [{'latitude': '4.6', 'longitude': '-74.1'}, None,
+                      {'longitude': '-74.1', 'latitude': '4.6'},
+                      {'latitude': '6.2'}, {'latitude': '6.2'}, ['a', 'b']],
+    }))
+
+    mask = calculator._duplicated_rows_mask()
+    print(f"   Filas duplicadas: {mask[mask].index.tolist()}")
+    assert mask.tolist() == [False, False, True, False, True, False]
+
+    # La forma canónica se construye una vez por versión de los datos
+    assert calculator._canonical_frame() is calculator._canonical_frame()
+    assert calculator._canonical_frame()['ubicacion'].iloc[1] is None
+
+    score = calculator.calculate_unicidad(nivel_riesgo=1.5)
+    assert abs(score - ((1 - 2 / 6) ** 1.5 + 1) / 2 * 10) < 1e-9
+    print(f"   OK - score {score:.2f}")
+
+
+def test_unicidad_columnas_por_huella():
+    """Columnas duplicadas agrupadas por huella de 64 bits en un dataset ancho"""
+
+    print("\n" + "="*70)
+    print("TEST DE COLUMNAS DUPLICADAS POR HUELLA")
+    print("="*70)
+
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame({f"col_{i}": rng.integers(0, 5, 500) for i in range(300)})
+    df['copia_col_3'] = df['col_3']
+    df['texto'] = rng.choice(['a', 'b', None], 500)
+    df['texto_categoria'] = df['texto'].astype('category')
+    # Mismos valores en otro orden no es una columna duplicada
+    df['col_3_invertida'] = df['col_3'].to_numpy()[::-1]
+
+    calculator = DataQualityCalculator("test_huella")
+    calculator._set_dataframe(df)
+
+    pares = calculator._duplicated_column_pairs()
+    print(f"   Pares: {pares}")
+    assert pares == [('col_3', 'copia_col_3'), ('texto', 'texto_categoria')]
+
+    # La verificación exacta descarta colisiones de huella
+    assert not calculator._columns_equal(df['col_3'], df['col_3_invertida'])
+    assert calculator._columns_equal(df['texto'], df['texto_categoria'])
+    print("   OK - columnas duplicadas detectadas sin comparar cada par")
+
+
+def test_unicidad_casi_duplicados():
+    """Modo near: filas que solo difieren en espacios, mayúsculas o la hora final"""
+
+    print("\n" + "="*70)
+    print("TEST DE FILAS CASI DUPLICADAS (MINHASH + LSH)")
+    print("="*70)
+
+    rng = np.random.default_rng(3)
+    n = 2000
+    df = pd.DataFrame({f"campo_{i}": [f"Valor {v}" for v in rng.integers(0, 10**6, n)] for i in range(8)})
+    df['fecha'] = [f"2024-03-0{d} 08:{m:02d}:00" for d, m in zip(rng.integers(1, 9, n), rng.integers(0, 60, n))]
+
+    casi = df.iloc[:100].copy()
+    casi['campo_0'] = '  ' + casi['campo_0'].str.upper()
+    casi['fecha'] = casi['fecha'].str.replace('08:', '17:', regex=False)
+    df = pd.concat([df, casi], ignore_index=True)
+
+    calculator = DataQualityCalculator("test_near")
+    calculator._set_dataframe(df)
+
+    exacto = calculator.calculate_unicidad(nivel_riesgo=1.5)
+    aproximado = calculator.calculate_unicidad(nivel_riesgo=1.5, mode='near')
+    print(f"   Score exacto: {exacto:.2f} | Score near: {aproximado:.2f}")
+    assert exacto == 10.0
+    assert abs(aproximado - ((1 - 100 / len(df)) ** 1.5 + 1) / 2 * 10) < 1e-9
+
+    try:
+        calculator.calculate_unicidad(mode='fuzzy')
+        assert False, "modo inválido aceptado"
+    except ValueError:
+        pass
+    print("   OK - casi duplicados contados en la fórmula de nivel_riesgo")
+
+
 if __name__ == "__main__":
     test_unicidad_local()
+    test_unicidad_filas_por_hash()
+    test_unicidad_columnas_por_huella()
+    test_unicidad_casi_duplicados()